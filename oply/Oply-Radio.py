@@ -36,12 +36,15 @@ import os
 import sys
 import json
 import time
-import socket
 import subprocess
 import pwd
 from urllib import request, parse
 from pathlib import Path
 
+from oply_mpv import MpvIpcClient
+from oply_nowplaying import NowPlayingPublisher
+from oply_i18n import catalog
+
 
 def get_real_home():
     """Evita escribir en /root cuando se ejecuta vía sudo/pkexec."""
@@ -63,6 +66,7 @@ LANG_FILE = os.path.join(CONFIG_DIR, "language.json")
 RADIO_DIR = os.path.join(CONFIG_DIR, "radio")
 FAVORITES_FILE = os.path.join(RADIO_DIR, "favorites.json")
 STATE_FILE = os.path.join(CONFIG_DIR, "now_playing.json")
+NOW_PLAYING = NowPlayingPublisher(STATE_FILE, player="Oply Radio", source="radio")
 ICON_APP = "/usr/local/Oply/icons/radio.svg"
 
 
@@ -84,353 +88,7 @@ RADIO_LOCALES = [
 ]
 
 
-# Translations
-
-TXT = {
-    "en": {
-        "title": "Oply Radio",
-        "subtitle": "Select a station",
-        "country": "Country",
-        "search": "Search…",
-        "refresh": "Refresh list",
-        "add": "Add station",
-        "stop": "Stop",
-        "volume": "Volume",
-        "connecting": "Connecting…",
-        "connecting_to": "Connecting to:",
-        "loading": "Loading stations…",
-        "no_stations": "No stations yet. Press Refresh.",
-        "err_fetch": "Could not fetch stations (offline?). Using cache.",
-        "err_open": "Could not open Oply Radio.",
-        "name": "Name",
-        "url": "URL",
-        "save": "Save",
-        "cancel": "Cancel",
-        "favorites": "Favorites",
-        "add_fav": "Add to favorites",
-        "remove_fav": "Remove from favorites",
-        "no_fav": "No favorites yet",
-        "fav_open": "Open favorites file",
-        "fav_added": "Added to favorites",
-        "fav_removed": "Removed from favorites",
-        "restore": "Show Window",
-        "exit": "Exit",
-        "tray_country": "Country",
-        "close_dialog_title": "Close Oply Radio?",
-        "close_dialog_message": "What do you want to do?",
-        "minimize_to_tray": "Minimize to Tray",
-        "quit_app": "Quit Application",
-        "tray_favorites": "Favorites",
-    },
-    "es": {
-        "title": "Oply Radio",
-        "subtitle": "Elegí una estación",
-        "country": "País",
-        "search": "Buscar…",
-        "refresh": "Actualizar lista",
-        "add": "Agregar estación",
-        "stop": "Detener",
-        "volume": "Volumen",
-        "connecting": "Conectando…",
-        "connecting_to": "Conectando a:",
-        "loading": "Cargando estaciones…",
-        "no_stations": "Sin estaciones. Tocá Actualizar.",
-        "err_fetch": "No pude descargar estaciones (¿sin internet?). Uso caché.",
-        "err_open": "No se pudo abrir Oply Radio.",
-        "name": "Nombre",
-        "url": "URL",
-        "save": "Guardar",
-        "cancel": "Cancelar",
-        "favorites": "Favoritos",
-        "add_fav": "Agregar a favoritos",
-        "remove_fav": "Quitar de favoritos",
-        "no_fav": "Sin favoritos todavía",
-        "fav_open": "Abrir archivo de favoritos",
-        "fav_added": "Agregado a favoritos",
-        "fav_removed": "Quitado de favoritos",
-        "restore": "Mostrar Ventana",
-        "exit": "Salir",
-        "tray_country": "País",
-        "close_dialog_title": "¿Cerrar Oply Radio?",
-        "close_dialog_message": "¿Qué deseas hacer?",
-        "minimize_to_tray": "Minimizar a Bandeja",
-        "quit_app": "Salir de la Aplicación",
-        "tray_favorites": "Favoritos",
-    },
-    "fr": {
-        "title": "Oply Radio",
-        "subtitle": "Choisissez une station",
-        "country": "Pays",
-        "search": "Rechercher…",
-        "refresh": "Actualiser la liste",
-        "add": "Ajouter une station",
-        "stop": "Arrêter",
-        "volume": "Volume",
-        "connecting": "Connexion…",
-        "connecting_to": "Connexion à :",
-        "loading": "Chargement des stations…",
-        "no_stations": "Aucune station. Appuyez sur Actualiser.",
-        "err_fetch": "Impossible de récupérer les stations. Cache utilisé.",
-        "err_open": "Impossible d'ouvrir Oply Radio.",
-        "name": "Nom",
-        "url": "URL",
-        "save": "Enregistrer",
-        "cancel": "Annuler",
-        "favorites": "Favoris",
-        "add_fav": "Ajouter aux favoris",
-        "remove_fav": "Retirer des favoris",
-        "no_fav": "Aucun favori",
-        "fav_open": "Ouvrir le fichier des favoris",
-        "fav_added": "Ajouté aux favoris",
-        "fav_removed": "Retiré des favoris",
-        "restore": "Afficher la Fenêtre",
-        "exit": "Quitter",
-        "tray_country": "Pays",
-        "close_dialog_title": "Fermer Oply Radio ?",
-        "close_dialog_message": "Que voulez-vous faire ?",
-        "minimize_to_tray": "Réduire dans la Barre",
-        "quit_app": "Quitter l'Application",
-        "tray_favorites": "Favoris",
-    },
-    "it": {
-        "title": "Oply Radio",
-        "subtitle": "Seleziona una stazione",
-        "country": "Paese",
-        "search": "Cerca…",
-        "refresh": "Aggiorna elenco",
-        "add": "Aggiungi stazione",
-        "stop": "Stop",
-        "volume": "Volume",
-        "connecting": "Connessione…",
-        "connecting_to": "Connessione a:",
-        "loading": "Caricamento stazioni…",
-        "no_stations": "Nessuna stazione. Premi Aggiorna.",
-        "err_fetch": "Impossibile recuperare le stazioni. Uso cache.",
-        "err_open": "Impossibile aprire Oply Radio.",
-        "name": "Nome",
-        "url": "URL",
-        "save": "Salva",
-        "cancel": "Annulla",
-        "favorites": "Preferiti",
-        "add_fav": "Aggiungi ai preferiti",
-        "remove_fav": "Rimuovi dai preferiti",
-        "no_fav": "Nessun preferito",
-        "fav_open": "Apri file preferiti",
-        "fav_added": "Aggiunto ai preferiti",
-        "fav_removed": "Rimosso dai preferiti",
-        "restore": "Mostra Finestra",
-        "exit": "Esci",
-        "tray_country": "Paese",
-        "close_dialog_title": "Chiudere Oply Radio?",
-        "close_dialog_message": "Cosa vuoi fare?",
-        "minimize_to_tray": "Riduci a Icona",
-        "quit_app": "Chiudi Applicazione",
-        "tray_favorites": "Preferiti",
-    },
-    "pt": {
-        "title": "Oply Radio",
-        "subtitle": "Escolha uma estação",
-        "country": "País",
-        "search": "Buscar…",
-        "refresh": "Atualizar lista",
-        "add": "Adicionar estação",
-        "stop": "Parar",
-        "volume": "Volume",
-        "connecting": "Conectando…",
-        "connecting_to": "Conectando a:",
-        "loading": "Carregando estações…",
-        "no_stations": "Sem estações. Clique em Atualizar.",
-        "err_fetch": "Não foi possível buscar estações. Usando cache.",
-        "err_open": "Não foi possível abrir Oply Radio.",
-        "name": "Nome",
-        "url": "URL",
-        "save": "Salvar",
-        "cancel": "Cancelar",
-        "favorites": "Favoritos",
-        "add_fav": "Adicionar aos favoritos",
-        "remove_fav": "Remover dos favoritos",
-        "no_fav": "Sem favoritos",
-        "fav_open": "Abrir arquivo de favoritos",
-        "fav_added": "Adicionado aos favoritos",
-        "fav_removed": "Removido dos favoritos",
-        "restore": "Mostrar Janela",
-        "exit": "Sair",
-        "tray_country": "País",
-        "close_dialog_title": "Fechar Oply Radio?",
-        "close_dialog_message": "O que você deseja fazer?",
-        "minimize_to_tray": "Minimizar para Bandeja",
-        "quit_app": "Sair da Aplicação",
-        "tray_favorites": "Favoritos",
-    },
-    "ru": {
-        "title": "Oply Radio",
-        "subtitle": "Выберите станцию",
-        "country": "Страна",
-        "search": "Поиск…",
-        "refresh": "Обновить список",
-        "add": "Добавить станцию",
-        "stop": "Стоп",
-        "volume": "Громкость",
-        "connecting": "Подключение…",
-        "connecting_to": "Подключение к:",
-        "loading": "Загрузка станций…",
-        "no_stations": "Станций нет. Нажмите Обновить.",
-        "err_fetch": "Не удалось получить станции. Использую кэш.",
-        "err_open": "Не удалось открыть Oply Radio.",
-        "name": "Название",
-        "url": "URL",
-        "save": "Сохранить",
-        "cancel": "Отмена",
-        "favorites": "Избранное",
-        "add_fav": "Добавить в избранное",
-        "remove_fav": "Удалить из избранного",
-        "no_fav": "Нет избранного",
-        "fav_open": "Открыть файл избранного",
-        "fav_added": "Добавлено в избранное",
-        "fav_removed": "Удалено из избранного",
-        "restore": "Показать Окно",
-        "exit": "Выход",
-        "tray_country": "Страна",
-        "close_dialog_title": "Закрыть Oply Radio?",
-        "close_dialog_message": "Что вы хотите сделать?",
-        "minimize_to_tray": "Свернуть в Трей",
-        "quit_app": "Выйти из Приложения",
-        "tray_favorites": "Избранное",
-    },
-    "ja": {
-        "title": "Oply Radio",
-        "subtitle": "局を選択してください",
-        "country": "国",
-        "search": "検索…",
-        "refresh": "一覧を更新",
-        "add": "局を追加",
-        "stop": "停止",
-        "volume": "音量",
-        "connecting": "接続中…",
-        "connecting_to": "接続先:",
-        "loading": "局を読み込み中…",
-        "no_stations": "局がありません。更新を押してください。",
-        "err_fetch": "局を取得できません。キャッシュを使用します。",
-        "err_open": "Oply Radio を開けませんでした。",
-        "name": "名前",
-        "url": "URL",
-        "save": "保存",
-        "cancel": "キャンセル",
-        "favorites": "お気に入り",
-        "add_fav": "お気に入りに追加",
-        "remove_fav": "お気に入りから削除",
-        "no_fav": "お気に入りなし",
-        "fav_open": "お気に入りファイルを開く",
-        "fav_added": "お気に入りに追加しました",
-        "fav_removed": "お気に入りから削除しました",
-        "restore": "ウィンドウを表示",
-        "exit": "終了",
-        "tray_country": "国",
-        "close_dialog_title": "Oply Radio を閉じますか？",
-        "close_dialog_message": "何をしますか？",
-        "minimize_to_tray": "トレイに最小化",
-        "quit_app": "アプリケーションを終了",
-        "tray_favorites": "お気に入り",
-    },
-    "zh": {
-        "title": "Oply Radio",
-        "subtitle": "请选择电台",
-        "country": "国家",
-        "search": "搜索…",
-        "refresh": "刷新列表",
-        "add": "添加电台",
-        "stop": "停止",
-        "volume": "音量",
-        "connecting": "正在连接…",
-        "connecting_to": "正在连接到：",
-        "loading": "正在加载电台…",
-        "no_stations": "没有电台。请点击刷新。",
-        "err_fetch": "无法获取电台。使用缓存。",
-        "err_open": "无法打开 Oply Radio。",
-        "name": "名称",
-        "url": "URL",
-        "save": "保存",
-        "cancel": "取消",
-        "favorites": "收藏",
-        "add_fav": "加入收藏",
-        "remove_fav": "移出收藏",
-        "no_fav": "暂无收藏",
-        "fav_open": "打开收藏文件",
-        "fav_added": "已加入收藏",
-        "fav_removed": "已移出收藏",
-        "restore": "显示窗口",
-        "exit": "退出",
-        "tray_country": "国家",
-        "close_dialog_title": "关闭 Oply Radio？",
-        "close_dialog_message": "您想做什么？",
-        "minimize_to_tray": "最小化到托盘",
-        "quit_app": "退出应用程序",
-        "tray_favorites": "收藏",
-    },
-    "ar": {
-        "title": "Oply Radio",
-        "subtitle": "اختر محطة",
-        "country": "البلد",
-        "search": "بحث…",
-        "refresh": "تحديث القائمة",
-        "add": "إضافة محطة",
-        "stop": "إيقاف",
-        "volume": "الصوت",
-        "connecting": "جارٍ الاتصال…",
-        "connecting_to": "جارٍ الاتصال بـ:",
-        "loading": "جارٍ تحميل المحطات…",
-        "no_stations": "لا توجد محطات. اضغط تحديث.",
-        "err_fetch": "تعذر جلب المحطات. استخدام التخزين المؤقت.",
-        "err_open": "تعذر فتح Oply Radio.",
-        "name": "الاسم",
-        "url": "الرابط",
-        "save": "حفظ",
-        "cancel": "إلغاء",
-        "favorites": "المفضلة",
-        "add_fav": "إضافة إلى المفضلة",
-        "remove_fav": "إزالة من المفضلة",
-        "no_fav": "لا توجد مفضلة بعد",
-        "fav_open": "فتح ملف المفضلة",
-        "fav_added": "تمت الإضافة إلى المفضلة",
-        "fav_removed": "تمت الإزالة من المفضلة",
-        "restore": "إظهار النافذة",
-        "exit": "خروج",
-        "tray_country": "البلد",
-        "close_dialog_title": "إغلاق Oply Radio؟",
-        "close_dialog_message": "ماذا تريد أن تفعل؟",
-        "minimize_to_tray": "تصغير إلى الدرج",
-        "quit_app": "إنهاء التطبيق",
-        "tray_favorites": "المفضلة",
-    },
-    "ca": {
-        "title": "Oply Radio",
-        "subtitle": "Tria una emissora",
-        "country": "País",
-        "search": "Cerca…",
-        "refresh": "Actualitza la llista",
-        "add": "Afegeix emissora",
-        "stop": "Atura",
-        "volume": "Volum",
-        "connecting": "Connectant…",
-        "connecting_to": "Connectant a:",
-        "loading": "Carregant emissores…",
-        "no_stations": "Sense emissores. Prem Actualitza.",
-        "err_fetch": "No puc obtenir emissores. Ús de memòria cau.",
-        "err_open": "No s'ha pogut obrir Oply Radio.",
-        "name": "Nom",
-        "url": "URL",
-        "save": "Desa",
-        "cancel": "Cancel·la",
-        "favorites": "Preferits",
-        "add_fav": "Afegeix a preferits",
-        "remove_fav": "Treu de preferits",
-        "no_fav": "Sense preferits",
-        "fav_open": "Obre el fitxer de preferits",
-        "fav_added": "Afegit a preferits",
-        "fav_removed": "Eliminat de preferits",
-
-    }
-}
+# Translations: i18n/<idioma>.json (ver oply_i18n.py)
 
 def load_lang_code():
     try:
@@ -450,7 +108,7 @@ def load_lang_code():
 
 def tr():
     code = load_lang_code()
-    return TXT.get(code, TXT["en"])
+    return catalog("radio", code)
 
 
 # Radio Browser helpers
@@ -527,6 +185,7 @@ class OplyRadio(Gtk.Window):
         # state
         self.current_station = None
         self._connecting_started = 0.0
+        self._probe_pending = False
         self._connect_timeout_ms = 15000
 
         # headerbar
@@ -742,55 +401,63 @@ class OplyRadio(Gtk.Window):
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL
         )
-        time.sleep(0.4)
 
-    def _mpv_send(self, command, request_id=1, want_reply=False):
-        if not os.path.exists(self.mpv_socket):
-            return None
-        payload = {"command": command, "request_id": int(request_id)}
-        try:
-            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
-                s.settimeout(1.5)
-                s.connect(self.mpv_socket)
-                s.sendall((json.dumps(payload) + "\n").encode("utf-8"))
-                if not want_reply:
-                    return None
-                data = b""
-                while not data.endswith(b"\n"):
-                    chunk = s.recv(4096)
-                    if not chunk:
-                        break
-                    data += chunk
-                if not data:
-                    return None
-                resp = json.loads(data.decode("utf-8", errors="ignore").strip())
-                if resp.get("error") == "success":
-                    return resp.get("data")
-                return None
-        except Exception:
-            return None
+        # Sin espera fija: el cliente conecta con backoff en segundo plano
+        # y guarda los comandos hasta que mpv atiende el socket
+        self.mpv_ipc = MpvIpcClient(self.mpv_socket, is_alive=lambda: self.mpv.poll() is None)
+        self.mpv_ipc.start()
+
+    def _mpv_running(self):
+        return self.mpv.poll() is None and self.mpv_ipc.connected
+
+    def _mpv_send(self, command, callback=None):
+        """
+        Envía un comando sin bloquear. Con callback, se lo llama en el hilo
+        de GTK con el 'data' de la respuesta (None si mpv no respondió).
+        """
+        if callback is None:
+            self.mpv_ipc.command(command)
+            return
+        if not self._mpv_running():
+            GLib.idle_add(self._deliver_reply, callback, None)
+            return
+
+        def done(resp):
+            ok = resp is not None and resp.get("error") == "success"
+            GLib.idle_add(self._deliver_reply, callback, resp.get("data") if ok else None)
+
+        self.mpv_ipc.command(command, callback=done)
+
+    @staticmethod
+    def _deliver_reply(callback, value):
+        callback(value)
+        return False
+
+    def _mpv_get(self, prop, callback):
+        self._mpv_send(["get_property", prop], callback)
+
+    def _mpv_get_many(self, props, callback):
+        """callback(dict propiedad -> valor) cuando llegaron todas las respuestas"""
+        values = {}
+
+        def got(prop, value):
+            values[prop] = value
+            if len(values) == len(props):
+                callback(values)
 
-    def _mpv_get(self, prop):
-        return self._mpv_send(["get_property", prop], request_id=7, want_reply=True)
+        for prop in props:
+            self._mpv_get(prop, lambda value, prop=prop: got(prop, value))
 
     def _mpv_set(self, prop, value):
-        self._mpv_send(["set_property", prop, value], request_id=8, want_reply=False)
+        self._mpv_send(["set_property", prop, value])
 
     def _write_now_playing(self, is_playing, station_name="", url=""):
         """Escribe el estado de reproducción para que Conky lo pueda leer."""
-        try:
-            os.makedirs(CONFIG_DIR, exist_ok=True)
-            data = {
-                "is_playing": is_playing,
-                "title": station_name,
-                "artist": "",
-                "source": "radio",
-                "url": url,
-            }
-            with open(STATE_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+        if is_playing:
+            NOW_PLAYING.publish(station_name, is_playing=True, url=url)
+        else:
+            # Al detener se conserva la emisora; solo cambia is_playing
+            NOW_PLAYING.update(is_playing=False)
 
     # ---------- cache ----------
     def _selected_locale(self):
@@ -1194,33 +861,42 @@ class OplyRadio(Gtk.Window):
         self._write_now_playing(True, station_name=name, url=url)
 
         # mpv load
-        self._mpv_send(["loadfile", url, "replace"], request_id=2, want_reply=False)
+        self._mpv_send(["loadfile", url, "replace"])
         self._mpv_set("pause", False)
-        self._connecting_started = time.time()
+        self._connecting_started = started = time.time()
 
         # wait until it starts (hide overlay)
-        GLib.timeout_add(200, self._poll_playback_started)
+        GLib.timeout_add(200, self._poll_playback_started, started)
+
+    def _poll_playback_started(self, started):
+        # otra emisora, o esta ya arrancó
+        if started != self._connecting_started:
+            return False
 
-    def _poll_playback_started(self):
         # timeout
-        if (time.time() - self._connecting_started) * 1000 > self._connect_timeout_ms:
+        if (time.time() - started) * 1000 > self._connect_timeout_ms:
             self._hide_loading()
             self._hide_connecting()
             return False
 
-        core_idle = self._mpv_get("core-idle")
-        paused_for_cache = self._mpv_get("paused-for-cache")
-        time_pos = self._mpv_get("time-pos")
-
+        # Las consultas no bloquean: si la anterior no volvió, se espera al próximo tick
+        if not self._probe_pending:
+            self._probe_pending = True
+            self._mpv_get_many(("core-idle", "paused-for-cache", "time-pos"),
+                               lambda values: self._on_playback_probe(started, values))
+        return True
 
-        if core_idle is False and (paused_for_cache in (False, None)) and (time_pos is not None):
+    def _on_playback_probe(self, started, values):
+        self._probe_pending = False
+        if started != self._connecting_started:
+            return
+        if (values["core-idle"] is False and values["paused-for-cache"] in (False, None)
+                and values["time-pos"] is not None):
+            self._connecting_started = None
             self._hide_connecting()
-            return False
-
-        return True
 
     def on_stop(self, button):
-        self._mpv_send(["stop"], request_id=3, want_reply=False)
+        self._mpv_send(["stop"])
         self.hb.props.subtitle = self.TEXT["subtitle"]
         self.now.set_markup("<b>—</b>")
         self._write_now_playing(False)
@@ -1449,9 +1125,10 @@ class OplyRadio(Gtk.Window):
     def on_destroy(self, *args):
         self._write_now_playing(False)
         try:
-            self._mpv_send(["quit"], request_id=99, want_reply=False)
+            self._mpv_send(["quit"])
         except Exception:
             pass
+        self.mpv_ipc.close()
 
         try:
             if hasattr(self, "mpv") and self.mpv:
@@ -36,6 +36,8 @@ import locale
 import sys
 from pathlib import Path
 
+from oply_i18n import catalog, has_language
+
 
 TV_SIDEBAR_WIDTH = 280
 
@@ -238,131 +240,17 @@ def load_tv_channels_for_locale(locale_code: str):
     except Exception:
         pass
     return base
-LANGUAGES = {
-    "en": {
-        "fullscreen": "Fullscreen",
-        "title": "Oply Video Player",
-        "open": "Open",
-        "play_pause": "Play/Pause",
-        "stop": "Stop",
-        "volume": "Volume",
-        "exit": "Exit",
-        "subtitle": "No video loaded",
-        "playing": "Playing",
-        "iptv": "IP TV News",
-        "toggle_iptv": "Show/Hide TV channels",
-        "live": "Live",
-        "make_tv_index": "Create TV index",
-        "select_locales": "Select 1–3 languages/countries",
-        "create_index": "Create",
-        "cancel": "Cancel",
-        "index_created": "TV index created"
-    },
-    "es": {
-        "fullscreen": "Pantalla completa",
-        "title": "Oply Reproductor de Video",
-        "open": "Abrir",
-        "play_pause": "Reproducir/Pausa",
-        "stop": "Detener",
-        "volume": "Volumen",
-        "exit": "Salir",
-        "subtitle": "Sin video cargado",
-        "playing": "Reproduciendo",
-        "iptv": "IP TV Noticias",
-        "toggle_iptv": "Mostrar/Ocultar canales",
-        "live": "En vivo",
-        "make_tv_index": "Crear index TV",
-        "select_locales": "Elegí 1–3 idiomas/países",
-        "create_index": "Crear",
-        "cancel": "Cancelar",
-        "index_created": "Index TV creado"
-    },
-    "fr": {
-        "fullscreen": "Plein écran",
-        "title": "Lecteur Vidéo Oply",
-        "open": "Ouvrir",
-        "play_pause": "Lecture/Pause",
-        "stop": "Arrêter",
-        "volume": "Volume",
-        "exit": "Quitter",
-        "subtitle": "Aucune vidéo chargée",
-        "playing": "Lecture en cours",
-        "iptv": "IP TV Infos",
-        "toggle_iptv": "Afficher/Masquer les chaînes",
-        "live": "En direct",
-        "make_tv_index": "Créer l’index TV",
-        "select_locales": "Choisissez 1–3 langues/pays",
-        "create_index": "Créer",
-        "cancel": "Annuler",
-        "index_created": "Index TV créé"
-    },
-    "it": {
-        "fullscreen": "Schermo intero",
-        "title": "Lettore Video Oply",
-        "open": "Apri",
-        "play_pause": "Riproduci/Pausa",
-        "stop": "Ferma",
-        "volume": "Volume",
-        "exit": "Esci",
-        "subtitle": "Nessun video caricato",
-        "playing": "Riproduzione",
-        "iptv": "IP TV Notizie",
-        "toggle_iptv": "Mostra/Nascondi canali",
-        "live": "In diretta",
-        "make_tv_index": "Crea indice TV",
-        "select_locales": "Scegli 1–3 lingue/paesi",
-        "create_index": "Crea",
-        "cancel": "Annulla",
-        "index_created": "Indice TV creato"
-    },
-    "pt": {
-        "fullscreen": "Tela cheia",
-        "title": "Oply Reprodutor de Vídeo",
-        "open": "Abrir",
-        "play_pause": "Reproduzir/Pausa",
-        "stop": "Parar",
-        "volume": "Volume",
-        "exit": "Sair",
-        "subtitle": "Nenhum vídeo carregado",
-        "playing": "Reproduzindo",
-        "iptv": "IP TV Notícias",
-        "toggle_iptv": "Mostrar/Ocultar canais",
-        "live": "Ao vivo",
-        "make_tv_index": "Criar índice TV",
-        "select_locales": "Escolha 1–3 idiomas/países",
-        "create_index": "Criar",
-        "cancel": "Cancelar",
-        "index_created": "Índice TV criado"
-    },
-    "ca": {
-        "fullscreen": "Pantalla completa",
-        "title": "Oply Reproductor de Vídeo",
-        "open": "Obrir",
-        "play_pause": "Reproduir/Pausa",
-        "stop": "Aturar",
-        "volume": "Volum",
-        "exit": "Sortir",
-        "subtitle": "Sense vídeo carregat",
-        "playing": "Reproduint",
-        "iptv": "IP TV Notícies",
-        "toggle_iptv": "Mostrar/Ocultar canals",
-        "live": "En directe",
-        "make_tv_index": "Crear índex TV",
-        "select_locales": "Tria 1–3 idiomes/països",
-        "create_index": "Crear",
-        "cancel": "Cancel·lar",
-        "index_created": "Índex TV creat"
-    }
-}
+
+# Los textos de cada idioma están en i18n/<idioma>.json (ver oply_i18n.py)
 
 def set_language(lang_code=None):
     if not lang_code:
         try:
             sys_lang = locale.getdefaultlocale()[0][:2]
-            lang_code = sys_lang if sys_lang in LANGUAGES else "en"
+            lang_code = sys_lang if has_language("video", sys_lang) else "en"
         except:
             lang_code = "en"
-    return LANGUAGES.get(lang_code, LANGUAGES["en"])
+    return catalog("video", lang_code)
 
 def load_language():
     try:
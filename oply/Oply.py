@@ -25,9 +25,23 @@
 #
 # ====================================================================
 
+import time
+STARTUP_T0 = time.monotonic()
+
+import os
+import sys
+
+# Vía rápida: con una ventana ya abierta se le pasan los archivos sin cargar GTK
+if __name__ == "__main__":
+    from oply_launcher import forward
+    if forward(sys.argv[1:]):
+        sys.exit(0)
+
 import gi
 gi.require_version('Gtk', '3.0')
 gi.require_version('Gdk', '3.0')
+gi.require_version('Pango', '1.0')
+from gi.repository import Pango
 try:
     gi.require_version('AyatanaAppIndicator3', '0.1')
     from gi.repository import Gtk, Gdk, GLib, GdkPixbuf, Gio, AyatanaAppIndicator3 as AppIndicator3
@@ -38,21 +52,38 @@ except (ValueError, ImportError):
     print("Warning: AyatanaAppIndicator3 not available. Systray will not work.")
     print("Install with: sudo apt install gir1.2-ayatanaappindicator3-0.1")
 
+import cairo
 import subprocess
-import os
 import pwd
-import glob
-import sys
-import socket
 import threading
 import json
-import time
 import math
 import random
+import queue
 from pathlib import Path
+from concurrent.futures import Future
+
+from oply_metadata import MetadataCache, read_embedded_cover
+from oply_scanner import LibraryScanner
+from oply_mpv import MpvIpcClient
+from oply_covers import CoverCache, OnlineCoverLookup, key_for_bytes, key_for_file
+from oply_spectrum import SpectrumAnalyzer, NUMPY_AVAILABLE, FFMPEG_AVAILABLE
+from oply_nowplaying import NowPlayingPublisher
+from oply_control import ControlServer, ControlError, OPLY_SOCKET
+from oply_launcher import parse_args
+from oply_i18n import catalog, has_language
+from oply_playlists import PlaylistLoader, make_entry, entry_meta, write_playlist
+from oply_library import Library, LibraryIndexer
+from oply_pathlist import PathList
+from oply_playorder import PlayOrder, PLAY_NEXT, PLAY_LATER
 
 # Configuración
-SOCKET_PATH = "/tmp/oply_socket"
+SOCKET_PATH = OPLY_SOCKET
+def startup_trace(label):
+    """Traza de arranque (OPLY_TRACE=1): milisegundos desde que arrancó el proceso"""
+    if os.environ.get("OPLY_TRACE"):
+        print(f"[startup] {label}: {(time.monotonic() - STARTUP_T0) * 1000:.0f} ms", flush=True)
+
 def get_real_home():
     """Evita escribir en /root cuando se ejecuta vía sudo/pkexec."""
     try:
@@ -75,410 +106,34 @@ PLAYLISTS_DIR = os.path.join(CONFIG_DIR, "playlists")
 LANG_FILE = os.path.join(CONFIG_DIR, "language.json")
 ICON_PATH = "/usr/local/Oply/icons/oply.svg"
 TV_INDEXER = "/usr/local/Oply/oply-tv-indexer.py"
+METADATA_DB = os.path.join(CONFIG_DIR, "metadata.db")
+LIBRARY_DB = os.path.join(CONFIG_DIR, "library.db")
+COVERS_DIR = os.path.join(CONFIG_DIR, "covers")
+FOLDER_COVER_NAMES = [
+    "cover.jpg", "folder.jpg", "front.jpg", "album.jpg",
+    "Cover.jpg", "Folder.jpg", "Front.jpg", "Album.jpg",
+    "cover.png", "folder.png", "front.png", "album.png",
+    "Cover.png", "Folder.png", "Front.png", "Album.png",
+]
 SUPPORTED_FORMATS = ['*.mp3', '*.wav', '*.ogg', '*.flac', '*.m4a', '*.aac', '*.mp4', '*.m4v', '*.webm']
+SUPPORTED_EXTENSIONS = {os.path.splitext(fmt)[1].lower() for fmt in SUPPORTED_FORMATS}
 
 # SOPORTE PARA CONKY - Exportar estado de reproducción
 # Agregado por josejp2424 para integración con ConkySwitcher
 STATE_FILE = os.path.join(CONFIG_DIR, "now_playing.json")
+NOW_PLAYING = NowPlayingPublisher(STATE_FILE, player="Oply")
 
-def update_now_playing(title, artist="", is_playing=True):
-    """Actualiza el archivo de estado para Conky"""
-    try:
-        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
-        data = {
-            'title': title,
-            'artist': artist,
-            'is_playing': is_playing,
-            'player': 'Oply'
-        }
-        with open(STATE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error updating now playing: {e}")
+def update_now_playing(title, artist="", is_playing=True, album="", position=None, duration=None):
+    """Actualiza el archivo de estado para Conky (solo si cambió algo)"""
+    NOW_PLAYING.publish(title, artist=artist, is_playing=is_playing, album=album,
+                        position=position, duration=duration)
 
 def clear_now_playing():
     """Limpia el estado de reproducción"""
-    try:
-        if os.path.exists(STATE_FILE):
-            os.remove(STATE_FILE)
-    except:
-        pass
+    NOW_PLAYING.clear()
 
 
-LANGUAGES = {
-    "en": {
-        "title": "Oply Audio Player",
-        "add_files": "Add Files",
-        "add_folder": "Add Folder",
-        "save_playlist": "Save Playlist",
-        "load_playlist": "Load Playlist",
-        "clear": "Clear Playlist",
-        "subtitle": "No audio loaded",
-        "playing": "Playing",
-        "play_pause": "Play/Pause",
-        "next": "Next",
-        "previous": "Previous",
-        "restore": "Show Window",
-        "exit": "Exit",
-        "volume": "Volume",
-        "close_dialog_title": "Close Oply?",
-        "close_dialog_message": "What do you want to do?",
-        "minimize_to_tray": "Minimize to Tray",
-        "quit_app": "Quit Application",
-        "youtube_download": "Download music or video from YouTube",
-        "open_radio": "Open Radio",
-        "open_video": "Open Video",
-        "about_radio_desc": "Online radio player with favourites,\ncountry index and tray support",
-        "about_iptv_desc": "IPTV panel with country index,\nlive streams and MPV playback",
-        "about_audio_desc": "Advanced audio player with album art,\nplaylist management and systray support",
-        "about_video_desc": "Lightweight video player with\nfullscreen and subtitle support",
-        "about_convert_desc": "YouTube video downloader and\naudio/video format converter",
-        "about_created": "Created by:",
-        "about_license": "License:",
-        "about_close": "Close"
-    },
-    "es": {
-        "title": "Oply Reproductor de Audio",
-        "add_files": "Añadir Archivos",
-        "add_folder": "Añadir Carpeta",
-        "save_playlist": "Guardar Lista",
-        "load_playlist": "Cargar Lista",
-        "clear": "Limpiar Lista",
-        "subtitle": "Sin audio cargado",
-        "playing": "Reproduciendo",
-        "play_pause": "Reproducir/Pausa",
-        "next": "Siguiente",
-        "previous": "Anterior",
-        "restore": "Mostrar Ventana",
-        "exit": "Salir",
-        "volume": "Volumen",
-        "close_dialog_title": "¿Cerrar Oply?",
-        "close_dialog_message": "¿Qué deseas hacer?",
-        "minimize_to_tray": "Minimizar a Bandeja",
-        "quit_app": "Salir de la Aplicación",
-        "youtube_download": "Descargar música o video desde YouTube",
-        "open_radio": "Abrir Radio",
-        "open_video": "Abrir Video",
-        "about_radio_desc": "Reproductor de radio online con favoritos,\nindex por país y bandeja del sistema",
-        "about_iptv_desc": "Panel IPTV con index por país,\ncanales en vivo y reproducción con MPV",
-        "about_audio_desc": "Reproductor de audio avanzado con carátulas,\ngestión de listas de reproducción y soporte de bandeja",
-        "about_video_desc": "Reproductor de video ligero con\nsoporte de pantalla completa y subtítulos",
-        "about_convert_desc": "Descargador de videos de YouTube y\nconversor de formatos de audio/video",
-        "about_created": "Creado por:",
-        "about_license": "Licencia:",
-        "about_close": "Cerrar"
-    },
-    "fr": {
-        "title": "Oply Lecteur Audio",
-        "add_files": "Ajouter des Fichiers",
-        "add_folder": "Ajouter un Dossier",
-        "save_playlist": "Enregistrer la Liste",
-        "load_playlist": "Charger la Liste",
-        "clear": "Effacer la Liste",
-        "subtitle": "Aucun audio chargé",
-        "playing": "Lecture en cours",
-        "play_pause": "Lecture/Pause",
-        "next": "Suivant",
-        "previous": "Précédent",
-        "restore": "Afficher la Fenêtre",
-        "exit": "Quitter",
-        "volume": "Volume",
-        "close_dialog_title": "Fermer Oply?",
-        "close_dialog_message": "Que voulez-vous faire?",
-        "minimize_to_tray": "Réduire dans la Barre",
-        "quit_app": "Quitter l'Application",
-        "youtube_download": "Télécharger de la musique ou des vidéos depuis YouTube",
-        "open_radio": "Ouvrir la radio",
-        "open_video": "Ouvrir la vidéo",
-        "about_radio_desc": "Lecteur de radio en ligne avec favoris,\nindex par pays et prise en charge de la zone de notification",
-        "about_iptv_desc": "Panneau IPTV avec index par pays,\nflux en direct et lecture via MPV",
-        "about_audio_desc": "Lecteur audio avancé avec pochettes d'album,\ngestion de listes de lecture et support de barre d'état",
-        "about_video_desc": "Lecteur vidéo léger avec\nsupport plein écran et sous-titres",
-        "about_convert_desc": "Téléchargeur de vidéos YouTube et\nconvertisseur de formats audio/vidéo",
-        "about_created": "Créé par:",
-        "about_license": "Licence:",
-        "about_close": "Fermer"
-    },
-    "de": {
-        "title": "Oply Audio-Player",
-        "add_files": "Dateien Hinzufügen",
-        "add_folder": "Ordner Hinzufügen",
-        "save_playlist": "Playlist Speichern",
-        "load_playlist": "Playlist Laden",
-        "clear": "Playlist Leeren",
-        "subtitle": "Kein Audio geladen",
-        "playing": "Wird Abgespielt",
-        "play_pause": "Wiedergabe/Pause",
-        "next": "Nächster",
-        "previous": "Vorheriger",
-        "restore": "Fenster Anzeigen",
-        "exit": "Beenden",
-        "volume": "Lautstärke",
-        "close_dialog_title": "Oply Schließen?",
-        "close_dialog_message": "Was möchten Sie tun?",
-        "minimize_to_tray": "In Taskleiste Minimieren",
-        "quit_app": "Anwendung Beenden",
-        "youtube_download": "Musik oder Video von YouTube herunterladen",
-        "open_radio": "Radio öffnen",
-        "open_video": "Video öffnen",
-        "about_radio_desc": "Online-Radio mit Favoriten,\nLänderindex und Tray-Unterstützung",
-        "about_iptv_desc": "IPTV-Panel mit Länderindex,\nLive-Streams und MPV-Wiedergabe",
-        "about_audio_desc": "Erweiterter Audio-Player mit Album-Cover,\nWiedergabelistenverwaltung und Taskleistenunterstützung",
-        "about_video_desc": "Leichter Video-Player mit\nVollbildmodus und Untertitelunterstützung",
-        "about_convert_desc": "YouTube-Video-Downloader und\nAudio/Video-Format-Konverter",
-        "about_created": "Erstellt von:",
-        "about_license": "Lizenz:",
-        "about_close": "Schließen"
-    },
-    "it": {
-        "title": "Oply Lettore Audio",
-        "add_files": "Aggiungi File",
-        "add_folder": "Aggiungi Cartella",
-        "save_playlist": "Salva Playlist",
-        "load_playlist": "Carica Playlist",
-        "clear": "Cancella Playlist",
-        "subtitle": "Nessun audio caricato",
-        "playing": "In Riproduzione",
-        "play_pause": "Riproduci/Pausa",
-        "next": "Successivo",
-        "previous": "Precedente",
-        "restore": "Mostra Finestra",
-        "exit": "Esci",
-        "volume": "Volume",
-        "close_dialog_title": "Chiudere Oply?",
-        "close_dialog_message": "Cosa vuoi fare?",
-        "minimize_to_tray": "Riduci a Icona",
-        "quit_app": "Chiudi Applicazione",
-        "youtube_download": "Scarica musica o video da YouTube",
-        "open_radio": "Apri Radio",
-        "open_video": "Apri Video",
-        "about_radio_desc": "Radio online con preferiti,\nindice per paese e supporto tray",
-        "about_iptv_desc": "Pannello IPTV con indice per paese,\nstream live e riproduzione MPV",
-        "about_audio_desc": "Lettore audio avanzato con copertine,\ngestione playlist e supporto barra di sistema",
-        "about_video_desc": "Lettore video leggero con\nsupporto schermo intero e sottotitoli",
-        "about_convert_desc": "Scaricatore video YouTube e\nconvertitore formati audio/video",
-        "about_created": "Creato da:",
-        "about_license": "Licenza:",
-        "about_close": "Chiudi"
-    },
-    "pt": {
-        "title": "Oply Reprodutor de Áudio",
-        "add_files": "Adicionar Arquivos",
-        "add_folder": "Adicionar Pasta",
-        "save_playlist": "Salvar Lista",
-        "load_playlist": "Carregar Lista",
-        "clear": "Limpar Lista",
-        "subtitle": "Nenhum áudio carregado",
-        "playing": "Reproduzindo",
-        "play_pause": "Reproduzir/Pausar",
-        "next": "Próximo",
-        "previous": "Anterior",
-        "restore": "Mostrar Janela",
-        "exit": "Sair",
-        "volume": "Volume",
-        "close_dialog_title": "Fechar Oply?",
-        "close_dialog_message": "O que você deseja fazer?",
-        "minimize_to_tray": "Minimizar para Bandeja",
-        "quit_app": "Sair da Aplicação",
-        "youtube_download": "Baixar música ou vídeo do YouTube",
-        "open_radio": "Abrir Rádio",
-        "open_video": "Abrir Vídeo",
-        "about_radio_desc": "Rádio online com favoritos,\níndice por país e suporte à bandeja",
-        "about_iptv_desc": "Painel IPTV com índice por país,\nstreams ao vivo e reprodução MPV",
-        "about_audio_desc": "Reprodutor de áudio avançado com capas,\ngerenciamento de listas e suporte de bandeja",
-        "about_video_desc": "Reprodutor de vídeo leve com\nsuporte de tela cheia e legendas",
-        "about_convert_desc": "Baixador de vídeos do YouTube e\nconversor de formatos de áudio/vídeo",
-        "about_created": "Criado por:",
-        "about_license": "Licença:",
-        "about_close": "Fechar"
-    },
-    "ru": {
-        "title": "Oply Аудиоплеер",
-        "add_files": "Добавить Файлы",
-        "add_folder": "Добавить Папку",
-        "save_playlist": "Сохранить Плейлист",
-        "load_playlist": "Загрузить Плейлист",
-        "clear": "Очистить Плейлист",
-        "subtitle": "Аудио не загружено",
-        "playing": "Воспроизведение",
-        "play_pause": "Воспроизведение/Пауза",
-        "next": "Следующий",
-        "previous": "Предыдущий",
-        "restore": "Показать Окно",
-        "exit": "Выход",
-        "volume": "Громкость",
-        "close_dialog_title": "Закрыть Oply?",
-        "close_dialog_message": "Что вы хотите сделать?",
-        "minimize_to_tray": "Свернуть в Трей",
-        "quit_app": "Выйти из Приложения",
-        "youtube_download": "Скачать музыку или видео с YouTube",
-        "open_radio": "Открыть радио",
-        "open_video": "Открыть видео",
-        "about_radio_desc": "Онлайн‑радио с избранным,\nиндексом по странам и поддержкой трея",
-        "about_iptv_desc": "IPTV‑панель с индексом по странам,\nпрямыми потоками и воспроизведением MPV",
-        "about_audio_desc": "Расширенный аудиоплеер с обложками,\nуправлением плейлистами и поддержкой трея",
-        "about_video_desc": "Легкий видеоплеер с поддержкой\nполноэкранного режима и субтитров",
-        "about_convert_desc": "Загрузчик видео с YouTube и\nконвертер аудио/видео форматов",
-        "about_created": "Создано:",
-        "about_license": "Лицензия:",
-        "about_close": "Закрыть"
-    },
-    "ja": {
-        "title": "Oply オーディオプレーヤー",
-        "add_files": "ファイルを追加",
-        "add_folder": "フォルダを追加",
-        "save_playlist": "プレイリストを保存",
-        "load_playlist": "プレイリストを読み込む",
-        "clear": "プレイリストをクリア",
-        "subtitle": "オーディオが読み込まれていません",
-        "playing": "再生中",
-        "play_pause": "再生/一時停止",
-        "next": "次へ",
-        "previous": "前へ",
-        "restore": "ウィンドウを表示",
-        "exit": "終了",
-        "volume": "音量",
-        "close_dialog_title": "Oplyを閉じますか？",
-        "close_dialog_message": "何をしますか？",
-        "minimize_to_tray": "トレイに最小化",
-        "quit_app": "アプリケーションを終了",
-        "youtube_download": "YouTubeから音楽または動画をダウンロード",
-        "open_radio": "ラジオを開く",
-        "open_video": "動画を開く",
-        "about_radio_desc": "お気に入り対応のオンラインラジオ、\n国別インデックスとトレイ対応",
-        "about_iptv_desc": "国別インデックス付きIPTV、\nライブ配信とMPV再生",
-        "about_audio_desc": "アルバムアート付き高度なオーディオプレーヤー、\nプレイリスト管理とトレイサポート",
-        "about_video_desc": "フルスクリーンと\n字幕サポート付き軽量ビデオプレーヤー",
-        "about_convert_desc": "YouTubeビデオダウンローダーと\nオーディオ/ビデオフォーマットコンバーター",
-        "about_created": "作成者:",
-        "about_license": "ライセンス:",
-        "about_close": "閉じる"
-    },
-    "zh": {
-        "title": "Oply 音频播放器",
-        "add_files": "添加文件",
-        "add_folder": "添加文件夹",
-        "save_playlist": "保存播放列表",
-        "load_playlist": "加载播放列表",
-        "clear": "清空播放列表",
-        "subtitle": "未加载音频",
-        "playing": "正在播放",
-        "play_pause": "播放/暂停",
-        "next": "下一首",
-        "previous": "上一首",
-        "restore": "显示窗口",
-        "exit": "退出",
-        "volume": "音量",
-        "close_dialog_title": "关闭 Oply？",
-        "close_dialog_message": "您想做什么？",
-        "minimize_to_tray": "最小化到托盘",
-        "quit_app": "退出应用程序",
-        "youtube_download": "从YouTube下载音乐或视频",
-        "open_radio": "打开电台",
-        "open_video": "打开视频",
-        "about_radio_desc": "在线电台播放器，支持收藏、\n按国家索引与托盘",
-        "about_iptv_desc": "IPTV 面板，支持国家索引、\n直播流与 MPV 播放",
-        "about_audio_desc": "高级音频播放器，带专辑封面、\n播放列表管理和托盘支持",
-        "about_video_desc": "轻量级视频播放器，\n支持全屏和字幕",
-        "about_convert_desc": "YouTube视频下载器和\n音频/视频格式转换器",
-        "about_created": "创建者：",
-        "about_license": "许可证：",
-        "about_close": "关闭"
-    },
-    "ar": {
-        "title": "Oply مشغل الصوت",
-        "add_files": "إضافة ملفات",
-        "add_folder": "إضافة مجلد",
-        "save_playlist": "حفظ قائمة التشغيل",
-        "load_playlist": "تحميل قائمة التشغيل",
-        "clear": "مسح قائمة التشغيل",
-        "subtitle": "لم يتم تحميل صوت",
-        "playing": "قيد التشغيل",
-        "play_pause": "تشغيل/إيقاف مؤقت",
-        "next": "التالي",
-        "previous": "السابق",
-        "restore": "إظهار النافذة",
-        "exit": "خروج",
-        "volume": "مستوى الصوت",
-        "close_dialog_title": "إغلاق Oply؟",
-        "close_dialog_message": "ماذا تريد أن تفعل؟",
-        "minimize_to_tray": "تصغير إلى الدرج",
-        "quit_app": "إنهاء التطبيق",
-        "youtube_download": "تحميل موسيقى أو فيديو من يوتيوب",
-        "open_radio": "فتح الراديو",
-        "open_video": "فتح الفيديو",
-        "about_radio_desc": "مشغّل راديو عبر الإنترنت مع المفضلة،\nفهرس حسب البلد ودعم صينية النظام",
-        "about_iptv_desc": "لوحة IPTV مع فهرس حسب البلد،\nبث مباشر وتشغيل عبر MPV",
-        "about_audio_desc": "مشغل صوت متقدم مع أغلفة الألبومات،\nإدارة قوائم التشغيل ودعم الدرج",
-        "about_video_desc": "مشغل فيديو خفيف مع\nدعم وضع ملء الشاشة والترجمات",
-        "about_convert_desc": "محمل فيديو يوتيوب ومحول\nتنسيقات الصوت/الفيديو",
-        "about_created": "صنع بواسطة:",
-        "about_license": "الترخيص:",
-        "about_close": "إغلاق"
-    },
-    "ko": {
-        "title": "Oply 오디오 플레이어",
-        "add_files": "파일 추가",
-        "add_folder": "폴더 추가",
-        "save_playlist": "재생목록 저장",
-        "load_playlist": "재생목록 불러오기",
-        "clear": "재생목록 지우기",
-        "subtitle": "오디오가 로드되지 않음",
-        "playing": "재생 중",
-        "play_pause": "재생/일시정지",
-        "next": "다음",
-        "previous": "이전",
-        "restore": "창 표시",
-        "exit": "종료",
-        "volume": "볼륨",
-        "close_dialog_title": "Oply를 닫으시겠습니까?",
-        "close_dialog_message": "무엇을 하시겠습니까?",
-        "minimize_to_tray": "트레이로 최소화",
-        "quit_app": "애플리케이션 종료",
-        "youtube_download": "YouTube에서 음악 또는 비디오 다운로드",
-        "open_radio": "라디오 열기",
-        "open_video": "비디오 열기",
-        "about_radio_desc": "즐겨찾기 지원 온라인 라디오,\n국가 인덱스 및 트레이 지원",
-        "about_iptv_desc": "국가 인덱스 IPTV 패널,\n라이브 스트림 및 MPV 재생",
-        "about_audio_desc": "앨범 아트, 재생목록 관리 및\n트레이 지원이 있는 고급 오디오 플레이어",
-        "about_video_desc": "전체화면 및 자막을\n지원하는 경량 비디오 플레이어",
-        "about_convert_desc": "YouTube 비디오 다운로더 및\n오디오/비디오 형식 변환기",
-        "about_created": "제작자:",
-        "about_license": "라이선스:",
-        "about_close": "닫기"
-    },
-    "pl": {
-        "title": "Oply Odtwarzacz Audio",
-        "add_files": "Dodaj Pliki",
-        "add_folder": "Dodaj Folder",
-        "save_playlist": "Zapisz Playlistę",
-        "load_playlist": "Załaduj Playlistę",
-        "clear": "Wyczyść Playlistę",
-        "subtitle": "Nie załadowano audio",
-        "playing": "Odtwarzanie",
-        "play_pause": "Odtwarzanie/Pauza",
-        "next": "Następny",
-        "previous": "Poprzedni",
-        "restore": "Pokaż Okno",
-        "exit": "Wyjście",
-        "volume": "Głośność",
-        "close_dialog_title": "Zamknąć Oply?",
-        "close_dialog_message": "Co chcesz zrobić?",
-        "minimize_to_tray": "Minimalizuj do Zasobnika",
-        "quit_app": "Zakończ Aplikację",
-        "youtube_download": "Pobierz muzykę lub wideo z YouTube",
-        "open_radio": "Otwórz radio",
-        "open_video": "Otwórz wideo",
-        "about_radio_desc": "Radio online z ulubionymi,\nindeksem krajów i obsługą zasobnika",
-        "about_iptv_desc": "Panel IPTV z indeksem krajów,\ntransmisjami na żywo i odtwarzaniem MPV",
-        "about_audio_desc": "Zaawansowany odtwarzacz audio z okładkami,\nzarządzaniem playlistami i wsparciem zasobnika",
-        "about_video_desc": "Lekki odtwarzacz wideo z\nwsparciem pełnego ekranu i napisów",
-        "about_convert_desc": "Pobieracz wideo YouTube i\nkonwerter formatów audio/wideo",
-        "about_created": "Stworzony przez:",
-        "about_license": "Licencja:",
-        "about_close": "Zamknij"
-    }
-}
+# Los textos de cada idioma están en i18n/<idioma>.json (ver oply_i18n.py)
 
 def load_language():
     """Detecta el idioma del sistema automáticamente"""
@@ -488,8 +143,8 @@ def load_language():
             with open(LANG_FILE, 'r') as f:
                 config = json.load(f)
                 lang = config.get("language", "")
-                if lang and lang in LANGUAGES:
-                    return LANGUAGES[lang]
+                if has_language("oply", lang):
+                    return catalog("oply", lang)
     except:
         pass
     
@@ -499,11 +154,11 @@ def load_language():
     if lang_env and lang_env != 'C' and lang_env != 'POSIX':
 
         lang_code = lang_env.split('_')[0].lower()
-        if lang_code in LANGUAGES:
-            return LANGUAGES[lang_code]
+        if has_language("oply", lang_code):
+            return catalog("oply", lang_code)
     
 
-    return LANGUAGES["en"]
+    return catalog("oply", "en")
 
 def save_language(lang_code):
     """Guarda el idioma seleccionado manualmente"""
@@ -531,134 +186,57 @@ def save_config(last_playlist=""):
     except Exception as e:
         print(f"Error saving config: {e}")
 
-def format_duration(seconds):
-    seconds = int(seconds)
-    return time.strftime('%H:%M:%S', time.gmtime(seconds))
-
-def get_metadata(filepath):
-    try:
-        cmd = [
-            "ffprobe", "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            filepath
-        ]
-        dur_res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        duration = float(dur_res.stdout.strip()) if dur_res.returncode == 0 else 0
-
-        cmd_title = [
-            "ffprobe", "-v", "error",
-            "-show_entries", "format_tags=title",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            filepath
-        ]
-        title_res = subprocess.run(cmd_title, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        title = title_res.stdout.strip() if title_res.returncode == 0 and title_res.stdout.strip() else os.path.basename(filepath)
-
-
-        cmd_artist = [
-            "ffprobe", "-v", "error",
-            "-show_entries", "format_tags=artist",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            filepath
-        ]
-        artist_res = subprocess.run(cmd_artist, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        artist = artist_res.stdout.strip() if artist_res.returncode == 0 else ""
-
-        cmd_album = [
-            "ffprobe", "-v", "error",
-            "-show_entries", "format_tags=album",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            filepath
-        ]
-        album_res = subprocess.run(cmd_album, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        album = album_res.stdout.strip() if album_res.returncode == 0 else ""
-
-
-        if not artist and not album:
-            filename = os.path.basename(filepath)
-            name_without_ext = os.path.splitext(filename)[0]
-
+# Columnas del modelo de la lista de reproducción
+COL_NAME, COL_ARTIST, COL_DURATION, COL_ALBUM, COL_FILLED = range(5)
 
-            if ' - ' in name_without_ext:
-                parts = name_without_ext.split(' - ')
-                if len(parts) >= 2:
-                    artist = parts[0].strip()
-                   
-                    if len(parts) >= 3:
-                        album = parts[1].strip()
-
-        return {"title": title, "duration": duration, "artist": artist, "album": album}
-    except:
-        return {"title": os.path.basename(filepath), "duration": 0, "artist": "", "album": ""}
-
-
-def detect_embedded_cover_ext(filepath):
-    """Devuelve 'jpg' o 'png' si hay carátula embebida (stream v:0); si no, None."""
-    try:
-        cmd = [
-            "ffprobe", "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=codec_name",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            filepath
-        ]
-        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=3)
-        codec = (res.stdout or "").strip().lower()
-        if not codec:
-            return None
-        if "png" in codec:
-            return "png"
-
-        return "jpg"
-    except:
-        return None
-
-def extract_cover_art(filepath, out_base_no_ext):
-    """
-    Extrae carátula embebida del audio.
-    Retorna (True, output_path) si pudo; si no, (False, None)
-    """
-    try:
-        ext = detect_embedded_cover_ext(filepath)
-        if not ext:
-            return (False, None)
+# Desde cuántas filas borradas conviene rearmar la lista en una pasada
+BULK_REMOVE_ROWS = 64
 
+# Caché de metadatos (ruta, mtime, tamaño) -> título/artista/álbum/duración
+METADATA_CACHE = MetadataCache(METADATA_DB)
 
-        for e in ("jpg", "png"):
-            p = f"{out_base_no_ext}.{e}"
-            if os.path.exists(p):
-                try:
-                    os.remove(p)
-                except:
-                    pass
-
-        output_path = f"{out_base_no_ext}.{ext}"
-
+def get_metadata(filepath):
+    return METADATA_CACHE.lookup(filepath)
 
-        cmd = [
-            "ffmpeg", "-y", "-i", filepath,
-            "-map", "0:v:0",
-            "-frames:v", "1",
-            output_path
-        ]
-        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=5)
+# Biblioteca: pistas de las carpetas agregadas, con índice de búsqueda
+LIBRARY = Library(LIBRARY_DB)
 
-        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-            return (True, output_path)
+# Miniaturas de carátulas (disco con cuota + LRU en memoria)
+COVER_CACHE = CoverCache(COVERS_DIR, size=280)
 
-        return (False, None)
-    except:
-        return (False, None)
+# Carátulas de iTunes por (artista, álbum), recordando también los fallos
+ONLINE_COVERS = OnlineCoverLookup(os.path.join(COVERS_DIR, "online.db"), COVER_CACHE)
 
+def format_duration(seconds):
+    seconds = int(seconds)
+    return time.strftime('%H:%M:%S', time.gmtime(seconds))
 
 class AudioVisualizer(Gtk.DrawingArea):
-    def __init__(self):
+    SPACING = 2
+
+    def __init__(self, live=False, on_active_changed=None):
+        """
+        live=True: las barras llegan de SpectrumAnalyzer por set_bands()
+        on_active_changed(bool): avisa cuando el widget deja de verse o vuelve
+        """
         super().__init__()
         self.set_size_request(280, 80)
         self.bars = [0] * 32  
         self.animation_id = None
         self.is_playing = False
+        self.live = live
+        self.suspended = False
+        self.on_active_changed = on_active_changed
+        # Alto en píxeles de cada barra en el último dibujo
+        self._drawn = [0] * len(self.bars)
+
+        # Un degradado por zona de color, en coordenadas de barra (0..1);
+        # on_draw los escala a cada barra en lugar de crear uno por frame
+        self._gradients = [self._make_gradient(r, g, b) for r, g, b in (
+            (0.2, 0.4, 0.8),
+            (0.4, 0.8, 0.2),
+            (0.8, 0.6, 0.2),
+        )]
         
 
         self.set_property("height-request", 80)
@@ -667,25 +245,63 @@ class AudioVisualizer(Gtk.DrawingArea):
         
 
         self.connect("draw", self.on_draw)
+        self.connect("map", lambda w: self._update_timer())
+        self.connect("unmap", lambda w: self._update_timer())
+
+    @staticmethod
+    def _make_gradient(r, g, b):
+        gradient = cairo.LinearGradient(0, 0, 0, 1)
+        gradient.add_color_stop_rgba(0, r, g, b, 0.9)
+        gradient.add_color_stop_rgba(0.7, r * 0.7, g * 0.7, b * 0.7, 0.7)
+        gradient.add_color_stop_rgba(1, r * 0.4, g * 0.4, b * 0.4, 0.5)
+        return gradient
+
+    @property
+    def active(self):
+        """Visible en pantalla: mapeado y con la ventana sin minimizar"""
+        return self.get_mapped() and not self.suspended
+
+    def set_suspended(self, suspended):
+        """Ventana minimizada: se para la animación aunque el widget siga mapeado"""
+        self.suspended = suspended
+        self._update_timer()
+
+    def _update_timer(self):
+        """El timer corre solo si hay reproducción y el widget se ve"""
+        run = self.is_playing and self.active
+        if self.live:
+            pass
+        elif run and self.animation_id is None:
+            self.animation_id = GLib.timeout_add(100, self.update_bars)
+        elif not run and self.animation_id is not None:
+            GLib.source_remove(self.animation_id)
+            self.animation_id = None
+        if self.on_active_changed:
+            self.on_active_changed(self.active)
         
     def start_animation(self):
         """Iniciar animación del ecualizador"""
-        if self.animation_id is None:
-            self.is_playing = True
-            self.animation_id = GLib.timeout_add(100, self.update_bars)
+        self.is_playing = True
+        self._update_timer()
             
     def stop_animation(self):
         """Detener animación"""
         self.is_playing = False
-        if self.animation_id:
-            GLib.source_remove(self.animation_id)
-            self.animation_id = None
+        self._update_timer()
         self.bars = [0] * 32
-        self.queue_draw()
+        self._queue_changed_bars()
+
+    def set_bands(self, bands):
+        """Niveles 0..1 por banda calculados por el analizador (loop principal)"""
+        if self.is_playing and self.active:
+            self.bars = bands
+            self._queue_changed_bars()
+        return False
     
     def update_bars(self):
         """Actualizar valores de las barras (simulando ritmo de música)"""
         if not self.is_playing:
+            self.animation_id = None
             return False
             
 
@@ -707,8 +323,29 @@ class AudioVisualizer(Gtk.DrawingArea):
                     
                     self.bars[i] = min(1.0, self.bars[i] + random.uniform(0.1, 0.3) * frequency_factor)
         
-        self.queue_draw()
+        self._queue_changed_bars()
         return True
+
+    def _bar_x(self, i, bar_width):
+        return 10 + i * (bar_width + self.SPACING)
+
+    def _queue_changed_bars(self):
+        """Invalidar solo las barras cuyo alto en píxeles cambió"""
+        width = self.get_allocated_width()
+        height = self.get_allocated_height()
+        bar_width = (width - 20) / len(self.bars)
+        usable = height - 20
+
+        run_start = None
+        for i, level in enumerate(self.bars + [None]):
+            changed = level is not None and int(level * usable) != self._drawn[i]
+            if changed and run_start is None:
+                run_start = i
+            elif not changed and run_start is not None:
+                x0 = int(self._bar_x(run_start, bar_width))
+                x1 = int(self._bar_x(i - 1, bar_width) + bar_width) + 1
+                self.queue_draw_area(x0, 0, x1 - x0, height)
+                run_start = None
     
     def on_draw(self, widget, cr):
         """Dibujar el ecualizador"""
@@ -723,30 +360,32 @@ class AudioVisualizer(Gtk.DrawingArea):
 
         bar_count = len(self.bars)
         bar_width = (width - 20) / bar_count
-        spacing = 2
+        clip_x0, _y0, clip_x1, _y1 = cr.clip_extents()
         
         for i, bar_height in enumerate(self.bars):
-            x = 10 + i * (bar_width + spacing)
-            bar_h = bar_height * (height - 20)
-            
+            x = self._bar_x(i, bar_width)
+            if x > clip_x1 or x + bar_width < clip_x0:
+                continue
+            bar_h = int(bar_height * (height - 20))
+            self._drawn[i] = bar_h
+            if bar_h <= 0 or bar_width <= 0:
+                continue
 
             if i < 8: 
-                r, g, b = 0.2, 0.4, 0.8
+                gradient = self._gradients[0]
             elif i < 24: 
-                r, g, b = 0.4, 0.8, 0.2
+                gradient = self._gradients[1]
             else:  
-                r, g, b = 0.8, 0.6, 0.2
-            
-   
-            import cairo
-            gradient = cairo.LinearGradient(x, height - bar_h, x, height)
-            gradient.add_color_stop_rgba(0, r, g, b, 0.9)
-            gradient.add_color_stop_rgba(0.7, r * 0.7, g * 0.7, b * 0.7, 0.7)
-            gradient.add_color_stop_rgba(1, r * 0.4, g * 0.4, b * 0.4, 0.5)
+                gradient = self._gradients[2]
             
+            cr.save()
+            cr.translate(x, height - bar_h)
+            cr.scale(bar_width, bar_h)
             cr.set_source(gradient)
-            cr.rectangle(x, height - bar_h, bar_width, bar_h)
+            cr.rectangle(0, 0, 1, 1)
+            # fill() antes de restore(): la fuente (el degradado) es parte del estado guardado
             cr.fill()
+            cr.restore()
             
 
             cr.set_source_rgba(1, 1, 1, 0.3)
@@ -780,11 +419,34 @@ class OplyPlayer(Gtk.Window):
                 pass
 
 
-        self.audio_files = []
+        # Rutas de la lista (carpetas compartidas, ver oply_pathlist)
+        self.audio_files = PathList()
+        # Qué suena después: cola, aleatorio e historial (ver oply_playorder)
+        self.order = PlayOrder()
         self.current_index = 0
         self.is_paused = False
         self.duration = 0
         self.updating_progress = True
+        self.current_metadata = None
+        self.scanner = None
+        self.playlist_loader = None
+        self.library_indexer = None
+        self._library_pending = []
+        # (índice, ruta) de la pista precargada en la playlist de mpv
+        self._queued_next = None
+
+        # Columnas extra de la lista: se completan solo para filas visibles
+        self._fill_source = None
+        self._visible_range = (0, -1)
+        self._rows_pending = set()
+        self._row_info_queue = queue.Queue()
+        threading.Thread(target=self._row_info_worker, daemon=True).start()
+
+        # Metadatos y carátula se resuelven en un hilo aparte; el token
+        # permite descartar resultados de pistas que ya no suenan
+        self._track_token = 0
+        self._info_queue = queue.Queue()
+        threading.Thread(target=self._track_info_worker, daemon=True).start()
 
 
         self.mpv_socket = os.path.join(CONFIG_DIR, f"mpv_socket_{os.getpid()}")
@@ -872,13 +534,15 @@ class OplyPlayer(Gtk.Window):
         self.setup_systray()
 
 
-        GLib.timeout_add(1000, self.update_progress)
-        GLib.timeout_add(200, self.update_playback_info)
+        self.setup_mpv_observers()
 
+        # La biblioteca se pone al día cuando la ventana ya está andando
+        GLib.timeout_add_seconds(5, lambda: (self.update_library(), False)[1])
 
         self.connect("delete-event", self.on_window_delete)
         self.connect("destroy", self.on_destroy)
         self.show_all()
+        startup_trace("window shown")
 
     def setup_mpv(self):
         self.mpv = subprocess.Popen(
@@ -891,34 +555,38 @@ class OplyPlayer(Gtk.Window):
                 "--audio-display=no",
                 "--volume=50",
                 "--keep-open=no",
-                "--pause=no" 
+                "--pause=no",
+                # La siguiente pista ya está en la playlist de mpv: se abre
+                # por adelantado y el cambio es sin silencio
+                "--gapless-audio=weak",
+                "--prefetch-playlist=yes"
             ],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE
         )
-        time.sleep(0.8)  
+        startup_trace("mpv launched")
+
+        # Una sola conexión con mpv para toda la vida del reproductor.
+        # No se espera al socket: mpv arranca mientras se construye la
+        # ventana y los comandos enviados antes quedan en cola.
+        self.mpv_ipc = MpvIpcClient(self.mpv_socket, is_alive=lambda: self.mpv.poll() is None)
+        self.mpv_ipc.start()
+        threading.Thread(target=self._wait_mpv_ready, daemon=True).start()
+
+    def _wait_mpv_ready(self):
+        elapsed = self.mpv_ipc.wait_ready(timeout=10.0)
+        if elapsed is None:
+            print("Warning: mpv did not answer on its IPC socket within 10 s")
+            return
+        startup_trace(f"player ready (mpv answered {elapsed * 1000:.0f} ms after launch)")
 
-    def send_mpv_command(self, command):
-        if not hasattr(self, 'mpv') or not os.path.exists(self.mpv_socket):
+    def send_mpv_command(self, command, callback=None):
+        """Enviar un comando por la conexión IPC persistente (no bloquea)"""
+        if not hasattr(self, 'mpv_ipc'):
             return False
-
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
-                    s.settimeout(2.0)
-                    s.connect(self.mpv_socket)
-                    s.sendall(json.dumps(command).encode() + b"\n")
-                    return True
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(0.2)
-                else:
-                    print(f"MPV command error after {max_retries} attempts: {e}")
-                    return False
-
-        return False
+        self.mpv_ipc.command(command["command"], callback=callback)
+        return True
 
     def setup_systray(self):
         """Configurar systray con AyatanaAppIndicator3"""
@@ -1028,6 +696,8 @@ class OplyPlayer(Gtk.Window):
     def restore_window(self):
         """Restaurar ventana desde el systray"""
         self.show_all()
+        # show_all() también mostraría el visualizador si estaba apagado
+        self.visualizer.set_visible(self.btn_viz.get_active())
         self.present()
 
     def minimize_to_tray(self):
@@ -1053,26 +723,33 @@ class OplyPlayer(Gtk.Window):
     def on_drag_data_received(self, widget, drag_context, x, y, data, info, time):
         uris = data.get_uris()
         if uris:
+            files = []
+            folders = []
             for uri in uris:
                 path = uri.replace("file://", "")
                 import urllib.parse
                 path = urllib.parse.unquote(path)
 
                 if os.path.isfile(path):
-                    self.audio_files.append(path)
+                    files.append(path)
                 elif os.path.isdir(path):
-                    for fmt in SUPPORTED_FORMATS:
-                        self.audio_files.extend(glob.glob(os.path.join(path, fmt)))
+                    folders.append(path)
 
-            self.refresh_listbox()
-            if self.audio_files and not self.is_paused:
-                self.play_audio()
+            if files:
+                self.audio_files.extend(files)
+                self.append_to_listbox(files)
+                if not self.is_paused:
+                    self.play_audio()
+
+            if folders:
+                self.start_scan(folders, play_when_ready=not files and not self.is_paused)
 
     def create_menu(self):
         menu = Gio.Menu()
         menu.append(self.TEXT["save_playlist"], "win.save")
         menu.append(self.TEXT["load_playlist"], "win.load")
         menu.append(self.TEXT["clear"], "win.clear")
+        menu.append(self.TEXT.get("shuffle", "Shuffle"), "win.shuffle")
         menu.append(self.TEXT.get("tv_make_index", "TV: Create index"), "win.tv_index")
         menu.append("About Oply", "win.about")
 
@@ -1094,6 +771,10 @@ class OplyPlayer(Gtk.Window):
         clear_action.connect("activate", lambda a, p: self.on_clear(None))
         action_group.add_action(clear_action)
 
+        shuffle_action = Gio.SimpleAction.new_stateful("shuffle", None, GLib.Variant.new_boolean(False))
+        shuffle_action.connect("change-state", self._on_shuffle_toggled)
+        action_group.add_action(shuffle_action)
+
         tv_index_action = Gio.SimpleAction.new("tv_index", None)
         tv_index_action.connect("activate", lambda a, p: self.on_tv_make_index())
         action_group.add_action(tv_index_action)
@@ -1104,6 +785,10 @@ class OplyPlayer(Gtk.Window):
 
         self.insert_action_group("win", action_group)
 
+    def _on_shuffle_toggled(self, action, value):
+        action.set_state(value)
+        self.set_shuffle(value.get_boolean())
+
     def on_tv_make_index(self):
         locales = self._get_available_locales()
 
@@ -1286,8 +971,22 @@ class OplyPlayer(Gtk.Window):
         ecualizador_box.pack_start(lbl_eq, False, False, 0)
         
       
-        self.visualizer = AudioVisualizer()
+        # Espectro real de la pista (FFT); sin NumPy o sin ffmpeg quedan las barras simuladas
+        self.spectrum = None
+        if NUMPY_AVAILABLE and FFMPEG_AVAILABLE:
+            self.spectrum = SpectrumAnalyzer(
+                lambda bands: GLib.idle_add(self.visualizer.set_bands, bands)
+            )
+        elif not NUMPY_AVAILABLE:
+            print("Warning: python3-numpy not available. The visualizer will show simulated bars.")
+        else:
+            print("Warning: ffmpeg not available. The visualizer will show simulated bars.")
+
+        self.visualizer = AudioVisualizer(live=self.spectrum is not None,
+                                          on_active_changed=self._on_visualizer_active)
         ecualizador_box.pack_start(self.visualizer, False, False, 0)
+        # Minimizada la ventana el visualizador sigue mapeado: se suspende aparte
+        self.connect("window-state-event", self._on_window_state)
         
         left_panel.pack_start(ecualizador_box, False, False, 0)
 
@@ -1317,18 +1016,61 @@ class OplyPlayer(Gtk.Window):
         scrolled.set_hexpand(True)
         scrolled.set_vexpand(True)
 
-        self.liststore = Gtk.ListStore(str)
+        # nombre, artista, duración, álbum, metadatos ya cargados
+        self.liststore = Gtk.ListStore(str, str, str, str, bool)
         self.treeview = Gtk.TreeView(model=self.liststore)
         self.treeview.set_headers_visible(False)
-
-        renderer = Gtk.CellRendererText()
-        column = Gtk.TreeViewColumn("Archivo", renderer, text=0)
-        self.treeview.append_column(column)
+        self.treeview.get_selection().set_mode(Gtk.SelectionMode.MULTIPLE)
+
+        # Columnas de ancho fijo: permite fixed-height-mode, así GTK solo
+        # mide y dibuja las filas visibles aunque la lista sea enorme
+        for title, col, width, expand in (
+            ("Archivo", COL_NAME, 260, True),
+            ("Artista", COL_ARTIST, 150, False),
+            ("Duración", COL_DURATION, 70, False),
+            ("Álbum", COL_ALBUM, 150, False),
+        ):
+            renderer = Gtk.CellRendererText()
+            renderer.set_property("ellipsize", Pango.EllipsizeMode.END)
+            if col != COL_NAME:
+                renderer.set_property("foreground", "gray")
+            column = Gtk.TreeViewColumn(title, renderer, text=col)
+            column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+            column.set_fixed_width(width)
+            column.set_expand(expand)
+            column.set_resizable(True)
+            self.treeview.append_column(column)
+        self.treeview.set_fixed_height_mode(True)
 
         self.treeview.connect("row-activated", self.on_row_activated)
+        self.treeview.connect("key-press-event", self.on_playlist_key_press)
+        self.treeview.connect("button-press-event", self.on_playlist_button_press)
+        self.treeview.connect("size-allocate", lambda *a: self._schedule_visible_fill())
+        scrolled.get_vadjustment().connect("value-changed", lambda *a: self._schedule_visible_fill())
 
         scrolled.add(self.treeview)
-        content_box.pack_start(scrolled, True, True, 0)
+
+        playlist_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.setup_library_search(playlist_box)
+        playlist_box.pack_start(scrolled, True, True, 0)
+
+        # Progreso del escaneo de carpetas
+        self.scan_bar = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        self.scan_spinner = Gtk.Spinner()
+        self.scan_bar.pack_start(self.scan_spinner, False, False, 0)
+        self.scan_label = Gtk.Label(label="")
+        self.scan_label.set_halign(Gtk.Align.START)
+        self.scan_label.get_style_context().add_class("dim-label")
+        self.scan_bar.pack_start(self.scan_label, True, True, 0)
+        btn_cancel_scan = Gtk.Button(label=self.TEXT.get("cancel", "Cancel"))
+        btn_cancel_scan.connect("clicked", self.cancel_scan)
+        self.scan_bar.pack_end(btn_cancel_scan, False, False, 0)
+        for child in self.scan_bar.get_children():
+            child.show()
+        self.scan_bar.set_no_show_all(True)
+        playlist_box.pack_start(self.scan_bar, False, False, 0)
+
+        content_box.pack_start(playlist_box, True, True, 0)
 
       
         self.progress_scale = Gtk.Scale.new_with_range(Gtk.Orientation.HORIZONTAL, 0, 100, 1)
@@ -1418,6 +1160,17 @@ class OplyPlayer(Gtk.Window):
             self.visualizer.hide()
             self.visualizer.stop_animation()
 
+    def _on_visualizer_active(self, active):
+        # Sin visualizador a la vista no se decodifica para el espectro
+        if self.spectrum:
+            self.spectrum.set_enabled(active)
+
+    def _on_window_state(self, widget, event):
+        iconified = bool(event.new_window_state & Gdk.WindowState.ICONIFIED)
+        if iconified != self.visualizer.suspended:
+            self.visualizer.set_suspended(iconified)
+        return False
+
     def show_about(self):
         """Mostrar diálogo About"""
         dialog = Gtk.Dialog(
@@ -1527,9 +1280,347 @@ class OplyPlayer(Gtk.Window):
         dialog.destroy()
 
     def refresh_listbox(self):
+        """Reconstrucción completa (solo al cargar listas enteras)"""
+        # Sin modelo conectado la vista no procesa una señal por fila
+        self.treeview.set_model(None)
         self.liststore.clear()
-        for filepath in self.audio_files:
-            self.liststore.append([os.path.basename(filepath)])
+        for index in range(len(self.audio_files)):
+            self.liststore.append([self.audio_files.name(index), "", "", "", False])
+        self.treeview.set_model(self.liststore)
+        self._schedule_visible_fill()
+
+    def append_to_listbox(self, files, metas=None, filled=None):
+        """
+        metas: metadatos ya conocidos por archivo (o None), p. ej. de una lista guardada
+        filled: por archivo, si esos metadatos son definitivos (por omisión, sí)
+        Las filas corresponden a los archivos recién agregados al final de audio_files.
+        """
+        self.order.extend(len(files))
+        for i, filepath in enumerate(files):
+            meta = metas[i] if metas else None
+            if meta is None:
+                self.liststore.append([os.path.basename(filepath), "", "", "", False])
+            else:
+                duration = meta.get("duration") or 0
+                self.liststore.append([os.path.basename(filepath), meta.get("artist", ""),
+                                       format_duration(duration) if duration else "",
+                                       meta.get("album", ""), filled[i] if filled else True])
+        self._schedule_visible_fill()
+        if self._queued_next is not None:
+            self._queue_next_track()
+
+    def clear_playlist(self):
+        if self.playlist_loader is not None:
+            self.playlist_loader.cancel()
+            self.playlist_loader = None
+        self.audio_files.clear()
+        self.order.clear()
+        self.current_index = 0
+        self.liststore.clear()
+
+    def remove_from_playlist(self, indices):
+        """Quitar filas sueltas; si son muchas, se rearma la lista en una pasada"""
+        playing = self.audio_files[self.current_index] if self.current_index < len(self.audio_files) else None
+        removed_current = False
+        gone = {i for i in indices if 0 <= i < len(self.audio_files)}
+        self.order.remove(gone)
+        if len(gone) >= BULK_REMOVE_ROWS:
+            # Cada del/remove suelto mueve toda la cola de la lista: O(n·m)
+            removed_current = self.current_index in gone
+            self.current_index -= sum(1 for i in gone if i < self.current_index)
+            kept = [path for i, path in enumerate(self.audio_files) if i not in gone]
+            rows = [row[:] for i, row in enumerate(self.liststore) if i not in gone]
+            self.audio_files.clear()
+            self.audio_files.extend(kept)
+            self.treeview.set_model(None)
+            self.liststore.clear()
+            for row in rows:
+                self.liststore.append(row)
+            self.treeview.set_model(self.liststore)
+        else:
+            for index in sorted(gone, reverse=True):
+                del self.audio_files[index]
+                self.liststore.remove(self.liststore.get_iter(Gtk.TreePath.new_from_indices([index])))
+                if index < self.current_index:
+                    self.current_index -= 1
+                elif index == self.current_index:
+                    removed_current = True
+
+        if not self.audio_files:
+            self.current_index = 0
+            self.stop_audio()
+        elif removed_current or playing is None:
+            self.current_index = min(self.current_index, len(self.audio_files) - 1)
+        if self._queued_next is not None:
+            self._queue_next_track()
+        self._schedule_visible_fill()
+
+    def on_playlist_key_press(self, widget, event):
+        if event.keyval == Gdk.KEY_Delete:
+            model, paths = self.treeview.get_selection().get_selected_rows()
+            if paths:
+                self.remove_from_playlist([p.get_indices()[0] for p in paths])
+            return True
+        return False
+
+    def on_playlist_button_press(self, widget, event):
+        if event.type != Gdk.EventType.BUTTON_PRESS or event.button != 3:
+            return False
+        hit = self.treeview.get_path_at_pos(int(event.x), int(event.y))
+        if hit is None:
+            return False
+        selection = self.treeview.get_selection()
+        if not selection.path_is_selected(hit[0]):
+            selection.unselect_all()
+            selection.select_path(hit[0])
+
+        menu = Gtk.Menu()
+        for label, priority in ((self.TEXT.get("play_next", "Play next"), PLAY_NEXT),
+                                (self.TEXT.get("play_later", "Play later"), PLAY_LATER)):
+            item = Gtk.MenuItem(label=label)
+            item.connect("activate", lambda w, p=priority: self.enqueue_selected(p))
+            menu.append(item)
+        menu.show_all()
+        menu.attach_to_widget(self.treeview, None)
+        menu.popup_at_pointer(event)
+        return True
+
+    def enqueue_selected(self, priority):
+        model, paths = self.treeview.get_selection().get_selected_rows()
+        self.order.enqueue(sorted(p.get_indices()[0] for p in paths), priority)
+        if self._queued_next is not None:
+            self._queue_next_track()
+
+    def _schedule_visible_fill(self):
+        if self._fill_source is None:
+            self._fill_source = GLib.timeout_add(80, self._fill_visible_rows)
+
+    def _fill_visible_rows(self):
+        """Completar artista/duración/álbum solo de las filas que se ven"""
+        self._fill_source = None
+        visible = self.treeview.get_visible_range()
+        if not visible:
+            return False
+        start, end = visible[0].get_indices()[0], visible[1].get_indices()[0]
+        self._visible_range = (start, end)
+
+        pending = []
+        for index in range(start, min(end + 1, len(self.audio_files))):
+            row = self.liststore[index]
+            if not row[COL_FILLED]:
+                pending.append((index, self.audio_files[index]))
+        if not pending:
+            return False
+
+        cached = METADATA_CACHE.get_many([path for _, path in pending])
+        for index, path in pending:
+            meta = cached.get(path)
+            if meta is not None:
+                self._set_row_metadata(index, path, meta)
+            elif path not in self._rows_pending:
+                # Sin caché: se lee en segundo plano y se completa al volver
+                self._rows_pending.add(path)
+                self._row_info_queue.put((index, path))
+        return False
+
+    def _row_info_worker(self):
+        while True:
+            index, path = self._row_info_queue.get()
+            start, end = self._visible_range
+            if not start <= index <= end:
+                # Ya no se ve: se volverá a pedir si aparece de nuevo
+                GLib.idle_add(self._on_row_info, index, path, None)
+                continue
+            try:
+                meta = get_metadata(path)
+            except Exception:
+                meta = None
+            GLib.idle_add(self._on_row_info, index, path, meta)
+
+    def _on_row_info(self, index, path, meta):
+        self._rows_pending.discard(path)
+        if meta is not None:
+            self._set_row_metadata(index, path, meta)
+        return False
+
+    def _set_row_metadata(self, index, path, meta):
+        # La fila pudo moverse o borrarse mientras tanto
+        if index >= len(self.audio_files) or self.audio_files[index] != path:
+            return
+        it = self.liststore.get_iter(Gtk.TreePath.new_from_indices([index]))
+        duration = meta.get("duration") or 0
+        self.liststore.set(it,
+                           [COL_ARTIST, COL_DURATION, COL_ALBUM, COL_FILLED],
+                           [meta.get("artist", ""),
+                            format_duration(duration) if duration else "",
+                            meta.get("album", ""),
+                            True])
+
+    def start_scan(self, folders, play_when_ready=False):
+        """Escanear carpetas (recursivo) sin bloquear la ventana"""
+        if self.scanner is not None:
+            self.scanner.cancel()
+
+        self._scan_play_when_ready = play_when_ready
+        self.scanner = LibraryScanner(
+            folders,
+            SUPPORTED_EXTENSIONS,
+            on_batch=lambda sc, files: GLib.idle_add(self._on_scan_batch, sc, files),
+            on_progress=lambda sc, dirs, found: GLib.idle_add(self._on_scan_progress, sc, dirs, found),
+            on_done=lambda sc, cancelled: GLib.idle_add(self._on_scan_done, sc, cancelled),
+        )
+        self.scan_spinner.start()
+        self.scan_label.set_text(self.TEXT.get("scanning", "Scanning: {files} files in {dirs} folders").format(files=0, dirs=0))
+        self.scan_bar.show()
+        self.scanner.start()
+
+    def cancel_scan(self, *args):
+        if self.scanner is not None:
+            self.scanner.cancel()
+
+    def _on_scan_batch(self, scanner, files):
+        if scanner is not self.scanner or scanner.cancelled:
+            return False
+        was_empty = len(self.audio_files) == 0
+        self.audio_files.extend(files)
+        self.append_to_listbox(files)
+        if was_empty and self._scan_play_when_ready:
+            self._scan_play_when_ready = False
+            self.current_index = 0
+            self.play_audio()
+        return False
+
+    def _on_scan_progress(self, scanner, dirs, found):
+        if scanner is self.scanner:
+            self.scan_label.set_text(
+                self.TEXT.get("scanning", "Scanning: {files} files in {dirs} folders").format(files=found, dirs=dirs)
+            )
+        return False
+
+    def _on_scan_done(self, scanner, cancelled):
+        if scanner is not self.scanner:
+            return False
+        print(f"Escaneo terminado: {scanner.files_found} archivos en {scanner.dirs_scanned} carpetas")
+        self.scanner = None
+        self.scan_spinner.stop()
+        self.scan_bar.hide()
+        # Un escaneo cancelado no registra la carpeta (quedaría indexándose en cada inicio).
+        # Se indexa después del escaneo, para no recorrer la carpeta dos veces a la vez
+        if not cancelled:
+            self.update_library(scanner.roots)
+        return False
+
+    def setup_library_search(self, box):
+        """Buscador de la biblioteca: filtra mientras se escribe"""
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_placeholder_text(self.TEXT.get("search_library", "Search library"))
+        self.search_entry.connect("search-changed", self.on_library_search)
+        self.search_entry.connect("activate", self.on_library_search_activate)
+        self.search_entry.connect("stop-search", lambda entry: entry.set_text(""))
+        box.pack_start(self.search_entry, False, False, 0)
+
+        # ruta, título, artista, álbum, duración
+        self.search_store = Gtk.ListStore(str, str, str, str, str)
+        self.search_view = Gtk.TreeView(model=self.search_store)
+        self.search_view.set_headers_visible(False)
+        for col, width, expand in ((1, 220, True), (2, 150, False), (3, 150, False), (4, 70, False)):
+            renderer = Gtk.CellRendererText()
+            renderer.set_property("ellipsize", Pango.EllipsizeMode.END)
+            if col != 1:
+                renderer.set_property("foreground", "gray")
+            column = Gtk.TreeViewColumn("", renderer, text=col)
+            column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+            column.set_fixed_width(width)
+            column.set_expand(expand)
+            self.search_view.append_column(column)
+        self.search_view.set_fixed_height_mode(True)
+        self.search_view.connect("row-activated", self.on_library_result_activated)
+
+        search_scrolled = Gtk.ScrolledWindow()
+        search_scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        search_scrolled.set_min_content_height(200)
+        search_scrolled.add(self.search_view)
+
+        self.search_label = Gtk.Label(label="")
+        self.search_label.set_halign(Gtk.Align.START)
+        self.search_label.get_style_context().add_class("dim-label")
+
+        self.search_results = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
+        self.search_results.pack_start(search_scrolled, False, True, 0)
+        self.search_results.pack_start(self.search_label, False, False, 0)
+        self.search_results.show_all()
+        self.search_results.set_no_show_all(True)
+        self.search_results.hide()
+        box.pack_start(self.search_results, False, False, 0)
+
+    def on_library_search(self, entry):
+        text = entry.get_text().strip()
+        if not text:
+            self.search_results.hide()
+            self.search_store.clear()
+            return
+        rows = LIBRARY.search(text)
+
+        # Sin modelo mientras se llena: no se redibuja fila por fila
+        self.search_view.set_model(None)
+        self.search_store.clear()
+        for path, title, artist, album, duration in rows:
+            self.search_store.append([path, title or os.path.basename(path), artist or "",
+                                      album or "", format_duration(duration) if duration else ""])
+        self.search_view.set_model(self.search_store)
+
+        if rows:
+            self.search_label.set_text(
+                self.TEXT.get("search_results", "{count} tracks - Enter adds them to the playlist").format(count=len(rows))
+            )
+        else:
+            self.search_label.set_text(self.TEXT.get("search_empty", "No tracks found"))
+        self.search_results.show()
+
+    def on_library_search_activate(self, entry):
+        paths = [row[0] for row in self.search_store]
+        if paths:
+            self.enqueue_files(paths)
+
+    def on_library_result_activated(self, view, path, column):
+        self.enqueue_files([self.search_store[path][0]], play=True)
+
+    def enqueue_files(self, files, play=False):
+        """Agregar al final de la lista; con play, suena el primero de ellos"""
+        was_empty = len(self.audio_files) == 0
+        first = len(self.audio_files)
+        self.add_files(files)
+        if play or (was_empty and not self.is_paused):
+            self.current_index = first
+            self.play_audio()
+
+    def update_library(self, folders=None):
+        """Registrar carpetas (si se pasan) y volver a indexarlas en segundo plano"""
+        if folders:
+            LIBRARY.add_folders(folders)
+            roots = [os.path.abspath(f) for f in folders]
+        else:
+            roots = LIBRARY.folders()
+        if self.library_indexer is not None:
+            # Ya hay uno andando: se indexan al terminar
+            self._library_pending.extend(r for r in roots if r not in self._library_pending)
+            return
+        if roots:
+            self.library_indexer = LibraryIndexer(
+                LIBRARY, METADATA_CACHE, roots, SUPPORTED_EXTENSIONS,
+                on_done=lambda ix: GLib.idle_add(self._on_library_indexed, ix),
+            ).start()
+
+    def _on_library_indexed(self, indexer):
+        if indexer is not self.library_indexer:
+            return False
+        self.library_indexer = None
+        if not indexer.cancelled:
+            print(f"Biblioteca: {indexer.indexed} pistas indexadas")
+        pending, self._library_pending = self._library_pending, []
+        if pending:
+            self.update_library(pending)
+        return False
 
     def on_add_files(self, button):
         dialog = Gtk.FileChooserDialog(
@@ -1559,7 +1650,7 @@ class OplyPlayer(Gtk.Window):
             filenames = dialog.get_filenames()
             was_empty = len(self.audio_files) == 0
             self.audio_files.extend(filenames)
-            self.refresh_listbox()
+            self.append_to_listbox(filenames)
 
     
             if was_empty and self.audio_files:
@@ -1594,7 +1685,7 @@ class OplyPlayer(Gtk.Window):
                
                 was_empty = len(self.audio_files) == 0
                 self.audio_files.append(filename)
-                self.refresh_listbox()
+                self.append_to_listbox([filename])
                 dialog.destroy()
 
           
@@ -1615,25 +1706,20 @@ class OplyPlayer(Gtk.Window):
         if response == Gtk.ResponseType.OK:
             filenames = dialog.get_filenames()
             was_empty = len(self.audio_files) == 0
-            files_added = 0
+            files = [f for f in filenames if os.path.isfile(f)]
+            folders = [f for f in filenames if os.path.isdir(f)]
 
-            for filename in filenames:
-                if os.path.isfile(filename):
-          
-                    self.audio_files.append(filename)
-                    files_added += 1
-                elif os.path.isdir(filename):
-                
-                    for fmt in SUPPORTED_FORMATS:
-                        found_files = glob.glob(os.path.join(filename, fmt))
-                        self.audio_files.extend(found_files)
-                        files_added += len(found_files)
-
-            self.refresh_listbox()
+            if files:
+                self.audio_files.extend(files)
+                self.append_to_listbox(files)
 
         
-            if was_empty and files_added > 0:
-                GLib.timeout_add(100, lambda: (self.play_audio(), False))
+                if was_empty:
+                    GLib.timeout_add(100, lambda: (self.play_audio(), False))
+
+            # Las carpetas se recorren en segundo plano y llegan por lotes
+            if folders:
+                self.start_scan(folders, play_when_ready=was_empty and not files)
 
         dialog.destroy()
 
@@ -1712,22 +1798,56 @@ class OplyPlayer(Gtk.Window):
         )
         dialog.set_current_folder(PLAYLISTS_DIR)
         dialog.set_current_name("playlist.opl")
+        dialog.set_do_overwrite_confirmation(True)
+        self._add_playlist_filters(dialog)
 
         response = dialog.run()
         if response == Gtk.ResponseType.OK:
             filename = dialog.get_filename()
+            self.save_playlist_file(filename)
+            self.last_playlist = filename
+            save_config(self.last_playlist)
+
+        dialog.destroy()
+
+    @staticmethod
+    def _add_playlist_filters(dialog):
+        formats = [
+            ("Oply Playlists", ("opl",)),
+            ("M3U", ("m3u", "m3u8")),
+            ("PLS", ("pls",)),
+            ("XSPF", ("xspf",)),
+        ]
+        all_filter = Gtk.FileFilter()
+        all_filter.set_name("Playlists")
+        dialog.add_filter(all_filter)
+        for name, extensions in formats:
+            file_filter = Gtk.FileFilter()
+            file_filter.set_name(name)
+            for ext in extensions:
+                for pattern in (f"*.{ext}", f"*.{ext.upper()}"):
+                    file_filter.add_pattern(pattern)
+                    all_filter.add_pattern(pattern)
+            dialog.add_filter(file_filter)
+
+    def save_playlist_file(self, filename):
+        """
+        Guardar la lista en segundo plano, con copia de metadatos. El formato
+        sale de la extensión: .opl, .m3u/.m3u8, .pls o .xspf
+        """
+        files = self.audio_files.copy()
+        current_index = self.current_index
+
+        def run():
             try:
-                with open(filename, 'w') as f:
-                    json.dump({
-                        "files": self.audio_files,
-                        "current_index": self.current_index
-                    }, f)
-                self.last_playlist = filename
-                save_config(self.last_playlist)
+                known = METADATA_CACHE.snapshot(files)
+                entries = (make_entry(path, *known[path]) if path in known else make_entry(path)
+                           for path in files)
+                write_playlist(filename, entries, current_index)
             except Exception as e:
                 print(f"Error saving playlist: {e}")
 
-        dialog.destroy()
+        threading.Thread(target=run, daemon=True).start()
 
     def on_load_playlist(self, button):
         dialog = Gtk.FileChooserDialog(
@@ -1740,32 +1860,88 @@ class OplyPlayer(Gtk.Window):
             Gtk.STOCK_OPEN, Gtk.ResponseType.OK
         )
         dialog.set_current_folder(PLAYLISTS_DIR)
-
-        filter_opl = Gtk.FileFilter()
-        filter_opl.set_name("Oply Playlists")
-        filter_opl.add_pattern("*.opl")
-        dialog.add_filter(filter_opl)
+        self._add_playlist_filters(dialog)
 
         response = dialog.run()
         if response == Gtk.ResponseType.OK:
             filename = dialog.get_filename()
-            try:
-                with open(filename, 'r') as f:
-                    data = json.load(f)
+            self.load_playlist_file(filename)
+            self.last_playlist = filename
+            save_config(self.last_playlist)
 
-                self.audio_files = [f for f in data.get("files", []) if os.path.exists(f)]
-                self.current_index = data.get("current_index", 0)
-                self.last_playlist = filename
-                save_config(self.last_playlist)
+        dialog.destroy()
 
-                self.refresh_listbox()
+    def load_playlist_file(self, filename):
+        """
+        Cargar una lista (.opl, M3U, PLS o XSPF) en segundo plano: las filas
+        aparecen por lotes con los metadatos guardados y los archivos se
+        verifican después, en paralelo
+        """
+        self.cancel_scan()
+        self.clear_playlist()
+        self.playlist_loader = PlaylistLoader(
+            filename,
+            on_batch=lambda ld, entries: GLib.idle_add(self._on_playlist_batch, ld, entries),
+            on_done=lambda ld, header, error: GLib.idle_add(self._on_playlist_loaded, ld, header, error),
+            on_fresh=self._on_playlist_fresh,
+            on_checked=lambda ld, missing, stale: GLib.idle_add(self._on_playlist_checked, ld, missing, stale),
+        ).start()
+
+    def _on_playlist_batch(self, loader, entries):
+        if loader is not self.playlist_loader:
+            return False
+        files = [entry["path"] for entry in entries]
+        self.audio_files.extend(files)
+        # Sin (mtime, tamaño) la copia no se puede validar (M3U, PLS, XSPF):
+        # se muestra, pero la fila se vuelve a leer cuando se vea
+        self.append_to_listbox(files, [entry_meta(entry) for entry in entries],
+                               [("mtime" in entry) for entry in entries])
+        return False
 
-                if self.audio_files:
-                    self.play_audio()
-            except Exception as e:
-                print(f"Error loading playlist: {e}")
+    def _on_playlist_loaded(self, loader, header, error):
+        if loader is not self.playlist_loader:
+            return False
+        if error is not None:
+            print(f"Error loading playlist: {error}")
+        if self.audio_files:
+            index = header.get("current_index", 0)
+            index = index if isinstance(index, int) and 0 <= index < len(self.audio_files) else 0
+            # La verificación en segundo plano todavía no borró las que faltan:
+            # mpv terminaría la pista con "error" y no avanzaría. Se saltean acá.
+            while index < len(self.audio_files):
+                path = self.audio_files[index]
+                if "://" in path or os.path.exists(path):
+                    break
+                index += 1
+            if index < len(self.audio_files):
+                self.current_index = index
+                self.play_audio()
+        return False
 
-        dialog.destroy()
+    def _on_playlist_fresh(self, loader, items):
+        # Hilo de verificación: los metadatos guardados siguen valiendo, pasan a la caché
+        rows = []
+        for entry, st in items:
+            meta = entry_meta(entry)
+            if meta is not None:
+                rows.append((entry["path"], meta, st))
+        METADATA_CACHE.put_many(rows)
+
+    def _on_playlist_checked(self, loader, missing, stale):
+        if loader is not self.playlist_loader:
+            return False
+        self.playlist_loader = None
+        if stale:
+            # Cambiaron en disco: se vuelven a leer cuando se vean
+            stale = set(stale)
+            for index, path in enumerate(self.audio_files):
+                if path in stale:
+                    self.liststore[index][COL_FILLED] = False
+            self._schedule_visible_fill()
+        if missing:
+            missing = set(missing)
+            self.remove_from_playlist([i for i, path in enumerate(self.audio_files) if path in missing])
+        return False
 
     def on_clear(self, button):
         if not self.audio_files:
@@ -1781,10 +1957,9 @@ class OplyPlayer(Gtk.Window):
         dialog.destroy()
 
         if response == Gtk.ResponseType.YES:
+            self.cancel_scan()
             self.stop_audio()
-            self.audio_files = []
-            self.current_index = 0
-            self.refresh_listbox()
+            self.clear_playlist()
 
     def on_row_activated(self, treeview, path, column):
         index = path.get_indices()[0]
@@ -1849,110 +2024,156 @@ class OplyPlayer(Gtk.Window):
             self.vol_scale.set_value(0)
             self.is_muted = True
 
-    def update_cover_art(self, filepath):
-        """Actualizar carátula del álbum"""
-        os.makedirs(CONFIG_DIR, exist_ok=True)
+    def _track_info_worker(self):
+        """Hilo de fondo: metadatos y carátula de la pista actual, fuera del loop de GTK"""
+        while True:
+            token, filepath = self._info_queue.get()
 
-        cover_base = os.path.join(CONFIG_DIR, "current_cover")
+            # Con saltos rápidos solo interesa el último pedido
+            try:
+                while True:
+                    token, filepath = self._info_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            if token != self._track_token:
+                continue
 
-     
-        for ext in ("jpg", "png"):
-            p = f"{cover_base}.{ext}"
-            if os.path.exists(p):
-                try:
-                    os.remove(p)
-                except:
-                    pass
-
-        # 1) Intentar extraer carátula embebida (stream v:0)
-        print(f"Extrayendo carátula de: {filepath}")
-        ok, cover_path = extract_cover_art(filepath, cover_base)
-        if ok and cover_path:
-            print(f"Carátula extraída: {cover_path}")
             try:
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(cover_path, 280, 280, True)
-                self.cover_image.set_from_pixbuf(pixbuf)
-                print("Carátula mostrada correctamente")
-                return
+                metadata = get_metadata(filepath)
+            except Exception:
+                metadata = {"title": os.path.basename(filepath), "duration": 0, "artist": "", "album": ""}
+            if token != self._track_token:
+                continue
+            GLib.idle_add(self._apply_metadata, token, filepath, metadata)
+
+            try:
+                pixbuf = self._find_cover_pixbuf(filepath)
             except Exception as e:
-                print(f"Error mostrando carátula: {e}")
+                print(f"Error buscando carátula: {e}")
+                pixbuf = None
+            if token != self._track_token:
+                continue
+            GLib.idle_add(self._apply_cover, token, pixbuf, metadata)
+
+    def _find_cover_pixbuf(self, filepath):
+        """Carátula embebida o de la carpeta, ya escalada. Corre en el hilo de fondo."""
+        # Pista ya vista: sin procesos ni decodificación
+        known = COVER_CACHE.track_key(filepath)
+        if known is not None:
+            pixbuf = COVER_CACHE.get(known)
+            if pixbuf is not None or known == "":
+                return pixbuf
+
+        # 1) Carátula embebida, leída en memoria (mutagen; ffmpeg solo como respaldo)
+        data = read_embedded_cover(filepath)
+        if data:
+            key = key_for_bytes(data)
+            pixbuf = COVER_CACHE.get(key) or COVER_CACHE.put_bytes(key, data)
+            if pixbuf is not None:
+                print(f"Carátula embebida: {filepath}")
+                COVER_CACHE.remember_track(filepath, key)
+                return pixbuf
 
       
-        folder = os.path.dirname(filepath)
-        candidates = [
-            "cover.jpg", "folder.jpg", "front.jpg", "album.jpg",
-            "Cover.jpg", "Folder.jpg", "Front.jpg", "Album.jpg",
-            "cover.png", "folder.png", "front.png", "album.png",
-            "Cover.png", "Folder.png", "Front.png", "Album.png",
-        ]
-        for name in candidates:
-            p = os.path.join(folder, name)
-            if os.path.exists(p) and os.path.getsize(p) > 0:
-                try:
-                    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(p, 280, 280, True)
-                    self.cover_image.set_from_pixbuf(pixbuf)
-                    print(f"Carátula tomada de carpeta: {p}")
-                    return
-                except:
-                    pass
+        folder_image = COVER_CACHE.folder_image(os.path.dirname(filepath), FOLDER_COVER_NAMES)
+        if folder_image:
+            key = key_for_file(folder_image)
+            pixbuf = COVER_CACHE.get(key) or COVER_CACHE.put_file(key, folder_image)
+            if pixbuf is not None:
+                print(f"Carátula tomada de carpeta: {folder_image}")
+                COVER_CACHE.remember_track(filepath, key)
+                return pixbuf
+
+        COVER_CACHE.remember_track(filepath, "")
+        return None
 
-      
-        metadata = get_metadata(filepath)
-        if metadata["artist"] and metadata["album"]:
-            print(f"Buscando online: {metadata['artist']} - {metadata['album']}")
-            threading.Thread(
-                target=self.search_cover_online,
-                args=(metadata["artist"], metadata["album"]),
-                daemon=True
-            ).start()
-        else:
-            print("Sin metadata de artista/álbum, mostrando logo por defecto")
-            self.show_default_cover()
+    def _apply_metadata(self, token, filepath, metadata):
+        """Mostrar los metadatos que llegan del hilo de fondo (si siguen vigentes)"""
+        if token != self._track_token:
+            return False
 
-    def search_cover_online(self, artist, album):
-        """Buscar carátula en internet usando iTunes API"""
-        try:
-            import urllib.request
-            import urllib.parse
+        self.current_metadata = metadata
+        self.duration = metadata["duration"]
+        if self.current_index < len(self.audio_files):
+            self._set_row_metadata(self.current_index, filepath, metadata)
 
-          
-            query = urllib.parse.quote(f"{artist} {album}")
-            url = f"https://itunes.apple.com/search?term={query}&media=music&entity=album&limit=1"
+        title = metadata["title"] if metadata["title"] else os.path.basename(filepath)
+        self.lbl_title.set_markup(f"<b>{GLib.markup_escape_text(title)}</b>")
 
-            print(f"Buscando en iTunes API: {url}")
+        if metadata["artist"]:
+            self.lbl_artist.set_text(metadata["artist"])
+            self.lbl_artist.show()
+        else:
+            self.lbl_artist.hide()
 
-            with urllib.request.urlopen(url, timeout=5) as response:
-                data = json.loads(response.read().decode())
+        if metadata["album"]:
+            self.lbl_album.set_text(metadata["album"])
+            self.lbl_album.show()
+        else:
+            self.lbl_album.hide()
 
-                if data.get("resultCount", 0) > 0:
-                    artwork_url = data["results"][0].get("artworkUrl100", "").replace("100x100", "600x600")
+        subtitle_text = f"{self.TEXT['playing']}: {title}"
+        if metadata["artist"]:
+            subtitle_text = f"{metadata['artist']} - {title}"
+        self.headerbar.props.subtitle = subtitle_text
 
-                    if artwork_url:
-                        print(f"Carátula encontrada: {artwork_url}")
-                        cover_path = os.path.join(CONFIG_DIR, "current_cover.jpg")
-                        urllib.request.urlretrieve(artwork_url, cover_path)
+        self._publish_now_playing()
+        return False
 
-                   
-                        GLib.idle_add(self.load_cover_from_file, cover_path)
-                        return
-                else:
-                    print("No se encontraron resultados en iTunes")
-        except Exception as e:
-            print(f"Error buscando online: {e}")
+    def _publish_now_playing(self):
+        """Exportar el estado para Conky; sin metadatos aún no hay nada que mostrar"""
+        metadata = self.current_metadata
+        if metadata is None or self.current_index >= len(self.audio_files):
+            return
+        filepath = self.audio_files[self.current_index]
+        update_now_playing(
+            title=metadata["title"] or os.path.basename(filepath),
+            artist=metadata.get("artist", ""),
+            album=metadata.get("album", ""),
+            is_playing=not self.is_paused,
+            position=self._mpv_state.get("time-pos"),
+            duration=self._mpv_state.get("duration") or self.duration
+        )
 
+    def _update_now_playing_position(self):
+        """Pausa o salto en la pista ya publicada: solo cambian esos campos"""
+        if self.current_metadata is None:
+            return
+        NOW_PLAYING.update(
+            is_playing=not self.is_paused,
+            position=self._mpv_state.get("time-pos"),
+            duration=self._mpv_state.get("duration") or self.duration
+        )
 
-        print("Mostrando logo por defecto")
-        GLib.idle_add(self.show_default_cover)
+    def _apply_cover(self, token, pixbuf, metadata):
+        """Mostrar la carátula encontrada o, si no hay, buscarla online"""
+        if token != self._track_token:
+            return False
 
-    def load_cover_from_file(self, filepath):
-        """Cargar carátula desde archivo"""
-        try:
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(filepath, 280, 280, True)
+        if pixbuf is not None:
             self.cover_image.set_from_pixbuf(pixbuf)
-        except:
+            print("Carátula mostrada correctamente")
+        elif metadata["artist"] and metadata["album"]:
+            print(f"Buscando online: {metadata['artist']} - {metadata['album']}")
+            ONLINE_COVERS.lookup(
+                metadata["artist"], metadata["album"],
+                lambda pixbuf: GLib.idle_add(self._apply_online_cover, token, pixbuf)
+            )
+        else:
+            print("Sin metadata de artista/álbum, mostrando logo por defecto")
             self.show_default_cover()
         return False
 
+    def _apply_online_cover(self, token, pixbuf):
+        if token != self._track_token:
+            return False
+        if pixbuf is None:
+            print("Mostrando logo por defecto")
+            return self.show_default_cover()
+        self.cover_image.set_from_pixbuf(pixbuf)
+        return False
+
     def show_default_cover(self):
         """Mostrar logo de Oply por defecto"""
         if os.path.exists(ICON_PATH):
@@ -1970,32 +2191,12 @@ class OplyPlayer(Gtk.Window):
             return
 
         filepath = self.audio_files[self.current_index]
+        self.order.played(self.current_index)
 
-    
-        metadata = get_metadata(filepath)
-        self.duration = metadata["duration"]
-
-    
-        self.update_cover_art(filepath)
-
-    
-        title = metadata["title"] if metadata["title"] else os.path.basename(filepath)
-        self.lbl_title.set_markup(f"<b>{title}</b>")
-
-        if metadata["artist"]:
-            self.lbl_artist.set_text(metadata["artist"])
-            self.lbl_artist.show()
-        else:
-            self.lbl_artist.hide()
-
-        if metadata["album"]:
-            self.lbl_album.set_text(metadata["album"])
-            self.lbl_album.show()
-        else:
-            self.lbl_album.hide()
-
-    
-        self.send_mpv_command({"command": ["loadfile", filepath]})
+        # Primero el audio; metadatos y carátula llegan después desde el hilo de fondo
+        self.send_mpv_command({"command": ["loadfile", filepath, "replace"]})
+        self._queued_next = None
+        self._queue_next_track()
 
      
         GLib.timeout_add(200, self.ensure_playback)
@@ -2006,18 +2207,91 @@ class OplyPlayer(Gtk.Window):
         if hasattr(self, 'visualizer'):
             self.visualizer.start_animation()
 
-   
-        subtitle_text = f"{self.TEXT['playing']}: {title}"
-        if metadata["artist"]:
-            subtitle_text = f"{metadata['artist']} - {title}"
-        self.headerbar.props.subtitle = subtitle_text
-        
-      
-        update_now_playing(
-            title=title,
-            artist=metadata.get("artist", ""),
-            is_playing=True
+        self._show_track(filepath)
+
+    def _show_track(self, filepath):
+        """Mostrar la pista actual y pedir sus metadatos al hilo de fondo"""
+        self._track_token += 1
+        self.current_metadata = None
+        self.duration = 0
+
+        title = os.path.basename(filepath)
+        self.lbl_title.set_markup(f"<b>{GLib.markup_escape_text(title)}</b>")
+        self.lbl_artist.hide()
+        self.lbl_album.hide()
+        self.headerbar.props.subtitle = f"{self.TEXT['playing']}: {title}"
+
+        if self.spectrum:
+            self.spectrum.play(filepath)
+
+        self._info_queue.put((self._track_token, filepath))
+
+    def _queue_next_track(self):
+        """
+        Mantener en la playlist interna de mpv [actual, siguiente] para que
+        mpv precargue la siguiente y el paso entre pistas no tenga silencio.
+        """
+        if not self.audio_files or self.current_index >= len(self.audio_files):
+            return
+        next_index = self.order.peek_next()
+        if next_index is None:
+            # Fin de la lista sin repetir: no queda nada para precargar
+            if self._queued_next is not None:
+                self.send_mpv_command({"command": ["playlist-remove", 1]})
+                self._queued_next = None
+            return
+        next_path = self.audio_files[next_index]
+        if self._queued_next is not None and self._queued_next[1] == next_path:
+            self._queued_next = (next_index, next_path)
+            return
+
+        if self._queued_next is not None:
+            self.send_mpv_command({"command": ["playlist-remove", 1]})
+        self.send_mpv_command({"command": ["loadfile", next_path, "append"]})
+        self._queued_next = (next_index, next_path)
+
+    def _on_mpv_playlist_pos_event(self, name, pos):
+        # Hilo lector: el evento se ata a la pista que sonaba al recibirlo
+        GLib.idle_add(self._on_mpv_playlist_pos, self._track_token, pos)
+
+    def _on_mpv_playlist_pos(self, token, pos):
+        # Un evento agendado antes de un play_audio/play_next ya no vale
+        if token != self._track_token or pos != 1 or self._queued_next is None:
+            return False
+        # Y se confirma con mpv que la que suena es la precargada
+        path = self._queued_next[1]
+        self.send_mpv_command(
+            {"command": ["get_property", "path"]},
+            callback=lambda resp: GLib.idle_add(self._on_mpv_path_checked, token, path, resp)
         )
+        return False
+
+    def _on_mpv_path_checked(self, token, path, resp):
+        if token != self._track_token or self._queued_next is None or self._queued_next[1] != path:
+            return False
+        if resp and resp.get("error") == "success" and resp.get("data") == path:
+            self._on_mpv_advanced()
+        return False
+
+    def _on_mpv_advanced(self):
+        """mpv pasó solo a la pista precargada: sincronizar current_index"""
+        index, path = self._queued_next
+        if index >= len(self.audio_files) or self.audio_files[index] != path:
+            try:
+                index = self.audio_files.index(path)
+            except ValueError:
+                index = 0
+        if self.order.peek_next() == index:
+            self.order.next()
+        else:
+            self.order.played(index)
+        self.current_index = index
+        self._queued_next = None
+
+        # La pista anterior sale de la playlist de mpv; la actual queda en la posición 0
+        self.send_mpv_command({"command": ["playlist-remove", 0]})
+        self._queue_next_track()
+        self._show_track(path)
 
     def ensure_playback(self):
         """Asegurar que la reproducción inicie"""
@@ -2026,9 +2300,13 @@ class OplyPlayer(Gtk.Window):
 
     def stop_audio(self):
         self.send_mpv_command({"command": ["stop"]})
+        self._queued_next = None
         self.is_paused = False
         self.duration = 0
         self.headerbar.props.subtitle = self.TEXT["subtitle"]
+
+        if self.spectrum:
+            self.spectrum.stop()
         
     
         if hasattr(self, 'visualizer'):
@@ -2049,121 +2327,248 @@ class OplyPlayer(Gtk.Window):
                 self.visualizer.start_animation()
         
         # SOPORTE CONKY: Actualizar estado de pausa/reproducción
-        if self.audio_files and self.current_index < len(self.audio_files):
-            filepath = self.audio_files[self.current_index]
-            metadata = get_metadata(filepath)
-            title = metadata["title"] if metadata["title"] else os.path.basename(filepath)
-            update_now_playing(
-                title=title,
-                artist=metadata.get("artist", ""),
-                is_playing=not self.is_paused
-            )
+        self._update_now_playing_position()
 
     def play_next(self):
-        if not self.audio_files:
+        index = self.order.next()
+        if index is None:
             return
-        self.current_index = (self.current_index + 1) % len(self.audio_files)
+        self.current_index = index
         self.play_audio()
 
     def play_previous(self):
-        if not self.audio_files:
+        index = self.order.previous()
+        if index is None:
             return
-        self.current_index = (self.current_index - 1) % len(self.audio_files)
+        self.current_index = index
         self.play_audio()
 
-    def update_progress(self):
-        try:
-            if self.duration and self.updating_progress:
-                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
-                    s.settimeout(0.5)
-                    s.connect(self.mpv_socket)
-
-                    s.sendall(b'{ "command": ["get_property", "time-pos"] }\n')
-                    pos_resp = s.recv(1024).decode()
-                    pos_data = json.loads(pos_resp)
-                    position = pos_data.get('data', 0) or 0
-
-                    progress = (position / self.duration) * 100 if self.duration else 0
-                    self.progress_scale.set_value(progress)
-
-                    elapsed_str = format_duration(position)
-                    total_str = format_duration(self.duration)
-                    self.lbl_time.set_text(f"{elapsed_str} / {total_str}")
-        except:
-            pass
+    def set_shuffle(self, enabled):
+        self.order.set_shuffle(enabled)
+        if self._queued_next is not None:
+            self._queue_next_track()
+
+    def setup_mpv_observers(self):
+        """Estado de reproducción por eventos de mpv en lugar de sondeos"""
+        self._mpv_state = {"time-pos": None, "duration": None, "pause": False}
+        self._progress_source = None
+
+        self.mpv_ipc.observe_property("time-pos", self._on_mpv_property)
+        self.mpv_ipc.observe_property("duration", self._on_mpv_property)
+        self.mpv_ipc.observe_property("pause", self._on_mpv_property)
+        self.mpv_ipc.observe_property("playlist-pos", self._on_mpv_playlist_pos_event)
+        self.mpv_ipc.on_event("end-file", self._on_mpv_end_file)
+
+    def _on_mpv_property(self, name, value):
+        # Hilo lector de mpv: guardar y agendar un refresco de la UI.
+        # time-pos cambia muchas veces por segundo; se agrupa en uno cada 250 ms
+        self._mpv_state[name] = value
+        if self.spectrum:
+            # El analizador sigue a mpv: posición real (saltos incluidos) y pausa
+            if name == "time-pos":
+                self.spectrum.sync(value)
+            elif name == "pause":
+                self.spectrum.set_paused(bool(value))
+        if name == "pause":
+            GLib.idle_add(self._on_pause_changed, bool(value))
+        elif self._progress_source is None:
+            self._progress_source = GLib.timeout_add(250, self.update_progress)
+
+    def _on_mpv_end_file(self, msg):
+        # Solo un final real de pista avanza; 'stop' llega también al cambiar de archivo
+        if msg.get("reason") == "eof":
+            GLib.idle_add(self._on_track_finished)
+
+    def _on_track_finished(self):
+        # Con la siguiente ya encolada mpv avanza solo (ver _on_mpv_advanced)
+        if self._queued_next is None:
+            self.play_next()
+        return False
 
-        return True
+    def _on_pause_changed(self, paused):
+        if paused == self.is_paused:
+            return False
+        self.is_paused = paused
+        if hasattr(self, 'visualizer'):
+            if paused:
+                self.visualizer.stop_animation()
+            elif self.audio_files:
+                self.visualizer.start_animation()
+        self._update_now_playing_position()
+        return False
 
-    def update_playback_info(self):
+    def update_progress(self):
+        self._progress_source = None
         try:
-            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
-                s.settimeout(0.5)
-                s.connect(self.mpv_socket)
+            duration = self._mpv_state.get("duration") or self.duration
+            if duration and not self.duration:
+                self.duration = duration
+            if duration and self.updating_progress:
+                position = self._mpv_state.get("time-pos") or 0
 
-                s.sendall(b'{ "command": ["get_property", "time-pos"] }\n')
-                pos_resp = s.recv(1024).decode()
-                pos_data = json.loads(pos_resp)
-                position = pos_data.get('data', 0) or 0
+                progress = (position / duration) * 100 if duration else 0
+                self.progress_scale.set_value(progress)
 
-                s.sendall(b'{ "command": ["get_property", "duration"] }\n')
-                dur_resp = s.recv(1024).decode()
-                dur_data = json.loads(dur_resp)
-                duration = dur_data.get('data', 1) or 1
+                elapsed_str = format_duration(position)
+                total_str = format_duration(duration)
+                self.lbl_time.set_text(f"{elapsed_str} / {total_str}")
 
-           
-                if position and duration and position >= duration - 0.5:
-                    self.play_next()
+            # Solo escribe ante saltos; el avance normal lo interpola el lector
+            self._update_now_playing_position()
         except:
             pass
 
-        return True
+        return False
 
     def setup_socket_server(self):
-        if os.path.exists(SOCKET_PATH):
-            try:
-                os.remove(SOCKET_PATH)
-            except:
-                pass
-
+        """Socket de control: protocolo JSON por líneas (ver oply_control.py)"""
+        self.control = None
+        commands = {
+            "ping": lambda req: {},
+            "status": lambda req: self._on_main(self._control_status),
+            "queue": self._control_queue,
+            "add": self._control_add,
+            "play": self._control_play,
+            "pause": self._control_pause,
+            "next": lambda req: self._on_main(self.play_next),
+            "previous": lambda req: self._on_main(self.play_previous),
+            "stop": lambda req: self._on_main(self.stop_audio),
+        }
         try:
-            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            self.sock.bind(SOCKET_PATH)
-            self.sock.listen(1)
-            threading.Thread(target=self.listen_socket, daemon=True).start()
+            self.control = ControlServer(SOCKET_PATH, commands, legacy=self._control_legacy).start()
         except Exception as e:
             print(f"Socket server error: {e}")
 
-    def listen_socket(self):
-        while True:
+    def _on_main(self, func, *args):
+        """Ejecutar func en el loop de GTK y esperar su resultado (hilos del socket)"""
+        fut = Future()
+
+        def run():
             try:
-                conn, _ = self.sock.accept()
-                data = conn.recv(1024)
-                if data:
-                    command = data.decode().strip()
-                    if command.startswith("PLAY:"):
-                        filepath = command[5:]
-                        if os.path.exists(filepath):
-                            GLib.idle_add(self.play_external_file, filepath)
-                    elif command.startswith("ADD:"):
-                        filepath = command[4:]
-                        if os.path.exists(filepath):
-                            GLib.idle_add(self.add_to_playlist, filepath)
-                conn.close()
-            except:
-                break
+                fut.set_result(func(*args))
+            except Exception as e:
+                fut.set_exception(e)
+            return False
+
+        GLib.idle_add(run)
+        return fut.result(timeout=30)
+
+    @staticmethod
+    def _control_paths(req):
+        """Rutas del pedido que existen, en absoluto, y cuántas faltaban"""
+        paths = req.get("paths")
+        if paths is None and "path" in req:
+            paths = [req["path"]]
+        if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+            raise ControlError("'paths' must be a list of strings")
+        found = [os.path.abspath(p) for p in paths if os.path.isfile(p)]
+        return found, len(paths) - len(found)
+
+    def _control_legacy(self, action, filepath):
+        if not os.path.exists(filepath):
+            return
+        if action == "PLAY":
+            GLib.idle_add(self.play_external_file, filepath)
+        else:
+            GLib.idle_add(self.add_to_playlist, filepath)
+
+    def _control_add(self, req):
+        files, missing = self._control_paths(req)
+        # Por tandas: la interfaz sigue respondiendo entre una y otra y el
+        # cliente no recibe respuesta (ni manda más) hasta que terminen
+        for i in range(0, len(files), 1000):
+            self._on_main(self.add_files, files[i:i + 1000])
+        return {"added": len(files), "missing": missing}
+
+    def _control_play(self, req):
+        if "paths" in req or "path" in req:
+            files, missing = self._control_paths(req)
+            if not files:
+                raise ControlError("no playable files")
+            self._on_main(self.play_external_files, files)
+            return {"added": len(files), "missing": missing}
+        if "index" in req:
+            index = req["index"]
+            if not isinstance(index, int):
+                raise ControlError("'index' must be an integer")
+            if not self._on_main(self._play_index, index):
+                raise ControlError("index out of range")
+            return {}
+        # Sin argumentos: reanudar
+        self._on_main(self._set_paused, False)
+        return {}
+
+    def _control_pause(self, req):
+        paused = req.get("paused")
+        if paused is None:
+            self._on_main(self.toggle_play_pause)
+        else:
+            self._on_main(self._set_paused, bool(paused))
+        return {}
+
+    def _control_queue(self, req):
+        offset = req.get("offset", 0)
+        limit = req.get("limit")
+        if not isinstance(offset, int) or (limit is not None and not isinstance(limit, int)):
+            raise ControlError("'offset' and 'limit' must be integers")
+
+        def snapshot():
+            end = len(self.audio_files) if limit is None else offset + max(0, limit)
+            return {
+                "current": self.current_index if self.audio_files else None,
+                "total": len(self.audio_files),
+                "offset": offset,
+                "paths": self.audio_files[offset:end],
+            }
+        return self._on_main(snapshot)
+
+    def _control_status(self):
+        if not self.audio_files or self.current_index >= len(self.audio_files):
+            return {"state": "stopped", "total": len(self.audio_files)}
+        metadata = self.current_metadata or {}
+        return {
+            "state": "paused" if self.is_paused else "playing",
+            "index": self.current_index,
+            "total": len(self.audio_files),
+            "path": self.audio_files[self.current_index],
+            "title": metadata.get("title", ""),
+            "artist": metadata.get("artist", ""),
+            "album": metadata.get("album", ""),
+            "position": self._mpv_state.get("time-pos"),
+            "duration": self._mpv_state.get("duration") or self.duration,
+        }
+
+    def _play_index(self, index):
+        if not 0 <= index < len(self.audio_files):
+            return False
+        self.current_index = index
+        self.play_audio()
+        return True
+
+    def _set_paused(self, paused):
+        if self.audio_files and paused != self.is_paused:
+            self.toggle_play_pause()
 
     def play_external_file(self, filepath):
-        self.audio_files = [filepath]
-        self.current_index = 0
-        self.refresh_listbox()
+        self.play_external_files([filepath])
+
+    def play_external_files(self, files):
+        self.clear_playlist()
+        self.add_files(files)
         GLib.timeout_add(100, lambda: (self.play_audio(), False))
 
     def add_to_playlist(self, filepath):
-        self.audio_files.append(filepath)
-        self.refresh_listbox()
+        self.add_files([filepath])
+
+    def add_files(self, files):
+        self.audio_files.extend(files)
+        self.append_to_listbox(files)
 
     def on_destroy(self, widget):
       
+        if hasattr(self, 'mpv_ipc'):
+            self.mpv_ipc.close()
+
         if hasattr(self, 'mpv') and self.mpv:
             self.mpv.terminate()
             try:
@@ -2174,13 +2579,25 @@ class OplyPlayer(Gtk.Window):
    
         if hasattr(self, 'visualizer'):
             self.visualizer.stop_animation()
+        if self.spectrum:
+            self.spectrum.close()
+
+        # Primero el indexador, que escribe en las dos bases: un lote a medias
+        # tiene que terminar antes de cerrarlas
+        if self.library_indexer is not None:
+            self.library_indexer.cancel()
+            if not self.library_indexer.wait(2.0):
+                print("Warning: library indexer still running at exit")
+
+        stats = METADATA_CACHE.stats()
+        print(f"Metadata cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%})")
+        METADATA_CACHE.close()
+        LIBRARY.close()
 
     
-        if os.path.exists(SOCKET_PATH):
-            try:
-                os.remove(SOCKET_PATH)
-            except:
-                pass
+        if getattr(self, 'control', None):
+            self.control.close()
 
         if hasattr(self, 'mpv_socket') and os.path.exists(self.mpv_socket):
             try:
@@ -2197,41 +2614,21 @@ class OplyPlayer(Gtk.Window):
 
         Gtk.main_quit()
 
-def send_to_socket(filepath, action="PLAY"):
-    try:
-        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        s.connect(SOCKET_PATH)
-        s.send(f"{action}:{filepath}".encode())
-        s.close()
-        return True
-    except:
-        return False
-
 def main():
+    """Abrir la ventana; el paso a una instancia ya abierta se intentó antes (oply_launcher)"""
+    startup_trace("modules imported")
     os.makedirs(CONFIG_DIR, exist_ok=True)
     os.makedirs(PLAYLISTS_DIR, exist_ok=True)
 
-    play_on_start = None
-    add_on_start = None
-
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--add" and len(sys.argv) > 2:
-            if send_to_socket(sys.argv[2], "ADD"):
-                sys.exit(0)
-            else:
-                add_on_start = os.path.abspath(sys.argv[2])
-        else:
-            if send_to_socket(sys.argv[1], "PLAY"):
-                sys.exit(0)
-            else:
-                play_on_start = os.path.abspath(sys.argv[1])
+    action, files = parse_args(sys.argv[1:])
+    files = [os.path.abspath(f) for f in files]
 
     app = OplyPlayer()
 
-    if play_on_start:
-        app.play_external_file(play_on_start)
-    elif add_on_start:
-        app.add_to_playlist(add_on_start)
+    if files and action == "PLAY":
+        app.play_external_files(files)
+    elif files:
+        app.add_files(files)
 
     Gtk.main()
 
@@ -0,0 +1,198 @@
+# Oply - Socket de control
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Protocolo de líneas JSON sobre un socket UNIX. Cada pedido es un objeto
+# en una línea y recibe exactamente una respuesta, en orden:
+#
+#   -> {"v": 1, "id": 7, "cmd": "add", "paths": ["/music/a.mp3", "/music/b.flac"]}
+#   <- {"v": 1, "id": 7, "ok": true, "added": 2, "missing": 0}
+#
+#   -> {"v": 1, "cmd": "status"}
+#   <- {"v": 1, "ok": true, "state": "playing", "index": 0, ...}
+#
+# Un error responde {"ok": false, "error": "..."}. "id" es opcional y se
+# devuelve tal cual. Cada cliente tiene su hilo y el siguiente pedido no
+# se lee hasta responder el anterior: un cliente que manda miles de
+# pedidos queda frenado por el buffer del socket (contrapresión) sin
+# afectar a los demás.
+#
+# Se siguen aceptando las líneas viejas "PLAY:/ruta" y "ADD:/ruta" (sin
+# respuesta), que es lo que mandaban las versiones anteriores de Oply.
+
+import os
+import json
+import socket
+import threading
+
+PROTOCOL_VERSION = 1
+
+# Socket de la ventana principal de Oply
+OPLY_SOCKET = "/tmp/oply_socket"
+
+# Un pedido no puede pasar de esto (una lista enorme de rutas entra de sobra)
+MAX_LINE = 16 * 1024 * 1024
+MAX_CLIENTS = 32
+
+
+class ControlError(Exception):
+    """Error que se devuelve al cliente como {"ok": false, "error": ...}"""
+
+
+class ControlServer:
+    def __init__(self, path, commands, legacy=None, max_clients=MAX_CLIENTS):
+        """
+        commands: {"nombre": función(pedido) -> dict con la respuesta}
+        legacy: función(acción, ruta) para "PLAY:" y "ADD:"
+        Las funciones se llaman desde el hilo de cada cliente.
+        """
+        self.path = path
+        self.commands = commands
+        self.legacy = legacy
+        self._slots = threading.BoundedSemaphore(max_clients)
+        self._sock = None
+        self._closed = False
+
+    def start(self):
+        if os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        sock.listen(socket.SOMAXCONN)
+        self._sock = sock
+        threading.Thread(target=self._accept_loop, name="oply-control", daemon=True).start()
+        return self
+
+    def close(self):
+        self._closed = True
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                if self._closed:
+                    break
+                continue
+            if not self._slots.acquire(blocking=False):
+                # Demasiados clientes: se avisa y se corta en lugar de encolar sin límite
+                self._reply(conn, {"ok": False, "error": "busy"})
+                conn.close()
+                continue
+            threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+
+    def _serve_client(self, conn):
+        try:
+            with conn, conn.makefile("rb") as reader:
+                while not self._closed:
+                    line = reader.readline(MAX_LINE + 1)
+                    if not line:
+                        break
+                    if len(line) > MAX_LINE:
+                        self._reply(conn, {"ok": False, "error": "request too large"})
+                        break
+                    text = line.decode("utf-8", errors="surrogateescape").strip()
+                    if not text:
+                        continue
+                    if text.startswith(("PLAY:", "ADD:")):
+                        action, _, path = text.partition(":")
+                        if self.legacy:
+                            self.legacy(action, path)
+                        continue
+                    if not self._reply(conn, self._handle(text)):
+                        break
+        except OSError:
+            pass
+        finally:
+            self._slots.release()
+
+    def _handle(self, text):
+        req_id = None
+        try:
+            request = json.loads(text)
+            if not isinstance(request, dict):
+                raise ControlError("request must be a JSON object")
+            req_id = request.get("id")
+            version = request.get("v", PROTOCOL_VERSION)
+            if version != PROTOCOL_VERSION:
+                raise ControlError(f"unsupported protocol version {version}")
+            handler = self.commands.get(request.get("cmd"))
+            if handler is None:
+                raise ControlError(f"unknown command {request.get('cmd')!r}")
+            reply = dict(handler(request) or {})
+            reply["ok"] = True
+        except ValueError:
+            reply = {"ok": False, "error": "invalid JSON"}
+        except ControlError as e:
+            reply = {"ok": False, "error": str(e)}
+        except Exception as e:
+            print(f"Control command error: {e}")
+            reply = {"ok": False, "error": "internal error"}
+        if req_id is not None:
+            reply["id"] = req_id
+        return reply
+
+    @staticmethod
+    def _reply(conn, reply):
+        reply["v"] = PROTOCOL_VERSION
+        data = json.dumps(reply, ensure_ascii=False) + "\n"
+        try:
+            conn.sendall(data.encode("utf-8", errors="surrogateescape"))
+            return True
+        except OSError:
+            return False
+
+
+class ControlClient:
+    """Conexión persistente para mandar varios pedidos seguidos"""
+
+    def __init__(self, path, timeout=10.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.reader = self.sock.makefile("rb")
+        self._next_id = 1
+
+    def request(self, cmd, **args):
+        """Manda un pedido y devuelve la respuesta; ControlError si falló"""
+        req = {"v": PROTOCOL_VERSION, "id": self._next_id, "cmd": cmd}
+        req.update(args)
+        self._next_id += 1
+        data = json.dumps(req, ensure_ascii=False) + "\n"
+        self.sock.sendall(data.encode("utf-8", errors="surrogateescape"))
+        line = self.reader.readline(MAX_LINE + 1)
+        if not line:
+            raise ControlError("connection closed")
+        reply = json.loads(line.decode("utf-8", errors="surrogateescape"))
+        if not reply.get("ok"):
+            raise ControlError(reply.get("error") or "request failed")
+        return reply
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,412 @@
+# Oply - Caché de carátulas
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Las carátulas se guardan ya escaladas, con clave por contenido: el hash
+# de la imagen embebida o, para imágenes de carpeta, de su ruta+mtime+tamaño.
+# En disco hay una cuota de tamaño; en memoria un LRU de GdkPixbuf.
+# Las búsquedas online se recuerdan (también los fallos) en online.db.
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import gi
+gi.require_version('GdkPixbuf', '2.0')
+from gi.repository import GdkPixbuf
+
+
+def pixbuf_from_bytes(data, size):
+    """
+    Decodifica una imagen en memoria directo al tamaño final (size x size,
+    manteniendo proporción). El escalado se fija en el loader antes de
+    decodificar, así JPEG grandes no se expanden a resolución completa.
+    """
+    loader = GdkPixbuf.PixbufLoader()
+
+    def on_size_prepared(ldr, width, height):
+        scale = min(size / width, size / height)
+        ldr.set_size(max(1, int(width * scale)), max(1, int(height * scale)))
+
+    loader.connect("size-prepared", on_size_prepared)
+    try:
+        loader.write(data)
+        loader.close()
+    except Exception:
+        try:
+            loader.close()
+        except Exception:
+            pass
+        return None
+    return loader.get_pixbuf()
+
+
+def key_for_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def key_for_file(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    ident = f"{path}\0{st.st_mtime}\0{st.st_size}".encode("utf-8", errors="surrogateescape")
+    return hashlib.sha1(ident).hexdigest()
+
+
+class CoverCache:
+    def __init__(self, cache_dir, size=280, quota_bytes=64 * 1024 * 1024, memory_items=64,
+                 index_items=4096):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.quota_bytes = quota_bytes
+        self.memory_items = memory_items
+        self.index_items = index_items
+
+        self._memory = OrderedDict()
+        # LRU ruta -> (mtime, tamaño, clave de carátula) ("" = la pista no tiene)
+        self._track_keys = OrderedDict()
+        # LRU carpeta -> (mtime de la carpeta, ruta de cover.jpg/folder.png/...) ("" = no hay)
+        self._folder_images = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_usage = None
+
+    def _thumb_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".png")
+
+    # ---------- pistas y carpetas ----------
+    def _index_get(self, index, name, stamp):
+        """Valor guardado si sigue vigente para 'stamp'; si cambió, se olvida"""
+        with self._lock:
+            entry = index.get(name)
+            if entry is None:
+                return None
+            if entry[:-1] != stamp:
+                del index[name]
+                return None
+            index.move_to_end(name)
+            return entry[-1]
+
+    def _index_put(self, index, name, stamp, value):
+        with self._lock:
+            index[name] = stamp + (value,)
+            index.move_to_end(name)
+            while len(index) > self.index_items:
+                index.popitem(last=False)
+
+    def track_key(self, filepath):
+        """Clave ya conocida para la pista, "" si se sabe que no tiene, None si no se sabe."""
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        return self._index_get(self._track_keys, filepath, (st.st_mtime, st.st_size))
+
+    def remember_track(self, filepath, key):
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return
+        self._index_put(self._track_keys, filepath, (st.st_mtime, st.st_size), key or "")
+
+    def folder_image(self, folder, candidates):
+        """
+        Imagen de carpeta (cover.jpg, folder.png...) con memoria por carpeta.
+        Agregar o borrar una imagen cambia el mtime de la carpeta y se vuelve a buscar.
+        """
+        try:
+            stamp = (os.stat(folder).st_mtime,)
+        except OSError:
+            return None
+        found = self._index_get(self._folder_images, folder, stamp)
+        if found is not None:
+            return found or None
+        found = ""
+        for name in candidates:
+            p = os.path.join(folder, name)
+            try:
+                if os.path.getsize(p) > 0:
+                    found = p
+                    break
+            except OSError:
+                pass
+        self._index_put(self._folder_images, folder, stamp, found)
+        return found or None
+
+    # ---------- miniaturas ----------
+    def get(self, key):
+        """Pixbuf escalado: primero el LRU en memoria, después la miniatura en disco."""
+        if not key:
+            return None
+        with self._lock:
+            pixbuf = self._memory.get(key)
+            if pixbuf is not None:
+                self._memory.move_to_end(key)
+                return pixbuf
+
+        path = self._thumb_path(key)
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file(path)
+        except Exception:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(key, pixbuf)
+        return pixbuf
+
+    def put(self, key, pixbuf):
+        """Guarda una carátula ya escalada en memoria y en disco."""
+        if not key or pixbuf is None:
+            return
+        self._remember(key, pixbuf)
+
+        path = self._thumb_path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            pixbuf.savev(tmp, "png", [], [])
+            os.replace(tmp, path)
+            added = os.path.getsize(path)
+        except Exception as e:
+            print(f"Error saving cover thumbnail: {e}")
+            return
+
+        with self._lock:
+            if self._disk_usage is not None:
+                self._disk_usage += added
+            over = self._disk_usage is None or self._disk_usage > self.quota_bytes
+        if over:
+            self._enforce_quota()
+
+    def put_bytes(self, key, data):
+        """Decodifica una imagen en memoria a tamaño de miniatura y la guarda."""
+        pixbuf = pixbuf_from_bytes(data, self.size)
+        self.put(key, pixbuf)
+        return pixbuf
+
+    def put_file(self, key, image_path):
+        """Decodifica una imagen de disco a tamaño de miniatura y la guarda."""
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(image_path, self.size, self.size, True)
+        except Exception:
+            return None
+        self.put(key, pixbuf)
+        return pixbuf
+
+    def _remember(self, key, pixbuf):
+        with self._lock:
+            self._memory[key] = pixbuf
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _enforce_quota(self):
+        """Borra las miniaturas usadas hace más tiempo hasta quedar bajo la cuota."""
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".png"):
+                    continue
+                p = os.path.join(root, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+
+        if total > self.quota_bytes:
+            entries.sort()
+            # Se deja margen para no volver a barrer con cada miniatura nueva
+            target = self.quota_bytes * 0.9
+            for _mtime, size, p in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(p)
+                    total -= size
+                except OSError:
+                    pass
+
+        with self._lock:
+            self._disk_usage = total
+
+
+def urllib_fetch(url, timeout):
+    """Descarga por HTTP; OnlineCoverLookup acepta cualquier función con esta firma."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read()
+
+
+class OnlineCoverLookup:
+    """
+    Búsqueda de carátulas en iTunes con memoria persistente (artista, álbum).
+
+    Guarda también los fallos, para no volver a preguntar por el mismo
+    álbum en cada reproducción. Pedidos simultáneos por la misma clave
+    comparten una sola búsqueda y el total de búsquedas en curso está
+    acotado por el tamaño del pool.
+    """
+
+    HIT_TTL = 90 * 24 * 3600
+    MISS_TTL = 7 * 24 * 3600
+    # Errores de red: reintentar pronto, pero no en cada pista
+    ERROR_TTL = 3600
+
+    SEARCH_URL = "https://itunes.apple.com/search?term={query}&media=music&entity=album&limit=1"
+
+    def __init__(self, db_path, cover_cache, fetch=urllib_fetch, max_in_flight=2, clock=time.time):
+        self.db_path = db_path
+        self.cover_cache = cover_cache
+        self.fetch = fetch
+        self.clock = clock
+
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight,
+                                            thread_name_prefix="oply-cover")
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = None
+
+    @staticmethod
+    def make_key(artist, album):
+        return (" ".join(artist.lower().split()), " ".join(album.lower().split()))
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS online_covers ("
+                " artist TEXT NOT NULL, album TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " cover_key TEXT,"
+                " fetched REAL NOT NULL,"
+                " PRIMARY KEY (artist, album))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _load(self, key):
+        with self._db_lock:
+            try:
+                return self._db().execute(
+                    "SELECT status, cover_key, fetched FROM online_covers"
+                    " WHERE artist = ? AND album = ?", key
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+
+    def _store(self, key, status, cover_key=None):
+        with self._db_lock:
+            try:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO online_covers"
+                    " (artist, album, status, cover_key, fetched) VALUES (?, ?, ?, ?, ?)",
+                    (key[0], key[1], status, cover_key, self.clock())
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Error saving online cover cache: {e}")
+
+    def cached(self, artist, album):
+        """
+        Respuesta guardada y vigente, sin red:
+          (True, pixbuf)  hay carátula
+          (True, None)    se sabe que no hay
+          (False, None)   no se sabe, hay que buscar
+        """
+        row = self._load(self.make_key(artist, album))
+        if row is None:
+            return (False, None)
+        status, cover_key, fetched = row
+        ttl = {"hit": self.HIT_TTL, "miss": self.MISS_TTL}.get(status, self.ERROR_TTL)
+        if self.clock() - fetched > ttl:
+            return (False, None)
+        if status == "hit":
+            pixbuf = self.cover_cache.get(cover_key)
+            # La miniatura pudo salir por la cuota de disco
+            return (True, pixbuf) if pixbuf is not None else (False, None)
+        return (True, None)
+
+    def lookup(self, artist, album, callback):
+        """
+        Pide la carátula; callback(pixbuf o None) se llama enseguida si la
+        respuesta ya está guardada y, si no, desde un hilo del pool. Si ya
+        hay una búsqueda en curso para el mismo álbum, se suma a esa.
+        """
+        # Lo guardado no espera detrás de búsquedas lentas en el pool
+        known, pixbuf = self.cached(artist, album)
+        if known:
+            callback(pixbuf)
+            return
+        key = self.make_key(artist, album)
+        with self._lock:
+            waiters = self._in_flight.get(key)
+            if waiters is not None:
+                waiters.append(callback)
+                return
+            self._in_flight[key] = [callback]
+        self._executor.submit(self._resolve, key, artist, album)
+
+    def _resolve(self, key, artist, album):
+        pixbuf = None
+        try:
+            known, pixbuf = self.cached(artist, album)
+            if not known:
+                pixbuf = self._search(key, artist, album)
+        except Exception as e:
+            print(f"Error buscando online: {e}")
+            pixbuf = None
+        finally:
+            with self._lock:
+                waiters = self._in_flight.pop(key, [])
+            for cb in waiters:
+                try:
+                    cb(pixbuf)
+                except Exception as e:
+                    print(f"Online cover callback error: {e}")
+
+    def _search(self, key, artist, album):
+        url = self.SEARCH_URL.format(query=urllib.parse.quote(f"{artist} {album}"))
+        print(f"Buscando en iTunes API: {url}")
+        try:
+            data = json.loads(self.fetch(url, 5).decode("utf-8", errors="replace"))
+            results = data.get("results") or []
+            artwork_url = ""
+            if data.get("resultCount", 0) > 0 and results:
+                artwork_url = (results[0].get("artworkUrl100") or "").replace("100x100", "600x600")
+            if not artwork_url:
+                print("No se encontraron resultados en iTunes")
+                self._store(key, "miss")
+                return None
+
+            print(f"Carátula encontrada: {artwork_url}")
+            image = self.fetch(artwork_url, 10)
+        except Exception as e:
+            print(f"Error buscando online: {e}")
+            self._store(key, "error")
+            return None
+
+        cover_key = key_for_bytes(image)
+        pixbuf = self.cover_cache.get(cover_key) or self.cover_cache.put_bytes(cover_key, image)
+        if pixbuf is None:
+            self._store(key, "miss")
+            return None
+        self._store(key, "hit", cover_key)
+        return pixbuf
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# Oply - Buscador de duplicados por huella acústica
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Encuentra pistas de la biblioteca que suenan igual aunque difieran en
+# bitrate, formato o etiquetas. De cada archivo se decodifica con ffmpeg
+# una ventana corta (30 s) y se calcula con NumPy una huella de croma: la
+# energía de las 12 notas en 16 tramos de la ventana. Con eso:
+#
+#   firma:  128 bits (LSH de hiperplanos aleatorios sobre la huella)
+#   vector: la huella completa (192 valores float16) para confirmar
+#
+# Los candidatos salen de agrupar firmas por bandas de 16 bits (LSH), sin
+# comparar todos contra todos, y se confirman por similitud coseno. Dos
+# pistas distintas casi nunca comparten una banda; dos copias de la misma
+# (coseno > 0.97) comparten al menos una más del 90 % de las veces.
+#
+# Las huellas se calculan en un ProcessPoolExecutor (un proceso por núcleo)
+# y se guardan en ~/.config/oply/fingerprints.db, junto a la caché de
+# metadatos, con clave (ruta, mtime, tamaño): si se interrumpe, la próxima
+# vez sigue con lo que faltaba.
+#
+# Uso: oply-dupes [CARPETA ...] [--workers N] [--threshold 0.92] [--json]
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+CONFIG_DIR = os.path.expanduser("~/.config/oply")
+FINGERPRINT_DB = os.path.join(CONFIG_DIR, "fingerprints.db")
+LIBRARY_DB = os.path.join(CONFIG_DIR, "library.db")
+
+RATE = 11025
+WINDOW_START = 20.0
+WINDOW_LENGTH = 30.0
+FFT_SIZE = 4096
+HOP = 2048
+SEGMENTS = 16
+BITS = 128
+BAND_BITS = 16
+
+# Similitud coseno mínima para considerar dos pistas iguales
+THRESHOLD = 0.92
+
+# Un balde LSH con más pistas que esto es ruido (silencios, tonos de prueba)
+MAX_BUCKET = 200
+
+_planes = None
+_chroma_map = None
+
+
+def default_workers():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _tables():
+    """Matriz bins -> notas y los hiperplanos del LSH (fijos: misma semilla siempre)"""
+    global _planes, _chroma_map
+    if _chroma_map is None:
+        freqs = np.fft.rfftfreq(FFT_SIZE, 1.0 / RATE)
+        usable = (freqs >= 55.0) & (freqs <= 4000.0)
+        notes = np.zeros(len(freqs), dtype=np.int64)
+        notes[usable] = np.round(12 * np.log2(freqs[usable] / 440.0)).astype(np.int64) % 12
+        chroma_map = np.zeros((len(freqs), 12), dtype=np.float32)
+        chroma_map[np.nonzero(usable)[0], notes[usable]] = 1.0
+        _chroma_map = chroma_map
+        _planes = np.random.default_rng(0x0911).standard_normal((BITS, SEGMENTS * 12)).astype(np.float32)
+    return _chroma_map, _planes
+
+
+def decode_window(path, start=WINDOW_START, length=WINDOW_LENGTH, timeout=60):
+    """
+    PCM mono de [start, start + length) como int16 (vacío si falla). Un
+    ffmpeg colgado deja pasar TimeoutExpired: puede ser el disco, se reintenta.
+    """
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-ss", str(start), "-t", str(length),
+           "-i", path, "-vn", "-ac", "1", "-ar", str(RATE), "-f", "s16le", "-"]
+    try:
+        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                             timeout=timeout, check=False)
+    except OSError:
+        return np.zeros(0, dtype=np.int16)
+    return np.frombuffer(res.stdout[:len(res.stdout) // 2 * 2], dtype=np.int16)
+
+
+def fingerprint(samples):
+    """(firma de BITS bits, vector float32) o None si no hay audio suficiente"""
+    if len(samples) < FFT_SIZE * 4:
+        return None
+    chroma_map, planes = _tables()
+    audio = samples.astype(np.float32) / 32768.0
+    count = 1 + (len(audio) - FFT_SIZE) // HOP
+    frames = np.lib.stride_tricks.as_strided(
+        audio, shape=(count, FFT_SIZE), strides=(audio.strides[0] * HOP, audio.strides[0]))
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FFT_SIZE).astype(np.float32), axis=1))
+    chroma = spectrum @ chroma_map
+
+    # Tramos en silencio no dicen nada: se descartan antes de promediar
+    energy = chroma.sum(axis=1)
+    loud = energy > energy.max() * 0.01 if energy.max() > 0 else energy > 0
+    if loud.sum() < SEGMENTS:
+        return None
+    chroma = chroma[loud]
+    chroma /= np.linalg.norm(chroma, axis=1, keepdims=True) + 1e-9
+
+    vector = np.concatenate([seg.mean(axis=0) for seg in np.array_split(chroma, SEGMENTS)])
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return None
+    vector /= norm
+
+    bits = (planes @ vector) > 0
+    sig = 0
+    for bit in bits:
+        sig = (sig << 1) | int(bit)
+    return sig, vector.astype(np.float32)
+
+
+def _failed(path):
+    """Resultado de una pista que no se pudo procesar: se guarda sin firma"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return path, None, None, None
+    return path, (st.st_mtime, st.st_size), None, None
+
+
+def fingerprint_file(path):
+    """
+    Se ejecuta en los procesos del pool: (ruta, (mtime, tamaño), firma,
+    vector en bytes). Sin (mtime, tamaño) el resultado no se guarda.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return path, None, None, None
+    try:
+        samples = decode_window(path)
+        if len(samples) < RATE * 5:
+            # Pista corta: la ventana arranca desde el principio
+            samples = decode_window(path, start=0)
+    except subprocess.TimeoutExpired:
+        # Falla pasajera (disco de red lento, sistema cargado): queda pendiente
+        return path, None, None, None
+    result = fingerprint(samples)
+    if result is None:
+        return path, (st.st_mtime, st.st_size), None, None
+    sig, vector = result
+    return path, (st.st_mtime, st.st_size), sig, vector.astype(np.float16).tobytes()
+
+
+class FingerprintStore:
+    """Huellas en SQLite con clave (ruta, mtime, tamaño), como la caché de metadatos"""
+
+    # SQLite limita la cantidad de parámetros por consulta
+    _CHUNK = 500
+
+    def __init__(self, db_path=FINGERPRINT_DB):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=5)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " path TEXT PRIMARY KEY,"
+            " mtime REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " sig BLOB,"
+            " vector BLOB)"
+        )
+        self.conn.commit()
+
+    def pending(self, paths):
+        """Las rutas sin huella vigente (nuevas o modificadas)"""
+        paths = list(paths)
+        known = {}
+        for i in range(0, len(paths), self._CHUNK):
+            chunk = paths[i:i + self._CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for path, mtime, size in self.conn.execute(
+                    f"SELECT path, mtime, size FROM fingerprints WHERE path IN ({marks})", chunk):
+                known[path] = (mtime, size)
+        todo = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (st.st_mtime, st.st_size):
+                todo.append(path)
+        return todo
+
+    def put_many(self, results):
+        """
+        Los que no se pudieron leer también se guardan (sin firma): no se
+        reintentan. Los que no traen (mtime, tamaño) quedan para la próxima.
+        """
+        rows = [(path, st[0], st[1], None if sig is None else sig.to_bytes(BITS // 8, "big"), vector)
+                for path, st, sig, vector in results if st is not None]
+        if rows:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints (path, mtime, size, sig, vector)"
+                " VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.commit()
+
+    def load(self, paths):
+        """{ruta: (firma, vector float32)} de las que tienen huella"""
+        found = {}
+        paths = list(paths)
+        for i in range(0, len(paths), self._CHUNK):
+            chunk = paths[i:i + self._CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for path, sig, vector in self.conn.execute(
+                    f"SELECT path, sig, vector FROM fingerprints"
+                    f" WHERE path IN ({marks}) AND sig IS NOT NULL", chunk):
+                found[path] = (int.from_bytes(sig, "big"),
+                               np.frombuffer(vector, dtype=np.float16).astype(np.float32))
+        return found
+
+    def close(self):
+        self.conn.close()
+
+
+def compute(paths, store, workers=None, on_progress=None, save_every=50):
+    """
+    Calcula las huellas que falten. Se guarda cada 'save_every' resultados,
+    así una interrupción (Ctrl+C) pierde a lo sumo ese lote.
+    """
+    todo = store.pending(paths)
+    if not todo:
+        return 0
+    workers = workers or default_workers()
+    done = 0
+    batch = []
+    todo_iter = iter(todo)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    running = {}  # future -> ruta
+
+    def submit(path):
+        nonlocal pool
+        try:
+            fut = pool.submit(fingerprint_file, path)
+        except BrokenProcessPool:
+            # Un proceso murió (sin memoria, señal): se sigue con un pool nuevo
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = ProcessPoolExecutor(max_workers=workers)
+            fut = pool.submit(fingerprint_file, path)
+        running[fut] = path
+
+    try:
+        # Pocos pedidos en vuelo a la vez: no se encolan 100.000 futures de entrada
+        for path in todo_iter:
+            submit(path)
+            if len(running) >= workers * 4:
+                break
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                path = running.pop(fut)
+                try:
+                    batch.append(fut.result())
+                except BrokenProcessPool:
+                    # No se sabe cuál de las que estaban en vuelo lo rompió:
+                    # ninguna se marca como fallida, quedan para la próxima
+                    pass
+                except Exception as e:
+                    # Un error de NumPy en una pista no corta toda la corrida
+                    print(f"\nError fingerprinting {path}: {e}", file=sys.stderr)
+                    batch.append(_failed(path))
+                done += 1
+                path = next(todo_iter, None)
+                if path is not None:
+                    submit(path)
+            if len(batch) >= save_every:
+                store.put_many(batch)
+                batch = []
+            if on_progress:
+                on_progress(done, len(todo))
+    finally:
+        store.put_many(batch)
+        pool.shutdown(wait=False, cancel_futures=True)
+    return done
+
+
+def find_duplicates(fingerprints, threshold=THRESHOLD):
+    """
+    Grupos de rutas que suenan igual. fingerprints: {ruta: (firma, vector)}.
+    Candidatos: firmas que coinciden en alguna banda de BAND_BITS bits (LSH).
+    """
+    paths = list(fingerprints)
+    buckets = {}
+    mask = (1 << BAND_BITS) - 1
+    for i, path in enumerate(paths):
+        sig = fingerprints[path][0]
+        for band in range(BITS // BAND_BITS):
+            key = (band, (sig >> (band * BAND_BITS)) & mask)
+            buckets.setdefault(key, []).append(i)
+
+    candidates = set()
+    for members in buckets.values():
+        if 1 < len(members) <= MAX_BUCKET:
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    candidates.add((members[a], members[b]))
+
+    # Unión de conjuntos con los pares confirmados
+    parent = list(range(len(paths)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in candidates:
+        va, vb = fingerprints[paths[a]][1], fingerprints[paths[b]][1]
+        if float(va @ vb) >= threshold:
+            ra, rb = root(a), root(b)
+            if ra != rb:
+                parent[rb] = ra
+
+    groups = {}
+    for i, path in enumerate(paths):
+        groups.setdefault(root(i), []).append(path)
+    return sorted((sorted(g) for g in groups.values() if len(g) > 1), key=lambda g: g[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find duplicate tracks in the Oply library by acoustic fingerprint")
+    parser.add_argument("folders", nargs="*",
+                        help="only tracks inside these folders (default: the whole library)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"processes (default: {default_workers()}, one per core)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"cosine similarity to call two tracks equal (default: {THRESHOLD})")
+    parser.add_argument("--no-compute", action="store_true",
+                        help="only compare fingerprints that are already stored")
+    parser.add_argument("--json", action="store_true", help="print the groups as JSON")
+    args = parser.parse_args()
+
+    if not NUMPY_AVAILABLE:
+        sys.exit("oply-dupes needs NumPy (python3-numpy)")
+    if not args.no_compute and shutil.which("ffmpeg") is None:
+        sys.exit("oply-dupes needs ffmpeg")
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from oply_library import Library
+
+    library = Library(LIBRARY_DB)
+    paths = library.paths(args.folders)
+    library.close()
+    if not paths:
+        sys.exit("The library is empty: add music folders in Oply first")
+
+    store = FingerprintStore()
+
+    def progress(done, total):
+        print(f"\rFingerprinting: {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    try:
+        if not args.no_compute and compute(paths, store, args.workers, progress):
+            print(file=sys.stderr)
+    except KeyboardInterrupt:
+        print("\nInterrupted: run again to continue where it stopped", file=sys.stderr)
+        store.close()
+        return 130
+
+    groups = find_duplicates(store.load(paths), args.threshold)
+    store.close()
+
+    if args.json:
+        print(json.dumps(groups, ensure_ascii=False, indent=2))
+        return 0
+    for group in groups:
+        # Primero el más grande: normalmente el de mejor calidad
+        sized = sorted(((os.path.getsize(p) if os.path.exists(p) else 0, p) for p in group), reverse=True)
+        for size, path in sized:
+            print(f"{size / 2**20:8.1f} MiB  {path}")
+        print()
+    print(f"{len(groups)} groups of duplicates in {len(paths)} tracks", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# Oply - Traducciones compartidas
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Los textos de Oply, Oply Radio, Oply Video y Oply Convert viven en
+# i18n/<idioma>.json, un archivo por idioma con una sección por aplicación:
+#
+#   {"oply": {...}, "radio": {...}, "video": {...}, "convert": {...}}
+#
+# Cada proceso lee solo el idioma activo (y el inglés para completar lo
+# que falte), la primera vez que lo pide. Las cuatro aplicaciones leen los
+# mismos archivos, que quedan en la caché de páginas del sistema.
+
+import os
+import json
+
+I18N_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "i18n")
+
+FALLBACK = "en"
+
+# idioma -> contenido del archivo ({} si no existe)
+_files = {}
+
+
+def _load(lang):
+    data = _files.get(lang)
+    if data is None:
+        data = {}
+        # Solo códigos simples: el valor puede venir de language.json o de $LANG
+        if lang and lang.replace("_", "").replace("-", "").isalnum():
+            try:
+                with open(os.path.join(I18N_DIR, f"{lang}.json"), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+        _files[lang] = data
+    return data
+
+
+def has_language(app, lang):
+    """True si hay traducción de la aplicación a ese idioma"""
+    return bool(lang) and app in _load(lang)
+
+
+def catalog(app, lang):
+    """Textos de la aplicación en 'lang', con el inglés para las claves que falten"""
+    texts = dict(_load(FALLBACK).get(app, {}))
+    if lang and lang != FALLBACK:
+        texts.update(_load(lang).get(app, {}))
+    return texts
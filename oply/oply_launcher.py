@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# Oply - Lanzador de línea de comandos (oply, oply --add)
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Si ya hay una ventana de Oply abierta, le pasa los archivos por el socket
+# de control usando solo la biblioteca estándar y termina. GTK, los
+# idiomas y el resto de Oply.py se cargan únicamente si hay que abrir una
+# ventana nueva. Los gestores de archivos llaman a esto en bucle.
+
+import time
+LAUNCH_T0 = time.monotonic()
+
+import os
+import sys
+
+from oply_control import ControlClient, ControlError, OPLY_SOCKET
+
+
+def parse_args(argv):
+    """(acción, archivos) a partir de los argumentos de oply"""
+    if argv and argv[0] == "--add":
+        return "ADD", argv[1:]
+    return "PLAY", argv
+
+
+def send_to_socket(files, action="PLAY"):
+    """Pasar archivos a una instancia ya abierta; False si no hay ninguna"""
+    paths = [os.path.abspath(f) for f in files]
+    try:
+        with ControlClient(OPLY_SOCKET) as client:
+            client.request("play" if action == "PLAY" else "add", paths=paths)
+        return True
+    except ControlError as e:
+        # Hay una instancia, pero rechazó el pedido (por ejemplo, archivos inexistentes)
+        print(f"Oply: {e}")
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def forward(argv):
+    """True si los archivos quedaron en manos de una ventana ya abierta"""
+    action, files = parse_args(argv)
+    return bool(files) and send_to_socket(files, action)
+
+
+def main():
+    if forward(sys.argv[1:]):
+        return 0
+
+    import Oply
+    Oply.STARTUP_T0 = LAUNCH_T0
+    Oply.main()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# Oply - Biblioteca de música con búsqueda
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Índice persistente (SQLite) de las pistas de las carpetas registradas,
+# armado con la caché de metadatos. La búsqueda usa FTS5 con el tokenizador
+# trigram (SQLite 3.34+), que encuentra cualquier fragmento de título,
+# artista, álbum o nombre de archivo sin recorrer la tabla. Con un SQLite
+# más viejo se usa FTS5 por prefijos, y sin FTS5, LIKE.
+#
+# Uso: oply-library [--remove CARPETA ...]   (sin argumentos lista las carpetas)
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from oply_metadata import get_metadata
+from oply_scanner import LibraryScanner
+
+LIBRARY_DB = os.path.expanduser("~/.config/oply/library.db")
+
+# Resultados por búsqueda: más no entran en pantalla ni hacen falta
+SEARCH_LIMIT = 500
+
+
+def _fts_options(conn):
+    """(tokenizador, mínimo de caracteres por palabra) o None si no hay FTS5"""
+    for tokenize, min_chars in (("trigram", 3), ("unicode61 remove_diacritics 2", 1)):
+        try:
+            conn.execute(f"CREATE VIRTUAL TABLE temp.probe USING fts5(x, tokenize='{tokenize}')")
+            conn.execute("DROP TABLE temp.probe")
+            return tokenize, min_chars
+        except sqlite3.Error:
+            continue
+    return None
+
+
+class Library:
+    """
+    Tablas:
+      folders  carpetas registradas
+      tracks   una fila por archivo, con sus metadatos
+      search   índice FTS5 sobre tracks (contenido externo, lo mantienen triggers)
+    Escrituras con lock desde cualquier hilo; search() usa su propia
+    conexión de lectura (WAL) y no espera a quien esté indexando.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.tokenize = None
+        self.min_chars = 1
+        self._conn = None
+        self._reader = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._closed:
+            # Un hilo que llega tarde no vuelve a abrir la base al salir
+            raise sqlite3.ProgrammingError("library is closed")
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS folders (path TEXT PRIMARY KEY)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tracks ("
+                " id INTEGER PRIMARY KEY,"
+                " path TEXT UNIQUE NOT NULL,"
+                " name TEXT, title TEXT, artist TEXT, album TEXT,"
+                " duration REAL,"
+                " generation INTEGER NOT NULL DEFAULT 0)"
+            )
+            options = _fts_options(conn)
+            if options is not None:
+                self.tokenize, self.min_chars = options
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'search'"
+                ).fetchone()
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5("
+                    " name, title, artist, album,"
+                    f" content='tracks', content_rowid='id', tokenize='{self.tokenize}')"
+                )
+                conn.executescript(
+                    "CREATE TRIGGER IF NOT EXISTS tracks_ai AFTER INSERT ON tracks BEGIN"
+                    "  INSERT INTO search(rowid, name, title, artist, album)"
+                    "  VALUES (new.id, new.name, new.title, new.artist, new.album);"
+                    " END;"
+                    "CREATE TRIGGER IF NOT EXISTS tracks_ad AFTER DELETE ON tracks BEGIN"
+                    "  INSERT INTO search(search, rowid, name, title, artist, album)"
+                    "  VALUES ('delete', old.id, old.name, old.title, old.artist, old.album);"
+                    " END;"
+                    "CREATE TRIGGER IF NOT EXISTS tracks_au AFTER UPDATE OF name, title, artist, album ON tracks"
+                    " WHEN old.name IS NOT new.name OR old.title IS NOT new.title"
+                    "  OR old.artist IS NOT new.artist OR old.album IS NOT new.album BEGIN"
+                    "  INSERT INTO search(search, rowid, name, title, artist, album)"
+                    "  VALUES ('delete', old.id, old.name, old.title, old.artist, old.album);"
+                    "  INSERT INTO search(rowid, name, title, artist, album)"
+                    "  VALUES (new.id, new.name, new.title, new.artist, new.album);"
+                    " END;"
+                )
+                if not exists:
+                    # Índice nuevo sobre una tabla que ya tenía datos
+                    conn.execute("INSERT INTO search(search) VALUES ('rebuild')")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    # --- carpetas ---
+
+    def folders(self):
+        with self._lock:
+            return [row[0] for row in self._db().execute("SELECT path FROM folders ORDER BY path")]
+
+    def add_folders(self, paths):
+        """Registra carpetas; devuelve las que no estaban"""
+        added = []
+        with self._lock:
+            db = self._db()
+            for path in paths:
+                path = os.path.abspath(path)
+                if db.execute("INSERT OR IGNORE INTO folders (path) VALUES (?)", (path,)).rowcount:
+                    added.append(path)
+            db.commit()
+        return added
+
+    def remove_folder(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM folders WHERE path = ?", (path,))
+            db.execute("DELETE FROM tracks WHERE path >= ? AND path < ?",
+                       (path + os.sep, path + chr(ord(os.sep) + 1)))
+            db.commit()
+
+    # --- pistas ---
+
+    def next_generation(self):
+        with self._lock:
+            row = self._db().execute("SELECT MAX(generation) FROM tracks").fetchone()
+        return (row[0] or 0) + 1
+
+    def add_tracks(self, items, generation=0):
+        """Alta o actualización en una transacción: [(ruta, metadatos)]"""
+        rows = [
+            (path, os.path.basename(path), meta.get("title", ""), meta.get("artist", ""),
+             meta.get("album", ""), float(meta.get("duration") or 0), generation)
+            for path, meta in items
+        ]
+        if not rows:
+            return
+        with self._lock:
+            try:
+                db = self._db()
+                # Si los textos no cambiaron, el trigger no toca el índice FTS
+                db.executemany(
+                    "INSERT INTO tracks (path, name, title, artist, album, duration, generation)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(path) DO UPDATE SET"
+                    "  name = excluded.name, title = excluded.title, artist = excluded.artist,"
+                    "  album = excluded.album, duration = excluded.duration,"
+                    "  generation = excluded.generation", rows
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Error updating library: {e}")
+
+    def prune(self, root, generation):
+        """Borra las pistas de 'root' que no aparecieron en el último escaneo"""
+        root = os.path.abspath(root)
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "DELETE FROM tracks WHERE path >= ? AND path < ? AND generation < ?",
+                (root + os.sep, root + chr(ord(os.sep) + 1), generation)
+            )
+            db.commit()
+
+    def count(self):
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    def paths(self, roots=None):
+        """Rutas de la biblioteca, todas o solo las que están dentro de 'roots'"""
+        with self._lock:
+            db = self._db()
+            if not roots:
+                return [row[0] for row in db.execute("SELECT path FROM tracks ORDER BY path")]
+            found = []
+            for root in roots:
+                root = os.path.abspath(root)
+                found.extend(row[0] for row in db.execute(
+                    "SELECT path FROM tracks WHERE path >= ? AND path < ? ORDER BY path",
+                    (root + os.sep, root + chr(ord(os.sep) + 1))
+                ))
+            return found
+
+    # --- búsqueda ---
+
+    def _read(self):
+        if self._reader is None:
+            with self._lock:
+                self._db()
+            self._reader = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+        return self._reader
+
+    def search(self, text, limit=SEARCH_LIMIT):
+        """
+        Pistas que contienen todas las palabras (en cualquier campo):
+        [(ruta, título, artista, álbum, duración)], ordenadas por artista/álbum
+        """
+        words = text.split()
+        if not words:
+            return []
+        if self.tokenize is not None:
+            indexed = [w for w in words if len(w) >= self.min_chars]
+            short = [w for w in words if len(w) < self.min_chars]
+        else:
+            indexed, short = [], words
+
+        # Las palabras que el índice no cubre (menos de 3 letras con
+        # trigram) se filtran con LIKE sobre las filas que devuelve
+        where = []
+        params = []
+        for word in short:
+            where.append("(t.name LIKE ? ESCAPE '\\' OR t.title LIKE ? ESCAPE '\\'"
+                         " OR t.artist LIKE ? ESCAPE '\\' OR t.album LIKE ? ESCAPE '\\')")
+            pattern = "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            params.extend([pattern] * 4)
+        if indexed:
+            quoted = ['"' + w.replace('"', '""') + '"' for w in indexed]
+            if not self.tokenize.startswith("trigram"):
+                quoted = [q + "*" for q in quoted]
+            sql = "SELECT t.path, t.title, t.artist, t.album, t.duration" \
+                  " FROM search JOIN tracks t ON t.id = search.rowid WHERE search MATCH ?"
+            params.insert(0, " ".join(quoted))
+            if where:
+                sql += " AND " + " AND ".join(where)
+        else:
+            sql = "SELECT t.path, t.title, t.artist, t.album, t.duration FROM tracks t" \
+                  " WHERE " + " AND ".join(where)
+
+        # Sin ORDER BY la consulta se corta al llegar al límite en lugar de
+        # ordenar todas las coincidencias; se ordenan solo las que vuelven
+        try:
+            rows = self._read().execute(sql + " LIMIT ?", (*params, limit)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Library search error: {e}")
+            return []
+        rows.sort(key=lambda r: ((r[2] or "").lower(), (r[3] or "").lower(), r[0]))
+        return rows
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for conn in (self._conn, self._reader):
+                if conn is not None:
+                    conn.close()
+            self._conn = self._reader = None
+
+
+class LibraryIndexer:
+    """
+    Recorre carpetas registradas en segundo plano y actualiza la biblioteca.
+    Los metadatos salen de la caché; los que faltan se leen en un pool y
+    se guardan también en la caché. Al terminar cada carpeta se borran las
+    pistas que ya no están. on_done(indexer) se llama desde otro hilo.
+    """
+
+    def __init__(self, library, cache, roots, extensions, on_done=None, workers=4):
+        self.library = library
+        self.cache = cache
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.extensions = extensions
+        self.on_done = on_done
+        self.workers = workers
+        self.indexed = 0
+        self._scanner = None
+        self._pool = None
+        self._generation = 0
+        self._cancel = threading.Event()
+        self._thread = None
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="oply-library", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+        if self._scanner is not None:
+            self._scanner.cancel()
+
+    def wait(self, timeout=None):
+        """Espera a que termine el hilo (después de cancel(), antes de cerrar las bases)"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self._thread is None or not self._thread.is_alive()
+
+    def _run(self):
+        self._generation = self.library.next_generation()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="oply-tags")
+        try:
+            for root in self.roots:
+                if self._cancel.is_set():
+                    break
+                self._scanner = LibraryScanner([root], self.extensions, on_batch=self._on_batch,
+                                               workers=2)
+                self._scanner.start()
+                self._scanner.wait()
+                # Un escaneo incompleto no sirve para saber qué se borró
+                if not self._cancel.is_set() and os.path.isdir(root):
+                    self.library.prune(root, self._generation)
+        finally:
+            self._pool.shutdown(wait=False)
+            if self.on_done:
+                self.on_done(self)
+
+    def _on_batch(self, scanner, files):
+        if self._cancel.is_set():
+            return
+        known = self.cache.snapshot(files)
+        items = [(path, known[path][0]) for path in files if path in known]
+        missing = [path for path in files if path not in known]
+        if missing:
+            read = list(self._pool.map(self._read_tags, missing))
+            self.cache.put_many([(path, meta, st) for path, meta, st in read if st is not None])
+            items.extend((path, meta) for path, meta, _st in read)
+        self.library.add_tracks(items, self._generation)
+        self.indexed += len(items)
+
+    def _read_tags(self, path):
+        try:
+            st = os.stat(path)
+            st = (st.st_mtime, st.st_size)
+        except OSError:
+            st = None
+        return path, get_metadata(path), st
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or remove the folders of the Oply library")
+    parser.add_argument("--remove", nargs="+", metavar="FOLDER", default=[],
+                        help="stop indexing these folders and drop their tracks")
+    args = parser.parse_args()
+
+    library = Library(LIBRARY_DB)
+    try:
+        folders = library.folders()
+        for folder in args.remove:
+            path = os.path.abspath(folder)
+            if path not in folders:
+                print(f"Not in the library: {path}", file=sys.stderr)
+                continue
+            library.remove_folder(path)
+            folders.remove(path)
+            print(f"Removed {path}")
+        if not args.remove:
+            for folder in folders:
+                print(folder)
+            print(f"{len(folders)} folders, {library.count()} tracks", file=sys.stderr)
+    finally:
+        library.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
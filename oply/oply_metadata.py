@@ -0,0 +1,388 @@
+# Oply - Lectura de metadatos de audio
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Un solo sondeo por archivo: primero mutagen (en proceso, sin fork) y
+# ffprobe/ffmpeg solo para los formatos que mutagen no sabe leer.
+
+import os
+import json
+import base64
+import sqlite3
+import subprocess
+import threading
+
+try:
+    import mutagen
+    MUTAGEN_AVAILABLE = True
+except ImportError:
+    MUTAGEN_AVAILABLE = False
+
+
+def empty_metadata(filepath):
+    return {"title": os.path.basename(filepath), "duration": 0, "artist": "", "album": ""}
+
+
+def _first(value):
+    """mutagen devuelve listas; nos quedamos con el primer valor como texto."""
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else ""
+    return str(value).strip() if value is not None else ""
+
+
+def read_tags_mutagen(filepath):
+    """Lee etiquetas y duración en proceso. Devuelve None si mutagen no puede."""
+    if not MUTAGEN_AVAILABLE:
+        return None
+    try:
+        audio = mutagen.File(filepath, easy=True)
+    except Exception:
+        return None
+    if audio is None:
+        return None
+
+    tags = audio.tags or {}
+    info = getattr(audio, "info", None)
+    duration = float(getattr(info, "length", 0) or 0)
+
+    def tag(name):
+        try:
+            return _first(tags.get(name))
+        except Exception:
+            return ""
+
+    return {
+        "title": tag("title"),
+        "artist": tag("artist"),
+        "album": tag("album"),
+        "duration": duration,
+    }
+
+
+def probe_file(filepath, timeout=10):
+    """Una sola llamada a ffprobe con formato, streams y etiquetas en JSON."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_format", "-show_streams",
+        "-of", "json",
+        filepath
+    ]
+    try:
+        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             text=True, timeout=timeout)
+        if res.returncode != 0 or not res.stdout.strip():
+            return None
+        return json.loads(res.stdout)
+    except Exception:
+        return None
+
+
+def read_tags_ffprobe(filepath):
+    data = probe_file(filepath)
+    if not data:
+        return None
+
+    fmt = data.get("format") or {}
+    tags = {}
+    # ogg/opus guardan las etiquetas en el stream de audio, no en el formato
+    for stream in data.get("streams") or []:
+        if stream.get("codec_type") == "audio":
+            for k, v in (stream.get("tags") or {}).items():
+                tags.setdefault(k.lower(), v)
+    for k, v in (fmt.get("tags") or {}).items():
+        tags[k.lower()] = v
+
+    try:
+        duration = float(fmt.get("duration") or 0)
+    except (TypeError, ValueError):
+        duration = 0
+
+    return {
+        "title": (tags.get("title") or "").strip(),
+        "artist": (tags.get("artist") or "").strip(),
+        "album": (tags.get("album") or "").strip(),
+        "duration": duration,
+    }
+
+
+def get_metadata(filepath):
+    try:
+        meta = read_tags_mutagen(filepath)
+        if meta is None:
+            meta = read_tags_ffprobe(filepath)
+        if meta is None:
+            meta = {"title": "", "artist": "", "album": "", "duration": 0}
+
+        title = meta["title"] or os.path.basename(filepath)
+        artist = meta["artist"]
+        album = meta["album"]
+
+        if not artist and not album:
+            filename = os.path.basename(filepath)
+            name_without_ext = os.path.splitext(filename)[0]
+
+            if ' - ' in name_without_ext:
+                parts = name_without_ext.split(' - ')
+                if len(parts) >= 2:
+                    artist = parts[0].strip()
+
+                    if len(parts) >= 3:
+                        album = parts[1].strip()
+
+        return {"title": title, "duration": meta["duration"], "artist": artist, "album": album}
+    except Exception:
+        return empty_metadata(filepath)
+
+
+class MetadataCache:
+    """
+    Caché persistente de metadatos en SQLite, con clave (ruta, mtime, tamaño).
+    Si el archivo cambia en disco la entrada deja de valer y se vuelve a leer.
+    """
+
+    # SQLite limita la cantidad de parámetros por consulta
+    _CHUNK = 500
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                " path TEXT PRIMARY KEY,"
+                " mtime REAL NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " title TEXT, artist TEXT, album TEXT,"
+                " duration REAL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _stat(filepath):
+        try:
+            st = os.stat(filepath)
+            return st.st_mtime, st.st_size
+        except OSError:
+            return None
+
+    @staticmethod
+    def _row_to_meta(row):
+        return {"title": row[0], "artist": row[1], "album": row[2], "duration": row[3] or 0}
+
+    def get(self, filepath):
+        """Devuelve los metadatos guardados o None si faltan o están viejos."""
+        st = self._stat(filepath)
+        if st is None:
+            return None
+        with self._lock:
+            try:
+                row = self._db().execute(
+                    "SELECT title, artist, album, duration FROM metadata"
+                    " WHERE path = ? AND mtime = ? AND size = ?",
+                    (filepath, st[0], st[1])
+                ).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self._row_to_meta(row)
+
+    def get_many(self, paths):
+        """
+        Búsqueda en bloque: {ruta: metadatos} solo para las entradas vigentes.
+        No lanza procesos; lo que falte queda fuera del resultado.
+        """
+        return {path: meta for path, (meta, _st) in self.snapshot(paths).items()}
+
+    def snapshot(self, paths):
+        """Como get_many(), pero con el (mtime, tamaño) validado: {ruta: (metadatos, st)}"""
+        paths = list(paths)
+        found = {}
+        rows = {}
+        with self._lock:
+            try:
+                db = self._db()
+                for i in range(0, len(paths), self._CHUNK):
+                    chunk = paths[i:i + self._CHUNK]
+                    marks = ",".join("?" * len(chunk))
+                    for row in db.execute(
+                        "SELECT path, mtime, size, title, artist, album, duration"
+                        f" FROM metadata WHERE path IN ({marks})", chunk
+                    ):
+                        rows[row[0]] = row
+            except sqlite3.Error:
+                pass
+
+        for path in paths:
+            row = rows.get(path)
+            if row is not None and self._stat(path) == (row[1], row[2]):
+                found[path] = (self._row_to_meta(row[3:]), (row[1], row[2]))
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(paths) - len(found)
+        return found
+
+    def put(self, filepath, metadata, st=None):
+        if st is None:
+            st = self._stat(filepath)
+        if st is None:
+            return
+        with self._lock:
+            try:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO metadata"
+                    " (path, mtime, size, title, artist, album, duration)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (filepath, st[0], st[1], metadata.get("title", ""),
+                     metadata.get("artist", ""), metadata.get("album", ""),
+                     float(metadata.get("duration") or 0))
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Error saving metadata cache: {e}")
+
+    def put_many(self, items):
+        """Guarda muchas entradas en una sola transacción: [(ruta, metadatos, (mtime, tamaño))]"""
+        rows = [
+            (path, st[0], st[1], meta.get("title", ""), meta.get("artist", ""),
+             meta.get("album", ""), float(meta.get("duration") or 0))
+            for path, meta, st in items
+        ]
+        if not rows:
+            return
+        with self._lock:
+            try:
+                db = self._db()
+                db.executemany(
+                    "INSERT OR REPLACE INTO metadata"
+                    " (path, mtime, size, title, artist, album, duration)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Error saving metadata cache: {e}")
+
+    def lookup(self, filepath):
+        """get_metadata() con caché: solo se sondea el archivo si hace falta."""
+        meta = self.get(filepath)
+        if meta is not None:
+            return meta
+        st = self._stat(filepath)
+        meta = get_metadata(filepath)
+        if st is not None:
+            self.put(filepath, meta, st)
+        return meta
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _pick_picture(pictures):
+    """Entre varias imágenes, preferir la portada (tipo 3 de APIC/FLAC)."""
+    pictures = [p for p in pictures if getattr(p, "data", None)]
+    if not pictures:
+        return None
+    for pic in pictures:
+        if getattr(pic, "type", None) == 3:
+            return pic.data
+    return pictures[0].data
+
+
+def read_embedded_cover_mutagen(filepath):
+    """
+    Lee la carátula embebida en proceso (APIC, PICTURE de FLAC/Ogg, covr de MP4).
+    Devuelve (leido, bytes): leido=False si mutagen no entiende el archivo.
+    """
+    if not MUTAGEN_AVAILABLE:
+        return (False, None)
+    try:
+        audio = mutagen.File(filepath)
+    except Exception:
+        return (False, None)
+    if audio is None:
+        return (False, None)
+
+    try:
+        # FLAC nativo
+        pictures = getattr(audio, "pictures", None)
+        if pictures:
+            return (True, _pick_picture(pictures))
+
+        tags = audio.tags
+        if tags is None:
+            return (True, None)
+
+        # ID3 (mp3, wav, aiff)
+        if hasattr(tags, "getall"):
+            return (True, _pick_picture(tags.getall("APIC")))
+
+        # MP4 / M4A
+        covr = tags.get("covr") if hasattr(tags, "get") else None
+        if covr:
+            return (True, bytes(covr[0]))
+
+        # Vorbis comments (ogg, opus): METADATA_BLOCK_PICTURE en base64
+        blocks = tags.get("metadata_block_picture") if hasattr(tags, "get") else None
+        if blocks:
+            from mutagen.flac import Picture
+            pictures = []
+            for block in blocks:
+                try:
+                    pictures.append(Picture(base64.b64decode(block)))
+                except Exception:
+                    pass
+            return (True, _pick_picture(pictures))
+    except Exception:
+        return (True, None)
+
+    return (True, None)
+
+
+def read_embedded_cover_ffmpeg(filepath, timeout=5):
+    """Respaldo para contenedores raros: copia el stream de imagen a stdout."""
+    cmd = [
+        "ffmpeg", "-v", "error", "-i", filepath,
+        "-an", "-map", "0:v:0", "-frames:v", "1",
+        "-c:v", "copy", "-f", "image2pipe", "-"
+    ]
+    try:
+        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=timeout)
+        if res.returncode == 0 and res.stdout:
+            return res.stdout
+    except Exception:
+        pass
+    return None
+
+
+def read_embedded_cover(filepath):
+    """Bytes de la carátula embebida, sin archivos temporales; None si no tiene."""
+    handled, data = read_embedded_cover_mutagen(filepath)
+    if handled:
+        return data
+    return read_embedded_cover_ffmpeg(filepath)
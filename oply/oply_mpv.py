@@ -0,0 +1,285 @@
+# Oply - Cliente JSON-IPC de mpv compartido por Oply y Oply Radio
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Una sola conexión UNIX por aplicación. Cada comando lleva un request_id;
+# un hilo lector reparte las respuestas a sus futures y los eventos a los
+# callbacks registrados. Si mpv cierra el socket se reconecta solo.
+#
+# Los callbacks se ejecutan en el hilo lector: desde GTK hay que pasarlos
+# por GLib.idle_add antes de tocar widgets.
+#
+# No hace falta esperar a que mpv arranque: los comandos enviados antes de
+# que exista el socket quedan en cola y salen apenas se conecta.
+
+import json
+import socket
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MpvIpcClient:
+    # Comandos que se guardan mientras no hay conexión
+    BACKLOG_MAX = 64
+
+    def __init__(self, socket_path, is_alive=None):
+        """
+        socket_path: ruta de --input-ipc-server
+        is_alive: función opcional; si devuelve False se deja de reconectar
+                  (por ejemplo, lambda: proc.poll() is None)
+        """
+        self.socket_path = socket_path
+        self.is_alive = is_alive or (lambda: True)
+
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._connected = threading.Event()
+        self._closed = False
+        self._next_id = 1
+        self._pending = {}
+        self._event_handlers = {}
+        self._observers = {}
+        self._backlog = []
+        self._reader = None
+        self.started_at = None
+        self.ready_after = None
+
+    # ---------- conexión ----------
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    def start(self):
+        """Arranca el hilo lector; conecta y reconecta en segundo plano."""
+        if self._reader is None:
+            self.started_at = time.monotonic()
+            self._reader = threading.Thread(target=self._run, name="mpv-ipc", daemon=True)
+            self._reader.start()
+        return self
+
+    def wait_connected(self, timeout=None):
+        return self._connected.wait(timeout)
+
+    def wait_ready(self, timeout=5.0):
+        """
+        Handshake de arranque: espera a que mpv acepte la conexión y responda.
+        Devuelve los segundos que tardó desde start(), o None si no llegó a tiempo.
+        """
+        deadline = time.monotonic() + timeout
+        if not self._connected.wait(timeout):
+            return None
+        remaining = max(0.05, deadline - time.monotonic())
+        if self.request(["get_property", "mpv-version"], timeout=remaining) is None:
+            return None
+        return time.monotonic() - self.started_at
+
+    def close(self):
+        self._closed = True
+        self._drop_connection()
+        with self._state_lock:
+            backlog, self._backlog = self._backlog, []
+        for _args, fut in backlog:
+            if not fut.done():
+                fut.set_result(None)
+
+    def _open(self):
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            s.connect(self.socket_path)
+        except OSError:
+            s.close()
+            raise
+        return s
+
+    def _drop_connection(self):
+        with self._state_lock:
+            sock, self._sock = self._sock, None
+            pending, self._pending = self._pending, {}
+            self._connected.clear()
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_result(None)
+
+    def _run(self):
+        # Espera del socket con backoff exponencial: 5 ms, 10 ms, 20 ms... hasta 0.5 s
+        delay = 0.005
+        while not self._closed:
+            try:
+                sock = self._open()
+            except OSError:
+                if not self.is_alive():
+                    break
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+                continue
+
+            delay = 0.005
+            # Las suscripciones no sobreviven a la conexión: se renuevan. Todo
+            # se envía antes de publicar el socket; si no, un comando nuevo del
+            # hilo de GTK pasaría delante de los guardados (loadfile replace
+            # después del append de la precarga, por ejemplo)
+            for obs_id, (name, _cb) in list(self._observers.items()):
+                self._send(sock, ["observe_property", obs_id, name], Future())
+            while True:
+                with self._state_lock:
+                    backlog, self._backlog = self._backlog, []
+                    if not backlog:
+                        # Lo que llegó mientras se enviaba también salió: ahora sí
+                        self._sock = sock
+                        break
+                for args, fut in backlog:
+                    self._send(sock, args, fut)
+            if self.ready_after is None:
+                self.ready_after = time.monotonic() - self.started_at
+            self._connected.set()
+            self._dispatch_event({"event": "oply-connected"})
+
+            self._read_loop(sock)
+
+            self._drop_connection()
+            if not self._closed:
+                self._dispatch_event({"event": "oply-disconnected"})
+                if not self.is_alive():
+                    break
+
+        with self._state_lock:
+            backlog, self._backlog = self._backlog, []
+        for _args, fut in backlog:
+            if not fut.done():
+                fut.set_result(None)
+
+    def _read_loop(self, sock):
+        buf = b""
+        while not self._closed:
+            try:
+                chunk = sock.recv(65536)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buf += chunk
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                if not line.strip():
+                    continue
+                try:
+                    msg = json.loads(line.decode("utf-8", errors="replace"))
+                except ValueError:
+                    continue
+                self._handle(msg)
+
+    def _handle(self, msg):
+        if "event" in msg:
+            if msg["event"] == "property-change":
+                observer = self._observers.get(msg.get("id"))
+                if observer is not None:
+                    try:
+                        observer[1](msg.get("name"), msg.get("data"))
+                    except Exception as e:
+                        print(f"mpv property handler error: {e}")
+            self._dispatch_event(msg)
+            return
+        req_id = msg.get("request_id")
+        if req_id is None:
+            return
+        with self._state_lock:
+            fut = self._pending.pop(req_id, None)
+        if fut is not None and not fut.done():
+            fut.set_result(msg)
+
+    # ---------- eventos ----------
+    def on_event(self, name, callback):
+        """callback(msg) para eventos de mpv ('end-file', 'seek', ...)"""
+        self._event_handlers.setdefault(name, []).append(callback)
+
+    def observe_property(self, name, callback):
+        """
+        Suscribe callback(name, value) a los cambios de una propiedad.
+        mpv envía el valor actual al suscribirse y luego cada cambio.
+        """
+        obs_id = len(self._observers) + 1
+        self._observers[obs_id] = (name, callback)
+        if self.connected:
+            self.command(["observe_property", obs_id, name])
+        return obs_id
+
+    def _dispatch_event(self, msg):
+        for cb in list(self._event_handlers.get(msg.get("event"), ())):
+            try:
+                cb(msg)
+            except Exception as e:
+                print(f"mpv event handler error: {e}")
+
+    # ---------- comandos ----------
+    def command(self, args, callback=None):
+        """
+        Envía un comando sin bloquear. Devuelve un Future con la respuesta
+        completa (dict) o None si no se pudo enviar.
+        """
+        fut = Future()
+        if callback is not None:
+            fut.add_done_callback(lambda f: callback(f.result()))
+
+        with self._state_lock:
+            sock = self._sock
+            dropped = False
+            if sock is None:
+                if self._closed or len(self._backlog) >= self.BACKLOG_MAX:
+                    dropped = True
+                else:
+                    self._backlog.append((list(args), fut))
+        # El resultado fuera del lock: el callback puede volver a llamar a command()
+        if sock is None:
+            if dropped:
+                fut.set_result(None)
+            return fut
+
+        self._send(sock, args, fut)
+        return fut
+
+    def _send(self, sock, args, fut):
+        with self._state_lock:
+            req_id = self._next_id
+            self._next_id += 1
+            self._pending[req_id] = fut
+
+        payload = json.dumps({"command": list(args), "request_id": req_id}) + "\n"
+        try:
+            with self._send_lock:
+                sock.sendall(payload.encode("utf-8"))
+        except OSError:
+            with self._state_lock:
+                self._pending.pop(req_id, None)
+            if not fut.done():
+                fut.set_result(None)
+            # el lector detecta el corte y reconecta
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def request(self, args, timeout=1.0):
+        """Comando con respuesta: devuelve 'data' o None si falló."""
+        fut = self.command(args)
+        try:
+            resp = fut.result(timeout)
+        except Exception:
+            return None
+        if resp and resp.get("error") == "success":
+            return resp.get("data")
+        return None
+
+    def get_property(self, name, timeout=1.0):
+        return self.request(["get_property", name], timeout)
+
+    def set_property(self, name, value):
+        return self.command(["set_property", name, value])
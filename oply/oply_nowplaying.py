@@ -0,0 +1,125 @@
+# Oply - Estado de reproducción para Conky y otros lectores
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Oply y Oply Radio publican now_playing.json con el mismo código. El archivo
+# se escribe en un temporal y se renombra encima, así un lector nunca ve
+# un JSON a medias, y solo se reescribe cuando el estado cambia de verdad.
+#
+# Además de título y artista se guardan posición, duración y el instante
+# (monotónico y de pared) en que se tomó la posición: con is_playing el
+# lector calcula el progreso actual sin preguntarle nada al reproductor:
+#   posición_actual = position + (time.monotonic() - monotonic)
+
+import os
+import json
+import time
+import threading
+
+
+class NowPlayingPublisher:
+    # Diferencia (segundos) entre la posición informada y la esperada que
+    # cuenta como salto; por debajo de esto el lector ya interpola bien
+    DRIFT = 1.0
+
+    def __init__(self, state_file, player, source=None):
+        self.state_file = state_file
+        self.player = player
+        self.source = source
+        self._state = None
+        self._lock = threading.Lock()
+
+    def publish(self, title, artist="", is_playing=True, position=None, duration=None, **extra):
+        """Reemplaza el estado completo; escribe solo si algo cambió."""
+        state = {
+            "player": self.player,
+            "title": title,
+            "artist": artist,
+            "is_playing": bool(is_playing),
+        }
+        if self.source:
+            state["source"] = self.source
+        state.update(extra)
+        if duration:
+            state["duration"] = round(float(duration), 3)
+        if position is not None:
+            state["position"] = round(float(position), 3)
+        self._commit(state)
+
+    def update(self, **changes):
+        """Cambia solo algunos campos del último estado publicado."""
+        with self._lock:
+            if self._state is None:
+                return
+            state = dict(self._state)
+            # Sin posición nueva se usa la interpolada, no la del último guardado
+            if "position" not in changes and "position" in state:
+                state["position"] = round(self._expected_position(time.monotonic()), 3)
+        state.pop("monotonic", None)
+        state.pop("timestamp", None)
+        for key, value in changes.items():
+            if value is None:
+                state.pop(key, None)
+            elif key in ("position", "duration"):
+                state[key] = round(float(value), 3)
+            else:
+                state[key] = value
+        self._commit(state)
+
+    def clear(self):
+        with self._lock:
+            self._state = None
+            try:
+                os.remove(self.state_file)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error clearing now playing: {e}")
+
+    def _expected_position(self, now):
+        """Dónde debería estar la reproducción según lo último publicado."""
+        prev = self._state
+        position = prev.get("position")
+        if position is None or not prev.get("is_playing"):
+            return position
+        return position + (now - prev["monotonic"])
+
+    def _unchanged(self, state, now):
+        prev = self._state
+        if prev is None:
+            return False
+        for key in set(prev) | set(state):
+            if key in ("position", "monotonic", "timestamp"):
+                continue
+            if prev.get(key) != state.get(key):
+                return False
+        position = state.get("position")
+        expected = self._expected_position(now)
+        if position is None or expected is None:
+            return position == expected
+        return abs(position - expected) < self.DRIFT
+
+    def _commit(self, state):
+        now = time.monotonic()
+        with self._lock:
+            if self._unchanged(state, now):
+                return
+            state["monotonic"] = round(now, 3)
+            state["timestamp"] = round(time.time(), 3)
+            self._state = state
+            self._write(state)
+
+    def _write(self, state):
+        tmp = f"{self.state_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            print(f"Error updating now playing: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
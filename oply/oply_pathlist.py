@@ -0,0 +1,142 @@
+# Oply - Lista compacta de rutas
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Las listas grandes repiten la misma carpeta en miles de rutas. PathList
+# guarda cada carpeta una sola vez (tabla de carpetas) y por entrada solo
+# un índice de carpeta (array de enteros de 4 bytes) y el nombre del
+# archivo en bytes (UTF-8/bytes del sistema, sin el encabezado de un str).
+# Desde afuera se usa como una lista de rutas: len, [i], [a:b], del,
+# append, extend, index, in, iteración.
+
+import os
+from array import array
+from collections.abc import MutableSequence
+
+
+class PathList(MutableSequence):
+    __slots__ = ("_dirs", "_dir_ids", "_ids", "_names")
+
+    def __init__(self, paths=()):
+        self._dirs = []        # id -> carpeta con la "/" final ("" si no tiene)
+        self._dir_ids = {}     # carpeta -> id
+        self._ids = array("I")
+        self._names = []
+        self.extend(paths)
+
+    def _split(self, path):
+        head, sep, name = path.rpartition("/")
+        folder = head + sep
+        dir_id = self._dir_ids.get(folder)
+        if dir_id is None:
+            dir_id = len(self._dirs)
+            self._dirs.append(folder)
+            self._dir_ids[folder] = dir_id
+        return dir_id, os.fsencode(name)
+
+    def _join(self, i):
+        return self._dirs[self._ids[i]] + os.fsdecode(self._names[i])
+
+    # --- secuencia ---
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._join(i) for i in range(*index.indices(len(self._names)))]
+        if index < 0:
+            index += len(self._names)
+        if not 0 <= index < len(self._names):
+            raise IndexError("PathList index out of range")
+        return self._join(index)
+
+    def __setitem__(self, index, path):
+        if isinstance(index, slice):
+            raise TypeError("PathList does not support slice assignment")
+        dir_id, name = self._split(path)
+        self._ids[index] = dir_id
+        self._names[index] = name
+
+    def __delitem__(self, index):
+        del self._ids[index]
+        del self._names[index]
+
+    def insert(self, index, path):
+        dir_id, name = self._split(path)
+        self._ids.insert(index, dir_id)
+        self._names.insert(index, name)
+
+    def append(self, path):
+        dir_id, name = self._split(path)
+        self._ids.append(dir_id)
+        self._names.append(name)
+
+    def extend(self, paths):
+        if isinstance(paths, PathList):
+            paths = iter(paths)
+        ids = self._ids
+        names = self._names
+        split = self._split
+        for path in paths:
+            dir_id, name = split(path)
+            ids.append(dir_id)
+            names.append(name)
+
+    def __iter__(self):
+        dirs = self._dirs
+        fsdecode = os.fsdecode
+        for dir_id, name in zip(self._ids, self._names):
+            yield dirs[dir_id] + fsdecode(name)
+
+    def __contains__(self, path):
+        try:
+            self.index(path)
+            return True
+        except ValueError:
+            return False
+
+    def index(self, path, start=0, stop=None):
+        """Se compara (carpeta, nombre) sin volver a armar cada ruta"""
+        head, sep, name = path.rpartition("/")
+        dir_id = self._dir_ids.get(head + sep)
+        if dir_id is not None:
+            name = os.fsencode(name)
+            names = self._names
+            stop = len(names) if stop is None else stop
+            i = start
+            while True:
+                # list.index en C para el nombre; se confirma la carpeta
+                try:
+                    i = names.index(name, i, stop)
+                except ValueError:
+                    break
+                if self._ids[i] == dir_id:
+                    return i
+                i += 1
+        raise ValueError(f"{path!r} is not in PathList")
+
+    def clear(self):
+        self._dirs = []
+        self._dir_ids = {}
+        self._ids = array("I")
+        self._names = []
+
+    def copy(self):
+        """Copia independiente (para pasarle la lista a otro hilo)"""
+        other = PathList()
+        other._dirs = list(self._dirs)
+        other._dir_ids = dict(self._dir_ids)
+        other._ids = array("I", self._ids)
+        other._names = list(self._names)
+        return other
+
+    # --- extras ---
+
+    def name(self, index):
+        """Nombre del archivo, sin armar la ruta completa"""
+        return os.fsdecode(self._names[index])
+
+    def __repr__(self):
+        return f"PathList({len(self)} paths, {len(self._dirs)} folders)"
@@ -0,0 +1,444 @@
+# Oply - Archivos de listas de reproducción
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Formato .opl (versión 2): JSON por líneas. La primera línea es el
+# encabezado y cada línea siguiente es una pista con una copia de sus
+# metadatos, para mostrar la lista sin volver a leer los archivos:
+#
+#   {"oply_playlist": 2, "current_index": 0}
+#   {"path": "/music/a.mp3", "title": "A", "artist": "X", "album": "Y", "duration": 201.5, "mtime": 1700000000.0, "size": 4812345}
+#
+# Se puede leer de a una línea sin cargar el archivo entero. Las listas
+# .opl viejas (un solo objeto {"files": [...], "current_index": n}) se
+# siguen leyendo.
+#
+# También se importan y exportan M3U/M3U8 (con #EXTINF), PLS y XSPF. Todos
+# se leen como flujo: una línea o un <track> por vez. Las rutas relativas
+# se resuelven contra la carpeta de la lista.
+
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, quote
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+OPL_VERSION = 2
+
+# Campos de metadatos que se guardan por pista
+META_FIELDS = ("title", "artist", "album", "duration")
+
+
+def make_entry(path, meta=None, st=None):
+    """Línea de la lista: ruta, metadatos si se conocen y (mtime, tamaño)"""
+    entry = {"path": path}
+    if meta:
+        for field in META_FIELDS:
+            value = meta.get(field)
+            if value:
+                entry[field] = value
+    if st is not None:
+        entry["mtime"], entry["size"] = st
+    return entry
+
+
+def entry_meta(entry):
+    """Metadatos de la copia guardada, o None si la línea no los tiene"""
+    if "title" not in entry and "artist" not in entry and "duration" not in entry:
+        return None
+    return {
+        "title": entry.get("title") or os.path.basename(entry["path"]),
+        "artist": entry.get("artist", ""),
+        "album": entry.get("album", ""),
+        "duration": entry.get("duration") or 0,
+    }
+
+
+def _write_lines(path, lines):
+    """Escribe el archivo completo de una vez (temporal + rename)"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8", errors="surrogateescape") as f:
+            f.writelines(lines)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def write_opl(path, entries, current_index=0):
+    def lines():
+        yield json.dumps({"oply_playlist": OPL_VERSION, "current_index": current_index}) + "\n"
+        for entry in entries:
+            yield json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+    _write_lines(path, lines())
+
+
+def read_opl(path):
+    """
+    Devuelve (encabezado, pistas). Las pistas son un generador de dicts que
+    va leyendo el archivo; las líneas dañadas se saltean.
+    """
+    f = open(path, "r", encoding="utf-8", errors="surrogateescape")
+    first = f.readline()
+    try:
+        header = json.loads(first)
+    except ValueError:
+        header = None
+
+    if not isinstance(header, dict) or "oply_playlist" not in header:
+        # Formato viejo: un solo objeto JSON con la lista de rutas
+        f.seek(0)
+        try:
+            data = json.load(f)
+        finally:
+            f.close()
+        files = data.get("files", []) if isinstance(data, dict) else []
+        header = {"oply_playlist": 1, "current_index": data.get("current_index", 0) if isinstance(data, dict) else 0}
+        return header, ({"path": p} for p in files if isinstance(p, str))
+
+    def entries():
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and isinstance(entry.get("path"), str):
+                    yield entry
+
+    return header, entries()
+
+
+def _resolve(location, base):
+    """Ruta absoluta de una entrada; las URL que no son file:// quedan igual"""
+    location = location.strip()
+    if "://" in location:
+        # urlsplit() es lento para 100.000 entradas: file:// se resuelve a mano
+        if not location.startswith("file://"):
+            return location
+        location = location[7:]
+        if not location.startswith("/"):
+            location = "/" + location.partition("/")[2]  # file://host/ruta
+        if "%" in location:
+            location = unquote(location, errors="surrogateescape")
+    location = os.path.expanduser(location)
+    if not os.path.isabs(location):
+        location = os.path.join(base, location)
+    return os.path.normpath(location)
+
+
+def _split_title(text):
+    """'Artista - Título' como lo escriben casi todos los reproductores"""
+    artist, sep, title = text.partition(" - ")
+    if sep and artist and title:
+        return artist.strip(), title.strip()
+    return "", text.strip()
+
+
+def _split_extinf(value):
+    """
+    'duración atributos,texto': la coma que separa va fuera de comillas
+    (tvg-name="A, B" no corta el título). Con comillas sin cerrar, la primera.
+    """
+    quoted = False
+    for i, ch in enumerate(value):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == "," and not quoted:
+            return value[:i], value[i + 1:]
+    info, _, text = value.partition(",")
+    return info, text
+
+
+def _open_text(path, encoding="utf-8-sig"):
+    return open(path, "r", encoding=encoding, errors="surrogateescape")
+
+
+def read_m3u(path):
+    base = os.path.dirname(os.path.abspath(path))
+
+    def entries():
+        with _open_text(path) as f:
+            extinf = None
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith("#"):
+                    if line.startswith("#EXTINF:"):
+                        # #EXTINF:duración[ atributos],Artista - Título
+                        info, text = _split_extinf(line[8:])
+                        extinf = (info.split(" ", 1)[0], text)
+                    continue
+                entry = {"path": _resolve(line, base)}
+                if extinf is not None:
+                    seconds, text = extinf
+                    try:
+                        duration = float(seconds)
+                    except ValueError:
+                        duration = 0
+                    if duration > 0:
+                        entry["duration"] = duration
+                    artist, title = _split_title(text)
+                    if title:
+                        entry["title"] = title
+                    if artist:
+                        entry["artist"] = artist
+                    extinf = None
+                yield entry
+
+    return {"format": "m3u", "current_index": 0}, entries()
+
+
+def read_pls(path):
+    """
+    FileN/TitleN/LengthN. Cada pista se entrega cuando aparece otro número,
+    así que se asume el orden habitual (las claves de una pista juntas).
+    """
+    base = os.path.dirname(os.path.abspath(path))
+
+    def entries():
+        number = None
+        entry = {}
+        with _open_text(path) as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if not sep:
+                    continue
+                field = key.rstrip("0123456789").lower()
+                if field not in ("file", "title", "length") or field == key.lower():
+                    continue
+                n = key[len(field):]
+                if n != number:
+                    if entry.get("path"):
+                        yield entry
+                    number, entry = n, {}
+                if field == "file":
+                    entry["path"] = _resolve(value, base)
+                elif field == "title" and value.strip():
+                    artist, title = _split_title(value)
+                    entry["title"] = title
+                    if artist:
+                        entry["artist"] = artist
+                else:
+                    try:
+                        length = float(value)
+                    except ValueError:
+                        length = 0
+                    if length > 0:
+                        entry["duration"] = length
+        if entry.get("path"):
+            yield entry
+
+    return {"format": "pls", "current_index": 0}, entries()
+
+
+def read_xspf(path):
+    base = os.path.dirname(os.path.abspath(path))
+
+    def entries():
+        # iterparse + clear(): en memoria queda solo el <track> actual
+        for _event, elem in ElementTree.iterparse(path, events=("end",)):
+            if elem.tag.rpartition("}")[2] != "track":
+                continue
+            fields = {child.tag.rpartition("}")[2]: (child.text or "").strip() for child in elem}
+            elem.clear()
+            location = fields.get("location")
+            if not location:
+                continue
+            entry = {"path": _resolve(location, base)}
+            for field, key in (("title", "title"), ("creator", "artist"), ("album", "album")):
+                if fields.get(field):
+                    entry[key] = fields[field]
+            try:
+                duration = int(fields.get("duration") or 0) / 1000
+            except ValueError:
+                duration = 0
+            if duration > 0:
+                entry["duration"] = duration
+            yield entry
+
+    return {"format": "xspf", "current_index": 0}, entries()
+
+
+def write_m3u(path, entries, current_index=0):
+    def lines():
+        yield "#EXTM3U\n"
+        for entry in entries:
+            # Sin título se deja vacío: el nombre del archivo no es un título
+            title = entry.get("title") or ""
+            if title and entry.get("artist"):
+                title = f"{entry['artist']} - {title}"
+            duration = int(entry["duration"]) if entry.get("duration") else -1
+            yield f"#EXTINF:{duration},{title}\n{entry['path']}\n"
+    _write_lines(path, lines())
+
+
+def write_pls(path, entries, current_index=0):
+    def lines():
+        yield "[playlist]\n"
+        count = 0
+        for count, entry in enumerate(entries, 1):
+            yield f"File{count}={entry['path']}\n"
+            if entry.get("title"):
+                title = entry["title"]
+                if entry.get("artist"):
+                    title = f"{entry['artist']} - {title}"
+                yield f"Title{count}={title}\n"
+            yield f"Length{count}={int(entry['duration']) if entry.get('duration') else -1}\n"
+        yield f"NumberOfEntries={count}\nVersion=2\n"
+    _write_lines(path, lines())
+
+
+def write_xspf(path, entries, current_index=0):
+    def lines():
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<playlist version="1" xmlns="http://xspf.org/ns/0/">\n  <trackList>\n'
+        for entry in entries:
+            location = entry["path"]
+            if "://" not in location:
+                location = "file://" + quote(location, errors="surrogateescape")
+            track = [f"      <location>{escape(location)}</location>\n"]
+            for field, key in (("title", "title"), ("creator", "artist"), ("album", "album")):
+                if entry.get(key):
+                    track.append(f"      <{field}>{escape(entry[key])}</{field}>\n")
+            if entry.get("duration"):
+                track.append(f"      <duration>{int(entry['duration'] * 1000)}</duration>\n")
+            yield "    <track>\n" + "".join(track) + "    </track>\n"
+        yield "  </trackList>\n</playlist>\n"
+    _write_lines(path, lines())
+
+
+# extensión -> (lector, escritor)
+FORMATS = {
+    ".opl": (read_opl, write_opl),
+    ".m3u": (read_m3u, write_m3u),
+    ".m3u8": (read_m3u, write_m3u),
+    ".pls": (read_pls, write_pls),
+    ".xspf": (read_xspf, write_xspf),
+}
+
+
+def _format(path):
+    return FORMATS.get(os.path.splitext(path)[1].lower(), FORMATS[".opl"])
+
+
+def read_playlist(path):
+    """(encabezado, generador de pistas) según la extensión del archivo"""
+    return _format(path)[0](path)
+
+
+def write_playlist(path, entries, current_index=0):
+    """Escribe la lista en el formato que indique la extensión (.opl si no se conoce)"""
+    _format(path)[1](path, entries, current_index)
+
+
+def check_entries(entries):
+    """
+    Verifica un lote de pistas contra el disco:
+      missing: rutas que ya no existen
+      fresh:   (pista, (mtime, tamaño)) cuya copia de metadatos sigue valiendo
+      stale:   rutas que cambiaron desde que se guardó la lista
+    """
+    missing = []
+    fresh = []
+    stale = []
+    for entry in entries:
+        path = entry["path"]
+        if "://" in path:
+            # Radios y otras URL: las resuelve mpv al reproducir
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            missing.append(path)
+            continue
+        if entry.get("mtime") == st.st_mtime and entry.get("size") == st.st_size:
+            fresh.append((entry, (st.st_mtime, st.st_size)))
+        elif "mtime" in entry:
+            stale.append(path)
+    return missing, fresh, stale
+
+
+class PlaylistLoader:
+    """
+    Lee una lista en un hilo aparte, la entrega por lotes y verifica los
+    archivos en paralelo mientras tanto. Callbacks (desde otros hilos;
+    en GTK hay que pasarlos por GLib.idle_add):
+      on_batch(loader, entries)          dicts con "path" y, si hay, metadatos
+      on_done(loader, header, error)     terminó la lectura (error None si salió bien)
+      on_fresh(loader, items)            (pista, (mtime, tamaño)) con metadatos vigentes
+      on_checked(loader, missing, stale) terminó la verificación de todos los archivos
+    """
+
+    def __init__(self, path, on_batch, on_done, on_fresh=None, on_checked=None,
+                 batch_size=2000, workers=8):
+        self.path = path
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.on_fresh = on_fresh
+        self.on_checked = on_checked
+        self.batch_size = batch_size
+        self.workers = workers
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def start(self):
+        threading.Thread(target=self._run, name="oply-playlist", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _check(self, batch):
+        if self._cancel.is_set():
+            return [], []
+        missing, fresh, stale = check_entries(batch)
+        if fresh and self.on_fresh and not self._cancel.is_set():
+            self.on_fresh(self, fresh)
+        return missing, stale
+
+    def _run(self):
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="oply-check")
+        checks = []
+        header = {}
+        error = None
+        try:
+            header, entries = read_playlist(self.path)
+            batch = []
+            for entry in entries:
+                if self._cancel.is_set():
+                    break
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    self._deliver(batch, pool, checks)
+                    batch = []
+            if batch and not self._cancel.is_set():
+                self._deliver(batch, pool, checks)
+        except Exception as e:
+            error = e
+        self.on_done(self, header, error)
+
+        missing, stale = [], []
+        for fut in checks:
+            m, s = fut.result()
+            missing.extend(m)
+            stale.extend(s)
+        pool.shutdown(wait=False)
+        if self.on_checked and not self._cancel.is_set():
+            self.on_checked(self, missing, stale)
+
+    def _deliver(self, batch, pool, checks):
+        self.on_batch(self, batch)
+        if self.on_checked or self.on_fresh:
+            checks.append(pool.submit(self._check, batch))
@@ -0,0 +1,296 @@
+# Oply - Orden de reproducción: cola, aleatorio e historial
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Cada pista de la lista recibe un número fijo ("slot") al agregarse, que
+# no cambia aunque se borren pistas anteriores. Un árbol de Fenwick marca
+# qué slots siguen en la lista y traduce slot <-> posición en O(log n), así
+# la cola, el historial y el aleatorio guardan slots y nunca hay que
+# corregir índices al borrar. Las pistas borradas se saltean al salir.
+#
+#   cola:      heap (prioridad, orden, slot): "a continuación" antes que "después"
+#   aleatorio: Fisher-Yates perezoso, sin repetir hasta pasar por todas
+#   historial: pila de slots para "anterior" (y otra para volver a avanzar)
+
+import heapq
+import random
+from collections import deque
+
+PLAY_NEXT = 0
+PLAY_LATER = 1
+
+# Pistas que se recuerdan para "anterior"
+HISTORY_SIZE = 1000
+
+
+class _Fenwick:
+    """Suma de prefijos de 0/1 (slot vivo o no) con alta al final"""
+
+    __slots__ = ("tree",)
+
+    def __init__(self):
+        self.tree = [0]  # 1-based
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    def append(self, value):
+        i = len(self.tree)
+        # tree[i] cubre (i - lowbit(i), i]: lo que ya suman sus hijos + el nuevo
+        total = value
+        child = i - 1
+        stop = i - (i & -i)
+        while child > stop:
+            total += self.tree[child]
+            child -= child & -child
+        self.tree.append(total)
+
+    def add(self, slot, delta):
+        i = slot + 1
+        n = len(self.tree)
+        while i < n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count):
+        """Vivos entre los slots [0, count)"""
+        total = 0
+        i = count
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, k):
+        """Slot del k-ésimo vivo (k desde 0)"""
+        pos = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self.tree) and self.tree[nxt] <= k:
+                pos = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return pos
+
+
+class PlayOrder:
+    """
+    Orden de reproducción de una lista que crece al final y a la que se le
+    pueden borrar pistas. Las posiciones que recibe y devuelve son índices
+    de la lista actual (los de audio_files).
+    """
+
+    def __init__(self, rng=None):
+        self.shuffle = False
+        self.repeat = True
+        self._rng = rng or random.Random()
+        self.clear()
+
+    def clear(self):
+        self._alive = bytearray()
+        self._fenwick = _Fenwick()
+        self._count = 0
+        self._current = None
+        # Última pista que no salió de la cola: el orden normal sigue desde ahí
+        self._context = None
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._forward = []
+        self._queue = []
+        self._queue_seq = 0
+        self._reset_shuffle()
+
+    def __len__(self):
+        return self._count
+
+    # --- lista ---
+
+    def extend(self, count):
+        """Se agregaron 'count' pistas al final de la lista"""
+        for _ in range(count):
+            self._alive.append(1)
+            self._fenwick.append(1)
+        self._count += count
+
+    def remove(self, positions):
+        """Se van a borrar estas posiciones (índices de antes de borrar)"""
+        slots = [self.slot_at(p) for p in set(positions) if 0 <= p < self._count]
+        for slot in slots:
+            self._alive[slot] = 0
+            self._fenwick.add(slot, -1)
+        self._count -= len(slots)
+
+    def slot_at(self, position):
+        return self._fenwick.find(position)
+
+    def position(self, slot):
+        """Posición actual de un slot, o None si ya no está"""
+        if slot is None or not self._alive[slot]:
+            return None
+        return self._fenwick.prefix(slot)
+
+    # --- pista actual ---
+
+    @property
+    def current(self):
+        return self.position(self._current)
+
+    def played(self, position):
+        """Empezó a sonar esta posición (elegida a mano o por next/previous)"""
+        slot = self.slot_at(position)
+        if slot == self._current:
+            return
+        if self._current is not None:
+            self._history.append(self._current)
+        self._forward.clear()
+        self._current = self._context = slot
+        self._mark_shuffled(slot)
+
+    # --- cola ---
+
+    def enqueue(self, positions, priority=PLAY_NEXT):
+        """
+        PLAY_NEXT: suenan antes que todo, la última agregada primero (como
+        insertarlas delante). PLAY_LATER: al final de la cola, en orden.
+        """
+        slots = [self.slot_at(p) for p in positions if 0 <= p < self._count]
+        if priority == PLAY_NEXT:
+            slots.reverse()
+        for slot in slots:
+            self._queue_seq += 1
+            seq = -self._queue_seq if priority == PLAY_NEXT else self._queue_seq
+            heapq.heappush(self._queue, (priority, seq, slot))
+
+    def queued(self):
+        """Posiciones en la cola, en el orden en que van a sonar"""
+        return [self.position(slot) for _, _, slot in sorted(self._queue) if self._alive[slot]]
+
+    def _queue_top(self):
+        while self._queue and not self._alive[self._queue[0][2]]:
+            heapq.heappop(self._queue)
+        return self._queue[0][2] if self._queue else None
+
+    # --- aleatorio ---
+
+    def set_shuffle(self, enabled):
+        if enabled != self.shuffle:
+            self.shuffle = enabled
+            self._reset_shuffle()
+            if self._current is not None:
+                self._mark_shuffled(self._current)
+
+    def _reset_shuffle(self):
+        # Fisher-Yates perezoso sobre los slots: _perm solo guarda los
+        # lugares tocados (el resto vale perm[i] = i) y _drawn cuántos salieron
+        self._perm = {}
+        self._slot_pos = {}
+        self._drawn = 0
+        self._peeked = None
+
+    def _perm_get(self, i):
+        return self._perm.get(i, i)
+
+    def _swap(self, i, j):
+        a, b = self._perm_get(i), self._perm_get(j)
+        self._perm[i], self._perm[j] = b, a
+        self._slot_pos[b] = i
+        self._slot_pos[a] = j
+
+    def _mark_shuffled(self, slot):
+        """La pista ya sonó en esta vuelta: se pasa a la parte sorteada"""
+        if not self.shuffle:
+            return
+        pos = self._slot_pos.get(slot, slot)
+        if pos >= self._drawn:
+            self._swap(self._drawn, pos)
+            self._drawn += 1
+        if self._peeked == slot:
+            self._peeked = None
+
+    def _draw(self):
+        """Próximo slot al azar que no haya sonado en esta vuelta (O(1) promedio)"""
+        total = len(self._alive)
+        while True:
+            if self._drawn >= total:
+                if not self.repeat or not self._count:
+                    return None
+                last = self._current
+                self._reset_shuffle()
+                if last is not None and self._count > 1:
+                    # Nueva vuelta: que no empiece con la que acaba de sonar
+                    self._mark_shuffled(last)
+            j = self._rng.randrange(self._drawn, total)
+            self._swap(self._drawn, j)
+            slot = self._perm_get(self._drawn)
+            self._drawn += 1
+            if self._alive[slot]:
+                return slot
+
+    # --- avanzar / retroceder ---
+
+    def _next_slot(self):
+        if self._forward:
+            while self._forward and not self._alive[self._forward[-1]]:
+                self._forward.pop()
+            if self._forward:
+                return self._forward[-1], "forward"
+        slot = self._queue_top()
+        if slot is not None:
+            return slot, "queue"
+        if not self._count:
+            return None, None
+        if self.shuffle:
+            if self._peeked is None or not self._alive[self._peeked]:
+                self._peeked = self._draw()
+            return self._peeked, "shuffle"
+        if self._context is None:
+            return self.slot_at(0), "sequence"
+        # Vivos hasta el actual inclusive = posición del siguiente (aunque el actual se haya borrado)
+        position = self._fenwick.prefix(self._context + 1)
+        if position >= self._count:
+            if not self.repeat:
+                return None, None
+            position = 0
+        return self.slot_at(position), "sequence"
+
+    def peek_next(self):
+        """Posición de la siguiente pista, sin avanzar (None si no hay)"""
+        slot, _source = self._next_slot()
+        return self.position(slot)
+
+    def next(self):
+        """Avanza y devuelve la nueva posición actual (None si no hay siguiente)"""
+        slot, source = self._next_slot()
+        if slot is None:
+            return None
+        if source == "forward":
+            self._forward.pop()
+        elif source == "queue":
+            heapq.heappop(self._queue)
+        elif source == "shuffle":
+            self._peeked = None
+        if self._current is not None:
+            self._history.append(self._current)
+        self._current = slot
+        if source != "queue":
+            self._context = slot
+        if source != "shuffle":
+            self._mark_shuffled(slot)
+        return self.position(slot)
+
+    def previous(self):
+        """Vuelve a la pista anterior del historial (o a la anterior de la lista)"""
+        while self._history:
+            slot = self._history.pop()
+            if self._alive[slot]:
+                if self._current is not None:
+                    self._forward.append(self._current)
+                self._current = self._context = slot
+                return self.position(slot)
+        if not self._count:
+            return None
+        current = self.current
+        position = (current - 1) % self._count if current is not None else 0
+        self._current = self._context = self.slot_at(position)
+        return position
@@ -0,0 +1,159 @@
+# Oply - Escaneo recursivo de carpetas de música
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Recorre árboles de carpetas con os.scandir en un pool de hilos acotado y
+# entrega los archivos encontrados por lotes, sin bloquear a quien lo llama.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def default_workers():
+    # El escaneo es casi todo espera de E/S: algunos hilos más que núcleos
+    return min(16, (os.cpu_count() or 2) * 2)
+
+
+class LibraryScanner:
+    """
+    Escanea una o más carpetas en segundo plano.
+
+    Los callbacks se llaman desde los hilos del pool; una interfaz GTK debe
+    reenviarlos al loop principal (GLib.idle_add).
+      on_batch(scanner, files)        lista de rutas, ordenadas dentro de cada carpeta
+      on_progress(scanner, dirs, files)
+      on_done(scanner, cancelled)
+    """
+
+    def __init__(self, roots, extensions, on_batch, on_progress=None, on_done=None,
+                 workers=None, batch_size=500):
+        self.roots = list(roots)
+        self.extensions = {e.lower() for e in extensions}
+        self.on_batch = on_batch
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.batch_size = batch_size
+
+        self.dirs_scanned = 0
+        self.files_found = 0
+
+        self._workers = workers or default_workers()
+        self._executor = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._buffer = []
+        self._visited = set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self._workers,
+                                            thread_name_prefix="oply-scan")
+        roots = [r for r in self.roots if os.path.isdir(r)]
+        if not roots:
+            self._finish()
+            return self
+        with self._lock:
+            self._pending = len(roots)
+        for root in roots:
+            self._executor.submit(self._scan_dir, root)
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def _submit(self, path):
+        with self._lock:
+            self._pending += 1
+        try:
+            self._executor.submit(self._scan_dir, path)
+        except RuntimeError:
+            # pool ya cerrado (cancelación)
+            self._task_done()
+
+    def _scan_dir(self, path):
+        try:
+            if self._cancel.is_set():
+                return
+            try:
+                st = os.stat(path)
+            except OSError:
+                return
+            with self._lock:
+                key = (st.st_dev, st.st_ino)
+                if key in self._visited:
+                    return
+                self._visited.add(key)
+
+            files = []
+            subdirs = []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        name = entry.name
+                        if name.startswith("."):
+                            continue
+                        try:
+                            if entry.is_dir():
+                                subdirs.append(entry.path)
+                            elif os.path.splitext(name)[1].lower() in self.extensions and entry.is_file():
+                                files.append(entry.path)
+                        except OSError:
+                            pass
+            except OSError:
+                return
+
+            for sub in sorted(subdirs):
+                if self._cancel.is_set():
+                    break
+                self._submit(sub)
+
+            files.sort(key=lambda p: os.path.basename(p).lower())
+            self._add_files(files)
+        finally:
+            self._task_done()
+
+    def _add_files(self, files):
+        flush = None
+        with self._lock:
+            self.dirs_scanned += 1
+            if files:
+                self.files_found += len(files)
+                self._buffer.extend(files)
+            if len(self._buffer) >= self.batch_size:
+                flush, self._buffer = self._buffer, []
+            dirs, found = self.dirs_scanned, self.files_found
+        if flush and not self._cancel.is_set():
+            self.on_batch(self, flush)
+        if self.on_progress and (flush or dirs % 50 == 0):
+            self.on_progress(self, dirs, found)
+
+    def _task_done(self):
+        with self._lock:
+            self._pending -= 1
+            last = self._pending == 0
+        if last:
+            self._finish()
+
+    def _finish(self):
+        with self._lock:
+            flush, self._buffer = self._buffer, []
+            dirs, found = self.dirs_scanned, self.files_found
+        if flush and not self._cancel.is_set():
+            self.on_batch(self, flush)
+        if self.on_progress:
+            self.on_progress(self, dirs, found)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self.on_done:
+            self.on_done(self, self._cancel.is_set())
+        self._finished.set()
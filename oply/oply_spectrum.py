@@ -0,0 +1,227 @@
+# Oply - Analizador de espectro para el visualizador
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Un hilo decodifica la pista actual con ffmpeg (PCM mono por un pipe),
+# avanzando al ritmo de la posición que informa mpv (time-pos), y calcula
+# con NumPy la FFT con ventana de Hann en bandas logarítmicas. Al dibujo
+# solo le llega la lista de bandas (valores 0..1).
+
+import shutil
+import subprocess
+import threading
+import time
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+FFMPEG_AVAILABLE = shutil.which("ffmpeg") is not None
+
+
+class SpectrumAnalyzer:
+    def __init__(self, on_bands, bands=32, rate=22050, fft_size=2048, fps=25,
+                 min_freq=40.0, floor_db=-70.0, range_db=60.0):
+        """on_bands(lista) se llama desde el hilo del analizador."""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy is required for the spectrum analyzer")
+        if not FFMPEG_AVAILABLE:
+            raise RuntimeError("ffmpeg is required for the spectrum analyzer")
+
+        self.on_bands = on_bands
+        self.bands = bands
+        self.rate = rate
+        self.fft_size = fft_size
+        self.frame_time = 1.0 / fps
+        self.floor_db = floor_db
+        self.range_db = range_db
+
+        self._window = np.hanning(fft_size).astype(np.float32)
+        self._samples = np.zeros(fft_size, dtype=np.float32)
+        self._levels = np.zeros(bands, dtype=np.float32)
+
+        # Bordes de banda en bins de la FFT, espaciados logarítmicamente
+        freqs = np.fft.rfftfreq(fft_size, 1.0 / rate)
+        edges = np.geomspace(min_freq, rate / 2.0, bands + 1)
+        idx = np.searchsorted(freqs, edges)
+        lo = np.minimum(idx[:-1], len(freqs) - 1)
+        hi = np.maximum(idx[1:], lo + 1)
+        self._lo = lo
+        self._hi = np.minimum(hi, len(freqs))
+        self._width = (self._hi - self._lo).astype(np.float32)
+        # Normalización: una senoidal a fondo de escala da ~0 dB
+        self._scale = 2.0 / self._window.sum()
+
+        self._cond = threading.Condition()
+        self._filepath = None
+        self._generation = 0
+        self._ref_pos = 0.0
+        self._ref_time = 0.0
+        self._paused = True
+        self._enabled = True
+        self._closed = False
+
+        self._proc = None
+        self._proc_generation = -1
+        self._decoded_pos = 0.0
+        self._eof = False
+
+        self._thread = threading.Thread(target=self._run, name="oply-spectrum", daemon=True)
+        self._thread.start()
+
+    # ---------- control (cualquier hilo) ----------
+    def play(self, filepath, position=0.0):
+        with self._cond:
+            self._filepath = filepath
+            self._generation += 1
+            self._ref_pos = position
+            self._ref_time = time.monotonic()
+            self._paused = False
+            self._cond.notify()
+
+    def sync(self, position):
+        """Posición informada por mpv; corrige la deriva y detecta saltos."""
+        if position is None:
+            return
+        with self._cond:
+            self._ref_pos = float(position)
+            self._ref_time = time.monotonic()
+
+    def set_paused(self, paused):
+        with self._cond:
+            if paused == self._paused:
+                return
+            if not paused:
+                self._ref_time = time.monotonic()
+            else:
+                self._ref_pos += time.monotonic() - self._ref_time
+                self._ref_time = time.monotonic()
+            self._paused = paused
+            self._cond.notify()
+
+    def set_enabled(self, enabled):
+        """Con el visualizador oculto no se decodifica nada."""
+        with self._cond:
+            self._enabled = enabled
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._filepath = None
+            self._generation += 1
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+        self._kill_decoder()
+
+    # ---------- hilo del analizador ----------
+    def _active(self):
+        return self._filepath is not None and not self._paused and self._enabled
+
+    def _run(self):
+        next_frame = time.monotonic()
+        while True:
+            with self._cond:
+                while not self._closed and not self._active():
+                    self._cond.wait()
+                    next_frame = time.monotonic()
+                if self._closed:
+                    break
+                filepath = self._filepath
+                generation = self._generation
+                target = self._ref_pos + (time.monotonic() - self._ref_time)
+
+            if not self._active_decoder(filepath, generation, target):
+                # Sin datos (fin de archivo o error): barras en reposo
+                self._levels *= 0.85
+            else:
+                self._levels = np.maximum(self._compute_bands(), self._levels * 0.85)
+            self.on_bands(self._levels.tolist())
+
+            next_frame += self.frame_time
+            delay = next_frame - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_frame = time.monotonic()
+
+        self._kill_decoder()
+
+    def _active_decoder(self, filepath, generation, target):
+        """Deja el decodificador en 'target' leyendo solo lo necesario del pipe."""
+        window_secs = self.fft_size / self.rate
+        if self._proc is None and self._proc_generation == generation:
+            # ffmpeg no arrancó para esta pista: se reintenta recién con el próximo play()
+            return False
+        restart = (
+            self._proc is None
+            or self._proc_generation != generation
+            or target < self._decoded_pos - window_secs - 0.5
+            or target > self._decoded_pos + 2.0
+        )
+        if restart:
+            self._start_decoder(filepath, generation, max(0.0, target - window_secs))
+
+        if self._eof:
+            return False
+
+        needed = int((target - self._decoded_pos) * self.rate)
+        if needed <= 0:
+            return True
+        needed = min(needed, self.rate)
+        data = self._proc.stdout.read(needed * 2)
+        if not data:
+            self._eof = True
+            return False
+
+        chunk = np.frombuffer(data[:len(data) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+        self._decoded_pos += len(chunk) / self.rate
+        if len(chunk) >= self.fft_size:
+            self._samples = chunk[-self.fft_size:].copy()
+        else:
+            self._samples = np.concatenate((self._samples[len(chunk):], chunk))
+        return True
+
+    def _start_decoder(self, filepath, generation, position):
+        self._kill_decoder()
+        self._samples[:] = 0
+        self._decoded_pos = position
+        self._eof = False
+        self._proc_generation = generation
+        cmd = [
+            "ffmpeg", "-v", "error", "-nostdin",
+            "-ss", f"{position:.3f}", "-i", filepath,
+            "-vn", "-ac", "1", "-ar", str(self.rate),
+            "-f", "s16le", "-"
+        ]
+        try:
+            self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                          stdin=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"Spectrum decoder error: {e}")
+            self._proc = None
+            self._eof = True
+
+    def _kill_decoder(self):
+        proc, self._proc = self._proc, None
+        if proc is not None:
+            try:
+                proc.kill()
+                proc.stdout.close()
+                proc.wait(timeout=1)
+            except Exception:
+                pass
+
+    def _compute_bands(self):
+        spectrum = np.abs(np.fft.rfft(self._samples * self._window)) * self._scale
+        cumulative = np.concatenate(([0.0], np.cumsum(spectrum, dtype=np.float64)))
+        mean = (cumulative[self._hi] - cumulative[self._lo]) / self._width
+        db = 20.0 * np.log10(mean + 1e-9)
+        return np.clip((db - self.floor_db) / self.range_db, 0.0, 1.0).astype(np.float32)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Oply - Medición del lanzador
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Compara cuánto tarda "oply --add archivo" con una ventana ya abierta:
+#   forward: oply_launcher.py (solo biblioteca estándar, sin GTK)
+#   cold:    lo que hacía antes: importar Oply.py completo (GTK, idiomas...)
+#            y recién después pasar el archivo por el socket
+#
+# Oply tiene que estar abierto. Se manda una ruta inexistente, así que la
+# lista de reproducción no cambia.
+#
+# Uso: python3 scripts/bench_launcher.py [--runs 10] [--dir /usr/local/Oply]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DUMMY = "/nonexistent/oply-bench.mp3"
+
+
+def timed(cmd, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--dir", default=os.path.join(HERE, "..", "oply"),
+                        help="folder with Oply.py and oply_launcher.py")
+    args = parser.parse_args()
+    oply_dir = os.path.abspath(args.dir)
+
+    sys.path.insert(0, oply_dir)
+    from oply_control import ControlClient, OPLY_SOCKET
+    try:
+        with ControlClient(OPLY_SOCKET) as client:
+            client.request("ping")
+    except OSError:
+        sys.exit("Oply is not running: open it first and run the benchmark again")
+
+    forward = [sys.executable, os.path.join(oply_dir, "oply_launcher.py"), "--add", DUMMY]
+    cold = [sys.executable, "-c",
+            "import sys; sys.path.insert(0, sys.argv[1]); sys.argv = sys.argv[1:]\n"
+            "import Oply, oply_launcher\n"
+            "oply_launcher.send_to_socket([sys.argv[1]], 'ADD')",
+            oply_dir, DUMMY]
+
+    # Una pasada previa para que los .pyc y la caché de disco estén calientes
+    timed(forward, 1)
+    timed(cold, 1)
+
+    results = {"forward": timed(forward, args.runs), "cold": timed(cold, args.runs)}
+    for name, samples in results.items():
+        print(f"{name:8s} median {statistics.median(samples):7.1f} ms   "
+              f"min {min(samples):7.1f} ms   max {max(samples):7.1f} ms")
+    ratio = statistics.median(results["cold"]) / statistics.median(results["forward"])
+    print(f"forward-only is {ratio:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
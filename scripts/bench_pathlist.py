@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# Oply - Medición de memoria de la lista de reproducción
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Compara la memoria de una lista de rutas común (lo que era audio_files)
+# con PathList, para una biblioteca sintética de Artista/Álbum/Pista.
+# No toca el disco: las rutas se generan en memoria.
+#
+# Uso: python3 scripts/bench_pathlist.py [--entries 1000000]
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "oply"))
+
+from oply_pathlist import PathList  # noqa: E402
+
+
+def library_paths(count, tracks_per_album=12, albums_per_artist=6):
+    """Rutas como las de una biblioteca real: /home/.../Artista/Año - Álbum/NN - Título.flac"""
+    root = "/home/user/Music/Library"
+    for i in range(count):
+        album = i // tracks_per_album
+        artist = album // albums_per_artist
+        yield (f"{root}/Artist Name {artist:05d}/{1970 + album % 50} - Album Title {album:06d}"
+               f"/{i % tracks_per_album + 1:02d} - Some Track Title {i:07d}.flac")
+
+
+def measure(build):
+    """Memoria que queda ocupada después de build() (tracemalloc, sin el pico)"""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+
+def timed(label, op, runs=20):
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        op()
+    print(f"{label:14s} {(time.perf_counter() - t0) / runs * 1e6:10.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Playlist memory benchmark")
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    args = parser.parse_args()
+    n = args.entries
+
+    plain, plain_size = measure(lambda: list(library_paths(n)))
+    del plain
+    compact, compact_size = measure(lambda: PathList(library_paths(n)))
+
+    print(f"{n} entries, {len(compact._dirs)} folders")
+    print(f"list[str]  {plain_size / 2**20:8.1f} MiB  {plain_size / n:6.1f} B/entry")
+    print(f"PathList   {compact_size / 2**20:8.1f} MiB  {compact_size / n:6.1f} B/entry")
+    print(f"PathList uses {compact_size / plain_size:.0%} of the memory")
+
+    # Tiempos fuera de tracemalloc, que los distorsiona mucho
+    plain = list(compact)
+    t0 = time.perf_counter()
+    PathList(plain)
+    print(f"{'build':14s} {(time.perf_counter() - t0) * 1e3:10.1f} ms")
+    probe = plain[n // 2]
+    timed("getitem", lambda: compact[n // 3])
+    timed("slice 100", lambda: compact[n // 3:n // 3 + 100])
+    timed("index (mid)", lambda: compact.index(probe))
+    timed("list.index", lambda: plain.index(probe))
+    timed("iterate all", lambda: sum(1 for _ in compact), runs=3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# Oply - Pruebas del orden de reproducción
+# Author: josejp2424
+# License: GPL-3.0
+# Proyecto: Oply
+#
+# Uso: python3 -m unittest discover tests
+
+import os
+import random
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "oply"))
+
+from oply_playorder import PlayOrder, PLAY_NEXT, PLAY_LATER, _Fenwick  # noqa: E402
+
+
+def make_order(count, seed=1):
+    order = PlayOrder(rng=random.Random(seed))
+    order.extend(count)
+    return order
+
+
+class FenwickTest(unittest.TestCase):
+    def test_prefix_and_find_match_a_plain_list(self):
+        rng = random.Random(7)
+        tree = _Fenwick()
+        alive = []
+        for _ in range(300):
+            tree.append(1)
+            alive.append(1)
+            if rng.random() < 0.4:
+                slot = rng.randrange(len(alive))
+                if alive[slot]:
+                    alive[slot] = 0
+                    tree.add(slot, -1)
+            for count in range(len(alive) + 1):
+                self.assertEqual(tree.prefix(count), sum(alive[:count]))
+            live = [slot for slot, value in enumerate(alive) if value]
+            for k, slot in enumerate(live):
+                self.assertEqual(tree.find(k), slot)
+
+
+class SequenceTest(unittest.TestCase):
+    def test_wraps_with_repeat(self):
+        order = make_order(3)
+        order.played(0)
+        self.assertEqual([order.next() for _ in range(4)], [1, 2, 0, 1])
+
+    def test_stops_at_the_end_without_repeat(self):
+        order = make_order(3)
+        order.repeat = False
+        order.played(1)
+        self.assertEqual(order.next(), 2)
+        self.assertIsNone(order.peek_next())
+        self.assertIsNone(order.next())
+
+    def test_removing_the_current_track_continues_after_it(self):
+        order = make_order(5)
+        order.played(2)
+        order.remove([2])
+        self.assertIsNone(order.current)
+        self.assertEqual(len(order), 4)
+        # La que era la 3 ahora está en la posición 2
+        self.assertEqual(order.next(), 2)
+        self.assertEqual(order.next(), 3)
+
+    def test_removing_earlier_tracks_keeps_the_current_one(self):
+        order = make_order(5)
+        order.played(3)
+        order.remove([0, 1])
+        self.assertEqual(order.current, 1)
+        self.assertEqual(order.next(), 2)
+
+
+class QueueTest(unittest.TestCase):
+    def test_play_next_before_play_later(self):
+        order = make_order(6)
+        order.played(0)
+        order.enqueue([3, 4], PLAY_LATER)
+        order.enqueue([5], PLAY_NEXT)
+        order.enqueue([1, 2], PLAY_NEXT)
+        self.assertEqual(order.queued(), [1, 2, 5, 3, 4])
+        self.assertEqual([order.next() for _ in range(5)], [1, 2, 5, 3, 4])
+        # Vacía la cola, el orden normal sigue desde la última que no salió de ella
+        self.assertEqual(order.next(), 1)
+
+    def test_removed_tracks_leave_the_queue(self):
+        order = make_order(6)
+        order.played(0)
+        order.enqueue([4, 5], PLAY_LATER)
+        order.remove([4])
+        self.assertEqual(order.queued(), [4])
+        self.assertEqual(order.next(), 4)
+
+
+class ShuffleTest(unittest.TestCase):
+    def test_every_track_once_per_round(self):
+        count = 20
+        order = make_order(count, seed=3)
+        order.set_shuffle(True)
+        order.played(0)
+        first = [order.next() for _ in range(count - 1)]
+        self.assertEqual(sorted(first), list(range(1, count)))
+
+        # La vuelta nueva cuenta como sonada la última de la anterior:
+        # no puede empezar (ni seguir) con la que acaba de sonar
+        second = [order.next() for _ in range(count - 1)]
+        self.assertEqual(sorted(second + [first[-1]]), list(range(count)))
+
+    def test_peek_matches_next(self):
+        order = make_order(10, seed=5)
+        order.set_shuffle(True)
+        order.played(0)
+        for _ in range(15):
+            peeked = order.peek_next()
+            self.assertEqual(order.next(), peeked)
+
+
+class HistoryTest(unittest.TestCase):
+    def test_previous_then_forward(self):
+        order = make_order(5)
+        order.played(0)
+        order.next()
+        order.next()
+        self.assertEqual(order.previous(), 1)
+        self.assertEqual(order.previous(), 0)
+        # Volver a avanzar repite el camino antes de seguir la secuencia
+        self.assertEqual(order.next(), 1)
+        self.assertEqual(order.next(), 2)
+        self.assertEqual(order.next(), 3)
+
+    def test_previous_follows_shuffle_history(self):
+        order = make_order(10, seed=9)
+        order.set_shuffle(True)
+        order.played(0)
+        played = [0] + [order.next() for _ in range(4)]
+        self.assertEqual([order.previous() for _ in range(4)], played[-2::-1])
+        self.assertEqual([order.next() for _ in range(4)], played[1:])
+
+
+if __name__ == "__main__":
+    unittest.main()
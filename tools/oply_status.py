@@ -1,13 +1,28 @@
 #!/usr/bin/env python3
 """
 Script auxiliar para Oply - Exporta el estado actual para Conky
-Uso: python3 oply_status.py
+Uso: python3 oply_status.py [--format conky|plain|i3bar]
+     python3 oply_status.py --watch [--output ARCHIVO|FIFO] [--format ...]
 Salida: Información de reproducción actual o vacío si no hay nada
+
+Con --watch queda corriendo: vigila now_playing.json con inotify (o, si no
+está disponible, revisando el archivo cada segundo) y vuelve a generar la
+salida solo cuando el estado cambia. Sin --output escribe en stdout (útil
+para i3bar); con --output escribe un archivo que Conky puede leer con
+${cat ...}, o sirve el último estado a cada lector si la ruta es un FIFO.
 """
 
+import argparse
+import ctypes
+import ctypes.util
 import json
 import os
+import select
+import stat
+import struct
 import sys
+import threading
+import time
 
 # Archivo donde Oply y Oply-Radio escriben el estado
 STATE_FILE = os.path.expanduser("~/.config/oply/now_playing.json")
@@ -58,7 +73,209 @@ def format_for_conky(data):
 
     return output
 
-if __name__ == "__main__":
-    data = get_oply_status()
-    output = format_for_conky(data)
+def format_plain(data):
+    """Una línea de texto: 'Artista - Título' o la estación de radio"""
+    if not data:
+        return ""
+    title = data.get('title', '')
+    artist = data.get('artist', '')
+    if data.get('source') == 'radio':
+        return f"📻 {title}\n"
+    return f"♪ {artist} - {title}\n" if artist else f"♪ {title}\n"
+
+def format_i3bar(data):
+    """Un bloque del protocolo de i3bar/swaybar (lista JSON de una línea)"""
+    text = format_plain(data).strip()
+    block = {"name": "oply", "full_text": text}
+    return json.dumps([block], ensure_ascii=False) + "\n"
+
+# Formatos disponibles para --format
+FORMATTERS = {
+    "conky": format_for_conky,
+    "plain": format_plain,
+    "i3bar": format_i3bar,
+}
+
+
+# ---------- salidas del modo --watch ----------
+
+class StdoutOutput:
+    def __init__(self, fmt):
+        self.i3bar = fmt == "i3bar"
+        if self.i3bar:
+            # Encabezado y apertura del arreglo infinito del protocolo
+            sys.stdout.write('{"version":1}\n[\n')
+        self.first = True
+
+    def write(self, text):
+        if self.i3bar and not self.first:
+            text = "," + text
+        self.first = False
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+class FileOutput:
+    """Reemplaza el archivo de una vez: quien lo lea nunca ve medio texto"""
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, text):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, self.path)
+
+
+class FifoOutput:
+    """Cada lector que abre el FIFO recibe el último texto generado"""
+    def __init__(self, path):
+        self.path = path
+        self.text = ""
+        self.lock = threading.Lock()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def write(self, text):
+        with self.lock:
+            self.text = text
+
+    def _serve(self):
+        while True:
+            try:
+                # Bloquea hasta que aparece un lector (por ejemplo, cat)
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    with self.lock:
+                        text = self.text
+                    f.write(text)
+            except BrokenPipeError:
+                pass
+            except OSError:
+                time.sleep(1)
+                continue
+            # Deja que el lector vea el fin de archivo antes de reabrir
+            time.sleep(0.05)
+
+
+def open_output(path, fmt):
+    if not path:
+        return StdoutOutput(fmt)
+    try:
+        if stat.S_ISFIFO(os.stat(path).st_mode):
+            return FifoOutput(path)
+    except OSError:
+        pass
+    return FileOutput(path)
+
+
+# ---------- vigilancia del archivo de estado ----------
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+def inotify_watcher(path):
+    """
+    Generador que avanza cada vez que el archivo cambia, usando inotify
+    sobre la carpeta (Oply reemplaza el archivo con rename). Devuelve None
+    si inotify no está disponible.
+    """
+    libname = ctypes.util.find_library("c")
+    try:
+        libc = ctypes.CDLL(libname, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+
+    folder, name = os.path.split(path)
+    mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    if libc.inotify_add_watch(fd, os.fsencode(folder), mask) < 0:
+        os.close(fd)
+        return None
+
+    def events():
+        target = os.fsencode(name)
+        try:
+            while True:
+                select.select([fd], [], [])
+                try:
+                    buf = os.read(fd, 4096)
+                except BlockingIOError:
+                    continue
+                changed = False
+                offset = 0
+                while offset + _EVENT.size <= len(buf):
+                    _wd, _mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+                    offset += _EVENT.size
+                    event_name = buf[offset:offset + length].rstrip(b"\0")
+                    offset += length
+                    if event_name == target:
+                        changed = True
+                if changed:
+                    yield
+        finally:
+            os.close(fd)
+
+    return events()
+
+def polling_watcher(path, interval=1.0):
+    """Respaldo sin inotify: revisa mtime/tamaño del archivo"""
+    def signature():
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return None
+
+    last = signature()
+    while True:
+        time.sleep(interval)
+        current = signature()
+        if current != last:
+            last = current
+            yield
+
+def watch(fmt, output_path=None):
+    formatter = FORMATTERS[fmt]
+    output = open_output(output_path, fmt)
+
+    changes = None
+    if os.path.isdir(os.path.dirname(STATE_FILE)):
+        changes = inotify_watcher(STATE_FILE)
+    if changes is None:
+        changes = polling_watcher(STATE_FILE)
+
+    last = None
+    while True:
+        text = formatter(get_oply_status())
+        if text != last:
+            output.write(text)
+            last = text
+        next(changes)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Oply status for Conky, i3bar and others")
+    parser.add_argument("--format", choices=sorted(FORMATTERS), default="conky")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and update the output only when the state changes")
+    parser.add_argument("--output", metavar="PATH",
+                        help="with --watch: file or FIFO to write instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.watch:
+        try:
+            watch(args.format, args.output)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    output = FORMATTERS[args.format](get_oply_status())
     print(output, end='')
+
+if __name__ == "__main__":
+    main()